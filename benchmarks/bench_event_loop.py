@@ -0,0 +1,125 @@
+"""
+Probe throughput and per-probe CPU under asyncio vs uvloop.
+
+Runs check_urls_async against a local aiohttp server (in its own process)
+once per loop implementation, each in a fresh process so CPU time is
+accounted separately:
+
+    python benchmarks/bench_event_loop.py --urls 2000 --rounds 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def serve(port_queue):
+    """Local target server (plain asyncio, identical for every run)"""
+    from aiohttp import web
+
+    async def ok(request):
+        return web.Response(text="ok")
+
+    async def start():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", ok)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port_queue.put(site._server.sockets[0].getsockname()[1])
+
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start())
+    loop.run_forever()
+
+
+def run_probes(use_uvloop, port, urls, rounds, concurrency, result_queue):
+    """One benchmark run, configured through the environment before import"""
+    os.environ["USE_UVLOOP"] = "true" if use_uvloop else "false"
+    os.environ["MAX_CONCURRENT_REQUESTS"] = str(concurrency)
+    os.environ["ENABLE_SLACK_NOTIFICATIONS"] = "false"
+    from loguru import logger
+
+    logger.remove()
+
+    from src.event_loop import loop_implementation, run_coroutine
+    from src.utils import check_urls_async
+
+    data_urls = [
+        {"url": f"http://127.0.0.1:{port}/probe/{i}", "namespace": "bench", "name": str(i)}
+        for i in range(urls)
+    ]
+    # Warm-up (imports, connection pool)
+    run_coroutine(check_urls_async([dict(d) for d in data_urls[:50]]))
+
+    wall = cpu = 0.0
+    for _ in range(rounds):
+        batch = [dict(d) for d in data_urls]
+        started_wall, started_cpu = time.perf_counter(), time.process_time()
+        results = run_coroutine(check_urls_async(batch))
+        wall += time.perf_counter() - started_wall
+        cpu += time.process_time() - started_cpu
+        assert len(results) == urls
+    probes = urls * rounds
+    result_queue.put(
+        {
+            "loop": loop_implementation(),
+            "probes_per_s": probes / wall,
+            "cpu_us_per_probe": cpu / probes * 1e6,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    port_queue = ctx.Queue()
+    server = ctx.Process(target=serve, args=(port_queue,), daemon=True)
+    server.start()
+    port = port_queue.get(timeout=30)
+
+    try:
+        import uvloop  # noqa: F401
+
+        implementations = [False, True]
+    except ImportError:
+        print("uvloop n'est pas installé: seule la boucle asyncio est mesurée")
+        implementations = [False]
+
+    rows = []
+    try:
+        for use_uvloop in implementations:
+            result_queue = ctx.Queue()
+            worker = ctx.Process(
+                target=run_probes,
+                args=(use_uvloop, port, args.urls, args.rounds, args.concurrency, result_queue),
+            )
+            worker.start()
+            rows.append(result_queue.get(timeout=600))
+            worker.join()
+    finally:
+        server.kill()
+
+    print(f"{'loop':<10}{'probes/s':>12}{'CPU µs/probe':>16}")
+    for row in rows:
+        print(f"{row['loop']:<10}{row['probes_per_s']:>12.0f}{row['cpu_us_per_probe']:>16.0f}")
+    if len(rows) == 2:
+        speedup = rows[1]["probes_per_s"] / rows[0]["probes_per_s"]
+        cpu_ratio = rows[1]["cpu_us_per_probe"] / rows[0]["cpu_us_per_probe"]
+        print(f"uvloop: x{speedup:.2f} débit, x{cpu_ratio:.2f} CPU par sonde")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Slack alert dispatcher: batched, rate limited, off the probe path
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from loguru import logger
+
+from .config import (
+    ALERT_BATCH_WINDOW_SECONDS,
+    ALERT_MAX_RETRIES,
+    ALERT_MIN_INTERVAL_SECONDS,
+    ALERT_QUEUE_SIZE,
+    ENABLE_SLACK_NOTIFICATIONS,
+    SLACK_WEBHOOK_URL,
+)
+from .event_loop import new_event_loop
+from .metrics import register_metrics_provider
+
+# Alert lines listed in one message, the rest are summarized
+MAX_LINES_PER_MESSAGE = 20
+SEND_TIMEOUT_SECONDS = 10
+RETRY_BACKOFF_SECONDS = 1.0
+# Time given to the queued alerts on shutdown
+STOP_TIMEOUT_SECONDS = 10.0
+
+
+_STATE_ICONS = {"down": "🔴", "flapping": "🟠", "anomaly": "📈", "up": "✅"}
+
+
+def _format_duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return f"{int(seconds)}s"
+    if minutes < 120:
+        return f"{minutes} min"
+    return f"{minutes // 60} h"
+
+
+def _alert_line(alert: Dict[str, Any]) -> str:
+    state = alert.get("state", "down")
+    icon = _STATE_ICONS.get(state, "🔴")
+    url = alert["url"]
+    if state == "up":
+        line = f"{icon} {url} — rétablie"
+        if alert.get("duration"):
+            line += f" après {_format_duration(alert['duration'])}"
+        return line
+    failure = f"{alert['status']} {alert['details']}".strip()
+    if state == "flapping":
+        return f"{icon} {url} — instable ({failure})"
+    if state == "anomaly":
+        return f"{icon} {url} — anomalie: {failure}"
+    return f"{icon} {url} — {failure}"
+
+
+def build_message(alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One Slack message for a batch of state transitions.
+
+    Only the last transition of a URL within the batch is listed.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for alert in alerts:
+        latest.pop(alert["url"], None)
+        latest[alert["url"]] = alert
+
+    failing = sum(1 for alert in latest.values() if alert.get("state", "down") != "up")
+    recovered = len(latest) - failing
+    lines = [_alert_line(alert) for alert in list(latest.values())[:MAX_LINES_PER_MESSAGE]]
+    hidden = len(latest) - MAX_LINES_PER_MESSAGE
+    if hidden > 0:
+        lines.append(f"… et {hidden} autres URLs")
+
+    summary = []
+    if failing:
+        summary.append(f"{failing} URL(s) en erreur")
+    if recovered:
+        summary.append(f"{recovered} rétablie(s)")
+    return {
+        "text": f"🚨 Portal Checker: {', '.join(summary)}",
+        "attachments": [
+            {
+                "color": "danger" if failing else "good",
+                "text": "\n".join(lines),
+                "footer": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        ],
+    }
+
+
+class SlackDispatcher:
+    """Deliver alerts from a bounded queue on a dedicated thread.
+
+    ``notify`` never blocks: when the queue is full the alert is dropped
+    and counted. The thread collects alerts for ``window`` seconds after
+    the first one, posts them as a single message with its own session,
+    waits ``min_interval`` between posts and retries failed posts with
+    exponential backoff (honoring Retry-After on 429).
+    """
+
+    def __init__(
+        self,
+        webhook_url: str,
+        queue_size: int = ALERT_QUEUE_SIZE,
+        window: float = ALERT_BATCH_WINDOW_SECONDS,
+        min_interval: float = ALERT_MIN_INTERVAL_SECONDS,
+        max_retries: int = ALERT_MAX_RETRIES,
+    ) -> None:
+        self.webhook_url = webhook_url
+        self.window = window
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_post = 0.0
+        self.stats = {
+            "queued": 0,
+            "dropped": 0,
+            "messages_sent": 0,
+            "alerts_sent": 0,
+            "retries": 0,
+            "failed_messages": 0,
+        }
+
+    def notify(self, alert: Dict[str, Any]) -> bool:
+        """Queue a state transition alert, False if it was dropped"""
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        self._ensure_started()
+        return True
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="slack-dispatcher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS) -> bool:
+        """Send the queued alerts without waiting out the batch window,
+        then stop. Returns False if some were left after ``timeout``."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        pending = self._queue.qsize()
+        if pending or (thread is not None and thread.is_alive()):
+            logger.warning(f"⚠️ Arrêt: {pending} alertes Slack non envoyées")
+            return False
+        return True
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        try:
+            if self._stop.is_set():
+                batch = [self._queue.get_nowait()]
+            else:
+                batch = [self._queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.window
+        while True:
+            # Stopping: take what is queued now, no more waiting
+            remaining = 0.0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    # Short waits, so that a stop ends the window early
+                    batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                if remaining <= 0:
+                    break
+        return batch
+
+    def _run(self) -> None:
+        loop = new_event_loop()
+        session = loop.run_until_complete(self._open_session())
+        try:
+            while not self._stop.is_set() or not self._queue.empty():
+                batch = self._next_batch()
+                if batch:
+                    loop.run_until_complete(self._send(session, batch))
+        finally:
+            loop.run_until_complete(session.close())
+            loop.close()
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=SEND_TIMEOUT_SECONDS)
+        )
+
+    async def _send(self, session: aiohttp.ClientSession, batch: List[Dict[str, Any]]) -> bool:
+        message = build_message(batch)
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_post + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_post = time.monotonic()
+            retry_after: Optional[float] = None
+            try:
+                async with session.post(self.webhook_url, json=message) as response:
+                    await response.read()
+                    if response.status < 300:
+                        self.stats["messages_sent"] += 1
+                        self.stats["alerts_sent"] += len(batch)
+                        logger.debug(f"📧 Alerte Slack envoyée ({len(batch)} alertes)")
+                        return True
+                    if response.status < 500 and response.status != 429:
+                        logger.error(f"❌ Alerte Slack refusée: {response.status}")
+                        break
+                    if response.status == 429:
+                        try:
+                            retry_after = float(response.headers.get("Retry-After", ""))
+                        except ValueError:
+                            retry_after = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug(f"Envoi Slack échoué (tentative {attempt + 1}): {e}")
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(retry_after or RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        self.stats["failed_messages"] += 1
+        logger.error(f"❌ Alerte Slack non délivrée ({len(batch)} alertes)")
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self._queue.qsize()}
+
+
+_dispatcher_state: Dict[str, Optional[SlackDispatcher]] = {"dispatcher": None}
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher() -> Optional[SlackDispatcher]:
+    """Shared dispatcher when Slack notifications are configured, else None"""
+    if not ENABLE_SLACK_NOTIFICATIONS or not SLACK_WEBHOOK_URL:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher_state["dispatcher"] is None:
+            _dispatcher_state["dispatcher"] = SlackDispatcher(SLACK_WEBHOOK_URL)
+        return _dispatcher_state["dispatcher"]
+
+
+def _metrics() -> Dict[str, Any]:
+    dispatcher = get_alert_dispatcher()
+    return dispatcher.snapshot() if dispatcher else {"enabled": False}
+
+
+register_metrics_provider("alerts", _metrics)
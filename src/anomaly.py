@@ -0,0 +1,274 @@
+"""
+Latency and error-rate anomaly detection, vectorized over the inventory
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from .config import (
+    ANOMALY_ALPHA,
+    ANOMALY_DETECTION,
+    ANOMALY_ERROR_DELTA,
+    ANOMALY_MIN_DELTA_MS,
+    ANOMALY_MIN_SAMPLES,
+    ANOMALY_Z_THRESHOLD,
+)
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key, url_id
+
+# numpy is optional (anomaly extra): without it detection stays off.
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+
+# Weight of the latest check in the short-term error rate
+ERROR_FAST_ALPHA = 0.3
+INITIAL_CAPACITY = 1024
+
+_COLUMNS = {
+    # EWMA mean / variance of the response time (ms) of healthy checks
+    "mean": "float64",
+    "var": "float64",
+    # Long-term and short-term EWMA of the failure indicator
+    "err": "float64",
+    "err_fast": "float64",
+    # Checks and latency samples seen
+    "n": "int32",
+    "lat_n": "int32",
+    # Current cycle, NaN when the URL was not checked
+    "cur_lat": "float64",
+    "cur_err": "float64",
+    "flagged": "bool",
+}
+_NAN_COLUMNS = ("cur_lat", "cur_err")
+
+
+class AnomalyDetector:
+    """EWMA baselines per URL in column arrays, scored once per cycle.
+
+    Every URL id owns a slot (row) in each array. Results of a cycle
+    only write the slot's current values; ``end_cycle`` scores and
+    updates the whole inventory with array operations, then lists the
+    few flagged URLs.
+    """
+
+    def __init__(
+        self,
+        alpha: float = ANOMALY_ALPHA,
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+        min_delta_ms: float = ANOMALY_MIN_DELTA_MS,
+        error_delta: float = ANOMALY_ERROR_DELTA,
+        min_samples: int = ANOMALY_MIN_SAMPLES,
+        capacity: int = INITIAL_CAPACITY,
+    ) -> None:
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_delta_ms = min_delta_ms
+        self.error_delta = error_delta
+        self.min_samples = min_samples
+        self._cols: Dict[str, Any] = {name: self._column(name, capacity) for name in _COLUMNS}
+        self._slots: Dict[str, int] = {}
+        self._keys: List[Optional[ResultKey]] = []
+        # Route labels per slot, so that label silences match the alerts
+        self._labels: List[Optional[Dict[str, str]]] = []
+        self._free: List[int] = []
+        self._anomalies: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.cycles = 0
+        self.last_cycle_ms = 0.0
+
+    @staticmethod
+    def _column(name: str, size: int) -> Any:
+        if name in _NAN_COLUMNS:
+            return np.full(size, np.nan)
+        return np.zeros(size, dtype=_COLUMNS[name])
+
+    def _reset(self, slots: Any) -> None:
+        for name, column in self._cols.items():
+            column[slots] = np.nan if name in _NAN_COLUMNS else 0
+
+    def _slot(self, rid: str, key: ResultKey) -> int:
+        slot = self._slots.get(rid)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._labels.append(None)
+            capacity = len(self._cols["n"])
+            if slot >= capacity:
+                for name, column in self._cols.items():
+                    grown = self._column(name, capacity * 2)
+                    grown[:capacity] = column
+                    self._cols[name] = grown
+        self._slots[rid] = slot
+        return slot
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """Store the outcome of a check for the end of the cycle"""
+        healthy = result.get("healthy")
+        if healthy is None:
+            return
+        rid = url_id(result)
+        with self._lock:
+            slot = self._slot(rid, result_key(result))
+            self._labels[slot] = result.get("labels") or {}
+            self._cols["cur_err"][slot] = 0.0 if healthy else 1.0
+            response_time = result.get("response_time")
+            if healthy and response_time:
+                self._cols["cur_lat"][slot] = float(response_time)
+
+    def end_cycle(self) -> List[Dict[str, Any]]:
+        """Score the cycle's checks, update baselines and return the
+        alerts of newly flagged URLs"""
+        started = time.perf_counter()
+        with self._lock:
+            size = len(self._keys)
+            c = {name: column[:size] for name, column in self._cols.items()}
+            lat, err = c["cur_lat"], c["cur_err"]
+            observed = ~np.isnan(err)
+            has_lat = ~np.isnan(lat)
+
+            # Score against the baselines before this cycle
+            std = np.sqrt(c["var"])
+            delta = lat - c["mean"]
+            with np.errstate(invalid="ignore"):
+                lat_flag = (
+                    has_lat
+                    & (c["lat_n"] >= self.min_samples)
+                    & (delta > self.min_delta_ms)
+                    & (delta > self.z_threshold * std)
+                )
+            err_fast = np.where(observed, c["err_fast"] + ERROR_FAST_ALPHA * (err - c["err_fast"]), c["err_fast"])
+            err_flag = observed & (c["n"] >= self.min_samples) & (err_fast - c["err"] > self.error_delta)
+
+            anomalies: Dict[str, Dict[str, Any]] = {}
+            for slot in np.flatnonzero(lat_flag | err_flag).tolist():
+                key = self._keys[slot]
+                if lat_flag[slot]:
+                    anomaly = {
+                        "kind": "latency",
+                        "value": round(float(lat[slot]), 1),
+                        "baseline": round(float(c["mean"][slot]), 1),
+                        "score": round(float(delta[slot] / std[slot]), 1) if std[slot] else None,
+                    }
+                else:
+                    anomaly = {
+                        "kind": "error_rate",
+                        "value": round(float(err_fast[slot]), 3),
+                        "baseline": round(float(c["err"][slot]), 3),
+                    }
+                anomalies[url_id({"url": key[0], "namespace": key[1], "name": key[2]})] = anomaly
+
+            # EWMA mean and variance (West), initialized by the first sample
+            first = has_lat & (c["lat_n"] == 0)
+            increment = self.alpha * np.nan_to_num(delta)
+            c["var"][:] = np.where(has_lat & ~first, (1 - self.alpha) * (c["var"] + np.nan_to_num(delta) * increment), c["var"])
+            c["mean"][:] = np.where(first, np.nan_to_num(lat), c["mean"] + np.where(has_lat, increment, 0))
+            c["lat_n"] += has_lat
+            c["err"][:] = np.where(observed, c["err"] + self.alpha * (err - c["err"]), c["err"])
+            c["err_fast"][:] = err_fast
+            c["n"] += observed
+
+            # URLs not checked this cycle keep their flag and anomaly
+            flagged = np.where(observed, lat_flag | err_flag, c["flagged"])
+            new = flagged & ~c["flagged"]
+            c["flagged"][:] = flagged
+            lat.fill(np.nan)
+            err.fill(np.nan)
+            for rid, anomaly in self._anomalies.items():
+                slot = self._slots.get(rid)
+                if slot is not None and flagged[slot] and not observed[slot]:
+                    anomalies[rid] = anomaly
+            self._anomalies = anomalies
+            alerts = [self._alert(slot) for slot in np.flatnonzero(new).tolist()]
+            self.cycles += 1
+        self.last_cycle_ms = (time.perf_counter() - started) * 1000
+        if alerts:
+            logger.info(f"📈 {len(alerts)} anomalies détectées ({self.last_cycle_ms:.1f} ms)")
+        return alerts
+
+    def _alert(self, slot: int) -> Dict[str, Any]:
+        url, namespace, name = self._keys[slot]
+        rid = url_id({"url": url, "namespace": namespace, "name": name})
+        anomaly = self._anomalies[rid]
+        if anomaly["kind"] == "latency":
+            details = f"latence {anomaly['value']:.0f} ms (habituelle {anomaly['baseline']:.0f} ms)"
+        else:
+            details = f"taux d'erreur {anomaly['value']:.0%} (habituel {anomaly['baseline']:.0%})"
+        return {
+            "url": url,
+            "namespace": namespace,
+            "name": name,
+            "labels": self._labels[slot] or {},
+            "state": "anomaly",
+            "status": "",
+            "details": details,
+        }
+
+    def anomalies(self) -> Dict[str, Dict[str, Any]]:
+        """Anomaly of every flagged URL id, as of the last cycle"""
+        return self._anomalies
+
+    def forget(self, keep: Iterable[ResultKey]) -> None:
+        """Free the slots of URLs that left the inventory"""
+        keep_ids = {url_id({"url": u, "namespace": ns, "name": n}) for u, ns, n in keep}
+        with self._lock:
+            gone = [rid for rid in self._slots if rid not in keep_ids]
+            if not gone:
+                return
+            slots = [self._slots.pop(rid) for rid in gone]
+            self._reset(slots)
+            for slot in slots:
+                self._keys[slot] = None
+                self._labels[slot] = None
+            self._free.extend(slots)
+            self._anomalies = {rid: a for rid, a in self._anomalies.items() if rid in self._slots}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "urls": len(self._slots),
+            "flagged": len(self._anomalies),
+            "cycles": self.cycles,
+            "last_cycle_ms": round(self.last_cycle_ms, 2),
+        }
+
+
+_detector_state: Dict[str, Any] = {"detector": None, "warned": False}
+_detector_lock = threading.Lock()
+
+
+def get_anomaly_detector() -> Optional[AnomalyDetector]:
+    """Shared detector when ANOMALY_DETECTION is enabled and numpy is
+    installed, else None"""
+    if not ANOMALY_DETECTION:
+        return None
+    with _detector_lock:
+        if not NUMPY_AVAILABLE:
+            if not _detector_state["warned"]:
+                _detector_state["warned"] = True
+                logger.warning("⚠️ ANOMALY_DETECTION activé mais numpy n'est pas installé, détection désactivée")
+            return None
+        if _detector_state["detector"] is None:
+            _detector_state["detector"] = AnomalyDetector()
+        return _detector_state["detector"]
+
+
+def _metrics() -> Dict[str, Any]:
+    detector = get_anomaly_detector()
+    if detector is None:
+        return {"enabled": False, "numpy_available": NUMPY_AVAILABLE}
+    return detector.snapshot()
+
+
+register_metrics_provider("anomaly", _metrics)
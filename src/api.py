@@ -2,22 +2,67 @@
 Flask API routes for Portal Checker
 """
 
-import asyncio
 import os
 import threading
+import time
 from datetime import datetime
 from typing import Any, Dict, List
 
 from flask import Flask, jsonify, render_template, request, send_from_directory
 from loguru import logger
 
-from .config import AUTO_REFRESH_ON_START, ENABLE_AUTOSWAGGER, URLS_FILE
+from .alerts import get_alert_dispatcher
+from .anomaly import get_anomaly_detector
+from .config import (
+    AUTO_REFRESH_ON_START,
+    CHECK_INTERVAL,
+    ENABLE_AUTOSWAGGER,
+    SAMPLING_SLICES,
+    URLS_FILE,
+)
+from .endpoints import backend_key, get_backend_readiness
+from .event_loop import run_coroutine
+from .events import get_event_journal
+from .health_state import get_health_tracker
+from .history import get_url_history
+from .history_db import get_history_db
 from .kubernetes_client import (
     get_all_urls_with_details,
     is_url_excluded,
     save_urls_to_file,
 )
-from .utils import check_urls_async, get_app_version, load_urls_from_file
+from .metrics import collect_metrics
+from .process_engine import get_check_engine
+from .results_store import ResultsStore
+from .scheduler import (
+    compute_tick_interval,
+    next_sample_slice,
+    result_age,
+    result_key,
+    select_due_urls,
+    url_id,
+)
+from .silences import get_silence_store, silence_from_dict
+from .sketches import get_latency_sketches
+from .sla import get_sla_tracker
+from .timeouts import get_latency_history
+from .utils import (
+    check_urls_async,
+    get_app_version,
+    load_urls_from_file,
+    make_skipped_result,
+)
+from .warm_start import (
+    background_running,
+    cycle_completed,
+    heartbeat,
+    is_stale,
+    liveness,
+    load_snapshot,
+    maybe_save_snapshot,
+    readiness,
+    request_initial_cycle,
+)
 
 # Import autoswagger si disponible et activé
 AUTOSWAGGER_AVAILABLE = False
@@ -37,8 +82,16 @@ else:
 
 app = Flask(__name__, template_folder="../templates", static_folder="../static")
 
-# Cache for test results
-_test_results_cache: Dict[str, Any] = {"results": [], "last_updated": None}
+# Latest test result per URL, published as each probe completes
+_test_results_cache = ResultsStore()
+
+# Scheduler state: the background loop wakes up every tick_interval seconds
+# (shortest portal-checker.io/interval among URLs, capped by CHECK_INTERVAL).
+# In sampled mode, current_slice is the slice probed by the last cycle.
+_schedule_state: Dict[str, Any] = {
+    "tick_interval": CHECK_INTERVAL,
+    "current_slice": None,
+}
 
 # Cache for swagger results
 _swagger_cache: Dict[str, Any] = {"results": [], "last_updated": None}
@@ -81,7 +134,7 @@ def _run_full_refresh_sync() -> None:
     try:
         urls_data = get_all_urls_with_details(force_refresh=True)
         save_urls_to_file(urls_data, URLS_FILE)
-        asyncio.run(_run_url_tests(update_cache=True))
+        run_coroutine(_run_url_tests(update_cache=True))
         logger.info(f"✅ Refresh asynchrone terminé: {len(urls_data)} URLs")
         _refresh_state["last_error"] = None
     except Exception as exc:
@@ -124,16 +177,186 @@ def _is_url_excluded_wrapper(url: str) -> bool:
     return result
 
 
+def _publish_result(result: Dict[str, Any]) -> None:
+    """Store a fresh result and queue an alert if the URL changed state"""
+    journal = get_event_journal()
+    if journal is not None:
+        journal.record(_test_results_cache.get_result(result_key(result)), result)
+    _test_results_cache.publish(result)
+    heartbeat()
+    history = get_url_history()
+    if history is not None:
+        history.record(result)
+    history_db = get_history_db()
+    if history_db is not None:
+        history_db.record(result)
+    sla = get_sla_tracker()
+    if sla is not None:
+        sla.record(result)
+    sketches = get_latency_sketches()
+    if sketches is not None:
+        sketches.record(result)
+    detector = get_anomaly_detector()
+    if detector is not None:
+        detector.record(result)
+    tracker = get_health_tracker()
+    if tracker is None:
+        return
+    alert = tracker.observe(result)
+    if alert is not None and not get_silence_store().is_muted(result):
+        dispatcher = get_alert_dispatcher()
+        if dispatcher is not None:
+            dispatcher.notify(alert)
+
+
+def _notify_anomalies(alerts: List[Dict[str, Any]]) -> None:
+    """Queue the alerts of URLs newly flagged by the anomaly detector"""
+    dispatcher = get_alert_dispatcher()
+    if dispatcher is None:
+        return
+    silences = get_silence_store()
+    for alert in alerts:
+        if not silences.is_muted(alert):
+            dispatcher.notify(alert)
+
+
+def get_tick_interval() -> int:
+    """Seconds the background loop should wait before the next cycle."""
+    return _schedule_state["tick_interval"]
+
+
 async def _run_url_tests(
-    update_cache: bool = True, run_swagger: bool = False
+    update_cache: bool = True, run_swagger: bool = False, only_due: bool = False
 ) -> List[Dict[str, Any]]:
-    """Run URL tests with optional cache update"""
+    """Run URL tests with optional cache update.
+
+    With only_due=True (scheduled cycles), URLs whose policy interval has
+    not elapsed, or which are outside the current sampling slice, keep
+    their previous result instead of being probed again.
+    """
     data_urls = load_urls_from_file(URLS_FILE)
-    results = await check_urls_async(data_urls, update_cache, _is_url_excluded_wrapper)
+    _schedule_state["tick_interval"] = compute_tick_interval(data_urls)
+
+    readiness = get_backend_readiness()
+    recovered = readiness.take_recovered() if readiness is not None else set()
+
+    carried: List[Dict[str, Any]] = []
+    to_check = data_urls
+    if only_due:
+        slice_index = next_sample_slice()
+        _schedule_state["current_slice"] = slice_index
+        to_check, carried = select_due_urls(
+            data_urls, _test_results_cache.snapshot(), slice_index=slice_index
+        )
+        carried = [r for r in carried if not _is_url_excluded_wrapper(r["url"])]
+        if recovered:
+            # Backends that got ready endpoints back: recheck their URLs now
+            due_keys = {result_key(data) for data in to_check}
+            rechecked = [
+                data
+                for data in data_urls
+                if backend_key(data) in recovered and result_key(data) not in due_keys
+            ]
+            rechecked_keys = {result_key(d) for d in rechecked}
+            to_check = to_check + rechecked
+            carried = [r for r in carried if result_key(r) not in rechecked_keys]
+        if carried:
+            logger.debug(
+                f"⏱️ {len(to_check)} URLs à tester, {len(carried)} pas encore dues"
+            )
+
+    # Each result is published to the store as soon as its probe completes;
+    # carried results are already there.
+    on_result = _publish_result if update_cache else None
+
+    # URLs under a maintenance silence with skip_probes are not probed
+    silences = get_silence_store()
+    silences.prune()
+    maintenance: List[Dict[str, Any]] = []
+    probed = []
+    for data in to_check:
+        reason = silences.skip_reason(data)
+        if reason is None:
+            probed.append(data)
+        elif not _is_url_excluded_wrapper(data.get("url", "")):
+            result = make_skipped_result(data, 0, reason)
+            result["healthy"] = None
+            maintenance.append(result)
+    to_check = probed
+    if maintenance:
+        logger.info(f"🔇 {len(maintenance)} URLs en maintenance non testées")
+        if on_result is not None:
+            for result in maintenance:
+                on_result(result)
+
+    # URLs whose backend has no ready endpoint are down without a probe
+    down: List[Dict[str, Any]] = []
+    if readiness is not None:
+        probed = []
+        for data in to_check:
+            reason = readiness.down_reason(data)
+            if reason is None:
+                probed.append(data)
+            elif not _is_url_excluded_wrapper(data.get("url", "")):
+                down.append(make_skipped_result(data, 503, reason))
+        to_check = probed
+        if down:
+            logger.info(f"🔌 {len(down)} URLs signalées sans test (backend sans endpoint prêt)")
+            if on_result is not None:
+                for result in down:
+                    on_result(result)
+
+    engine = get_check_engine()
+    if engine is not None:
+        results = await engine.check_urls(
+            to_check, _is_url_excluded_wrapper, on_result=on_result
+        )
+    else:
+        results = await check_urls_async(
+            to_check, update_cache, _is_url_excluded_wrapper, on_result=on_result
+        )
+    if carried or maintenance or down:
+        results = carried + maintenance + down + results
 
     if update_cache:
-        _test_results_cache["results"] = results
-        _test_results_cache["last_updated"] = datetime.now()
+        # Forget URLs that disappeared from the inventory or got excluded
+        inventory_keys = [
+            result_key(data)
+            for data in data_urls
+            if not _is_url_excluded_wrapper(data.get("url", ""))
+        ]
+        removed = _test_results_cache.retain(inventory_keys)
+        latency_history = get_latency_history()
+        if latency_history is not None:
+            latency_history.forget(inventory_keys)
+        history = get_url_history()
+        if history is not None:
+            history.forget(inventory_keys)
+        history_db = get_history_db()
+        if history_db is not None:
+            history_db.end_cycle()
+        sla = get_sla_tracker()
+        if sla is not None:
+            sla.forget(inventory_keys)
+        sketches = get_latency_sketches()
+        if sketches is not None:
+            sketches.forget(inventory_keys)
+        detector = get_anomaly_detector()
+        if detector is not None:
+            detector.forget(inventory_keys)
+            _notify_anomalies(detector.end_cycle())
+        tracker = get_health_tracker()
+        if tracker is not None:
+            tracker.forget(inventory_keys)
+            tracker.save()
+        journal = get_event_journal()
+        if journal is not None:
+            journal.sync_inventory(inventory_keys)
+            journal.flush()
+        cycle_completed()
+        maybe_save_snapshot(_test_results_cache)
+        if removed:
+            logger.debug(f"🧹 {removed} résultats obsolètes retirés")
 
         # Only run Swagger discovery if explicitly requested
         if run_swagger and AUTOSWAGGER_AVAILABLE:
@@ -160,22 +383,8 @@ async def _run_url_tests(
 
 def _prepare_template_data(results: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Prepare data for template rendering"""
-    # Calculate status counts
-    status_counts = {
-        "success": 0,
-        "client_errors": 0,
-        "server_errors": 0,
-        "total": len(results),
-    }
-
-    for result in results:
-        status = result.get("status", 0)
-        if 200 <= status < 300:
-            status_counts["success"] += 1
-        elif 400 <= status < 500:
-            status_counts["client_errors"] += 1
-        elif 500 <= status < 600:
-            status_counts["server_errors"] += 1
+    # Status counts are maintained incrementally by the results store
+    status_counts = _test_results_cache.status_counts()
 
     # Calculate swagger counts
     swagger_results = _swagger_cache.get("results", [])
@@ -194,7 +403,7 @@ def _prepare_template_data(results: List[Dict[str, Any]]) -> Dict[str, Any]:
         "swagger_data": swagger_results,
         "autoswagger_enabled": AUTOSWAGGER_AVAILABLE,
         "version": get_app_version(),
-        "last_updated": _test_results_cache.get("last_updated"),
+        "last_updated": _test_results_cache["last_updated"],
     }
 
 
@@ -212,22 +421,160 @@ def api_urls():
     """API endpoint returning URL check results as JSON"""
     # Only run tests if cache is completely empty
     # This avoids running tests on every page load
-    if not _test_results_cache["results"] and not _test_results_cache.get(
-        "last_updated"
-    ):
-        asyncio.run(_run_url_tests())
+    # (not when the background loop is already running the first cycle)
+    if not len(_test_results_cache) and not _test_results_cache.last_updated and not background_running():
+        run_coroutine(_run_url_tests())
+
+    # Lock-free snapshot; version lets clients skip unchanged payloads.
+    version = _test_results_cache.version
+    last_updated = _test_results_cache.last_updated
+
+    # Results are not all refreshed on every cycle (per-URL intervals,
+    # sampled mode): expose how old each entry is.
+    now = time.time()
+    results = [
+        {**result, "id": url_id(result), "age_seconds": result_age(result, now)}
+        for result in _test_results_cache.snapshot()
+    ]
+    detector = get_anomaly_detector()
+    anomalies = detector.anomalies() if detector is not None else {}
+    if anomalies:
+        for result in results:
+            anomaly = anomalies.get(result["id"])
+            if anomaly is not None:
+                result["anomaly"] = anomaly
 
     return jsonify(
         {
-            "results": _test_results_cache["results"],
-            "last_updated": _test_results_cache["last_updated"].isoformat()
-            if _test_results_cache["last_updated"]
-            else None,
-            "total": len(_test_results_cache["results"]),
+            "results": results,
+            "last_updated": last_updated.isoformat() if last_updated else None,
+            "version": version,
+            "total": len(results),
+            # Results restored at startup, until the first live cycle
+            "stale": is_stale(),
+            "sampling": {
+                "slices": SAMPLING_SLICES,
+                "current_slice": _schedule_state["current_slice"],
+                "coverage_seconds": SAMPLING_SLICES * get_tick_interval(),
+            },
         }
     )
 
 
+@app.route("/api/urls/<rid>/history")
+def api_url_history(rid: str):
+    """Recent results of a URL (id from /api/urls), oldest first.
+
+    Query parameters: since (epoch seconds), limit (latest N samples).
+    """
+    history = get_url_history()
+    if history is None:
+        return jsonify({"error": "Historique désactivé (URL_HISTORY)", "status": "error"}), 503
+    try:
+        since = float(request.args.get("since", 0))
+        limit = request.args.get("limit", type=int)
+    except ValueError:
+        return jsonify({"error": "since: timestamp attendu", "status": "error"}), 400
+    data = history.query(rid, since=since, limit=limit)
+    if data is None:
+        return jsonify({"error": "Aucun historique pour cette URL", "status": "error"}), 404
+    return jsonify({**data, "status": "ok"})
+
+
+@app.route("/api/urls/<rid>/timeseries")
+def api_url_timeseries(rid: str):
+    """Stored history of a URL from the SQLite store.
+
+    Query parameters: from / to (epoch seconds, default last 24 h) and
+    resolution (raw, 1m, 1h or auto: the coarsest that fits the range).
+    """
+    history_db = get_history_db()
+    if history_db is None:
+        return jsonify({"error": "Historique persistant désactivé (HISTORY_DB)", "status": "error"}), 503
+    try:
+        until = float(request.args.get("to", time.time()))
+        since = float(request.args.get("from", until - 86400))
+        data = history_db.query(
+            rid, since, until, resolution=request.args.get("resolution", "auto")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    if data is None:
+        return jsonify({"error": "Aucun historique pour cette URL", "status": "error"}), 404
+    return jsonify({**data, "status": "ok"})
+
+
+@app.route("/api/sla")
+def api_sla():
+    """Availability and error-budget burn rate per group over a window.
+
+    Query parameters: window (24h, 7d, 30d) and group_by (url,
+    namespace, cluster).
+    """
+    sla = get_sla_tracker()
+    if sla is None:
+        return jsonify({"error": "Suivi SLA désactivé (SLA_TRACKING)", "status": "error"}), 503
+    window = request.args.get("window", "24h")
+    group_by = request.args.get("group_by", "url")
+    try:
+        groups = sla.report(window, group_by)
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    return jsonify(
+        {
+            "window": window,
+            "group_by": group_by,
+            "target": sla.target,
+            "groups": groups,
+            "total": len(groups),
+            "status": "ok",
+        }
+    )
+
+
+@app.route("/api/latency")
+def api_latency():
+    """Response time quantiles (ms) over the sliding window.
+
+    Query parameter: group_by (url, namespace, cluster).
+    """
+    sketches = get_latency_sketches()
+    if sketches is None:
+        return jsonify({"error": "Quantiles de latence désactivés (LATENCY_SKETCHES)", "status": "error"}), 503
+    group_by = request.args.get("group_by", "url")
+    try:
+        groups = sketches.report(group_by)
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    return jsonify(
+        {
+            "window_seconds": sketches.window_seconds,
+            "group_by": group_by,
+            "groups": groups,
+            "total": len(groups),
+            "status": "ok",
+        }
+    )
+
+
+@app.route("/api/events")
+def api_events():
+    """State changes after a cursor, oldest first.
+
+    Query parameters: after (cursor, the next_cursor of the previous
+    page; 0 = oldest retained event) and limit.
+    """
+    journal = get_event_journal()
+    if journal is None:
+        return jsonify({"error": "Journal d'événements désactivé (EVENT_JOURNAL)", "status": "error"}), 503
+    try:
+        after = int(request.args.get("after", 0))
+        limit = int(request.args.get("limit", 500))
+    except ValueError:
+        return jsonify({"error": "after / limit: entier attendu", "status": "error"}), 400
+    return jsonify({**journal.read(after, limit), "status": "ok"})
+
+
 @app.route("/api/swagger")
 def api_swagger():
     """API endpoint returning Swagger discovery results"""
@@ -257,7 +604,7 @@ def scan_swagger_url(url: str):
         logger.info(f"🔍 Scan Swagger demandé pour: {url}")
 
         # Run Swagger discovery for this specific URL
-        swagger_results = asyncio.run(discover_swagger_for_portal_checker([url]))
+        swagger_results = run_coroutine(discover_swagger_for_portal_checker([url]))
 
         if swagger_results:
             # Update cache with new result (merge with existing)
@@ -346,9 +693,10 @@ def refresh_status():
             if _refresh_state["finished_at"]
             else None,
             "last_error": _refresh_state["last_error"],
-            "last_results_updated": _test_results_cache["last_updated"].isoformat()
-            if _test_results_cache["last_updated"]
+            "last_results_updated": _test_results_cache.last_updated.isoformat()
+            if _test_results_cache.last_updated
             else None,
+            "results_version": _test_results_cache.version,
         }
     )
 
@@ -483,12 +831,60 @@ def get_excluded_urls():
         return jsonify({"error": str(e), "status": "error"}), 500
 
 
+@app.route("/api/silences", methods=["GET"])
+def list_silences():
+    """Current and upcoming silences (expired ones are dropped)"""
+    store = get_silence_store()
+    store.prune()
+    silences = [silence.describe() for silence in store.list()]
+    return jsonify({"silences": silences, "count": len(silences), "status": "ok"})
+
+
+@app.route("/api/silences", methods=["POST"])
+def create_silence():
+    """Create a silence.
+
+    Body: {"matchers": {"namespaces": [...], "hosts": [...], "labels": {...}},
+    "duration_minutes": 60 (or "starts_at"/"ends_at"), "comment": "...",
+    "skip_probes": false}
+    """
+    data = request.get_json(silent=True)
+    try:
+        silence = silence_from_dict(data)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    get_silence_store().add(silence)
+    return jsonify({"silence": silence.describe(), "status": "ok"}), 201
+
+
+@app.route("/api/silences/<silence_id>", methods=["DELETE"])
+def expire_silence(silence_id: str):
+    """End a silence now"""
+    if not get_silence_store().expire(silence_id):
+        return jsonify({"error": "Silence introuvable", "status": "error"}), 404
+    return jsonify({"message": f"Silence {silence_id} expiré", "status": "ok"})
+
+
 @app.route("/health")
 def health():
     """Health check endpoint"""
     return {"status": "ok"}, 200
 
 
+@app.route("/livez")
+def livez():
+    """Liveness: fails when the check loop stopped publishing results"""
+    alive, details = liveness()
+    return jsonify({**details, "status": "ok" if alive else "error"}), 200 if alive else 503
+
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: results can be served (possibly stale from a snapshot)"""
+    ready, details = readiness(_test_results_cache)
+    return jsonify({**details, "status": "ok" if ready else "starting"}), 200 if ready else 503
+
+
 @app.route("/memory")
 def memory():
     """Memory usage endpoint"""
@@ -513,6 +909,12 @@ def memory():
         return jsonify({"error": str(e), "status": "error"}), 500
 
 
+@app.route("/api/metrics")
+def api_metrics():
+    """Runtime metrics of the check engine (probe phases, cycle stats...)"""
+    return jsonify(collect_metrics())
+
+
 @app.route("/static/favicon.ico")
 def favicon():
     """Serve favicon"""
@@ -522,24 +924,15 @@ def favicon():
 
 
 def refresh_urls_if_needed():
-    """Auto-refresh URLs on startup if configured"""
+    """Warm start from the last snapshot and schedule the initial check.
+
+    The initial check (and discovery) runs as the first cycle of the
+    background loop, once the server is listening; until it completes
+    /api/urls serves the restored results marked stale.
+    """
+    load_snapshot(_test_results_cache)
     if not AUTO_REFRESH_ON_START:
         logger.info("🔄 Auto-refresh désactivé au démarrage")
         return
-
-    try:
-        if not os.path.exists(URLS_FILE):
-            logger.info("🔄 Fichier des URLs non trouvé, génération automatique...")
-            urls_data = get_all_urls_with_details()
-            save_urls_to_file(urls_data, URLS_FILE)
-            logger.info(f"✅ {len(urls_data)} URLs découvertes et sauvegardées")
-        else:
-            logger.info("📋 Fichier des URLs existant trouvé")
-
-        # Run initial URL tests with SSL info
-        logger.info("🔄 Lancement des tests initiaux avec récupération SSL...")
-        asyncio.run(_run_url_tests(update_cache=True))
-        logger.info("✅ Tests initiaux terminés")
-
-    except Exception as e:
-        logger.error(f"❌ Erreur lors du refresh automatique: {e}")
+    request_initial_cycle()
+    logger.info("🔄 Tests initiaux planifiés en tâche de fond")
@@ -12,7 +12,8 @@ from .config import (  # noqa: F401
     PORT,
     URLS_FILE,
 )
-from .main import main, setup_logger
+from .logging_config import setup_logger
+from .main import main
 from .utils import get_app_version
 
 # For backwards compatibility, expose the main Flask app
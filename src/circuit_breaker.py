@@ -0,0 +1,157 @@
+"""
+Per-host circuit breaker: stop probing hosts that don't accept connections
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from .config import (
+    CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_THRESHOLD,
+)
+from .metrics import register_metrics_provider
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def host_key(url: str) -> str:
+    """host:port a URL connects to (https assumed without scheme)"""
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    port = parsed.port or (80 if parsed.scheme == "http" else 443)
+    return f"{(parsed.hostname or '').lower()}:{port}"
+
+
+def is_connect_failure(result: Dict[str, Any]) -> bool:
+    """True if the probe never got an HTTP response (timeout, refused...).
+
+    Any HTTP status, even 5xx, means the host is reachable.
+    """
+    status = result.get("status")
+    details = result.get("details") or ""
+    if status == 408:
+        return True
+    return status == 503 and details.startswith(("Connection Error", "DNS Error"))
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at", "probe_in_flight", "last_failure")
+
+    def __init__(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.last_failure: Tuple[int, str] = (503, "")
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit per host.
+
+    ``threshold`` consecutive connect failures or timeouts open the circuit:
+    URLs of the host then report the last failure without being probed.
+    After ``cooldown`` seconds a single probe is let through (half-open);
+    its outcome closes the circuit or opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+        self.short_circuited = 0
+
+    def allow(self, host: str, now: Optional[float] = None) -> bool:
+        """Whether a URL of this host may be probed now"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN and now - circuit.opened_at >= self.cooldown:
+                circuit.state = HALF_OPEN
+                circuit.probe_in_flight = False
+            if circuit.state == HALF_OPEN and not circuit.probe_in_flight:
+                circuit.probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, host: str, result: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Update the host circuit with the outcome of a probe"""
+        now = time.monotonic() if now is None else now
+        failed = is_connect_failure(result)
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                if not failed:
+                    return
+                circuit = self._circuits[host] = _Circuit()
+            if not failed:
+                if circuit.state != CLOSED:
+                    logger.info(f"✅ Circuit fermé pour {host}")
+                del self._circuits[host]
+                return
+            circuit.failures += 1
+            circuit.last_failure = (result.get("status", 503), result.get("details", ""))
+            circuit.probe_in_flight = False
+            if circuit.state == HALF_OPEN or (
+                circuit.state == CLOSED and circuit.failures >= self.threshold
+            ):
+                if circuit.state == CLOSED:
+                    logger.warning(
+                        f"⚠️ Circuit ouvert pour {host} après {circuit.failures} échecs de connexion"
+                    )
+                circuit.state = OPEN
+                circuit.opened_at = now
+
+    def cached_failure(self, host: str) -> Tuple[int, str]:
+        """Status and details reported for URLs of an open circuit"""
+        circuit = self._circuits.get(host)
+        status, details = circuit.last_failure if circuit else (503, "")
+        return status, f"Hôte injoignable (circuit ouvert): {details}".rstrip(": ")
+
+    def state(self, host: str) -> str:
+        circuit = self._circuits.get(host)
+        return circuit.state if circuit else CLOSED
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            open_hosts = sorted(
+                host for host, c in self._circuits.items() if c.state != CLOSED
+            )
+        return {
+            "open": len(open_hosts),
+            "hosts": open_hosts[:50],
+            "short_circuited": self.short_circuited,
+        }
+
+
+_breaker_state: Dict[str, Optional[CircuitBreaker]] = {"breaker": None}
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Shared breaker when CIRCUIT_BREAKER_ENABLED, else None"""
+    if not CIRCUIT_BREAKER_ENABLED:
+        return None
+    with _breaker_lock:
+        if _breaker_state["breaker"] is None:
+            _breaker_state["breaker"] = CircuitBreaker(
+                CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN_SECONDS
+            )
+        return _breaker_state["breaker"]
+
+
+def _metrics() -> Dict[str, Any]:
+    breaker = get_circuit_breaker()
+    return breaker.snapshot() if breaker else {"enabled": False}
+
+
+register_metrics_provider("circuit_breaker", _metrics)
@@ -0,0 +1,193 @@
+"""
+Latency-driven adaptive concurrency (AIMD) for URL probes
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+from .config import (
+    ADAPTIVE_CONCURRENCY,
+    ADAPTIVE_CONCURRENCY_MAX,
+    ADAPTIVE_CONCURRENCY_MIN,
+    MAX_CONCURRENT_REQUESTS,
+)
+from .metrics import register_metrics_provider
+
+# Probes per decision window
+WINDOW_SIZE = 10
+# Multiplicative decrease applied on a latency or timeout spike
+BACKOFF_FACTOR = 0.7
+# A window is a spike when its mean connect time exceeds
+# baseline * LATENCY_TOLERANCE + LATENCY_SLACK_MS...
+LATENCY_TOLERANCE = 2.0
+LATENCY_SLACK_MS = 20.0
+# ...or when its timeout rate exceeds the baseline rate by this much
+TIMEOUT_RATE_TOLERANCE = 0.1
+# Weight of each window in the baselines (EWMA)
+BASELINE_ALPHA = 0.1
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted with additive increase / multiplicative
+    decrease, shared by every cycle so it survives between them.
+
+    The limit grows by one per window while the window was saturated (the
+    limit actually constrained probes) and connect latency and timeouts
+    stay close to their baselines. A spike cuts it by BACKOFF_FACTOR,
+    never below the floor.
+    """
+
+    def __init__(self, floor: int, ceiling: int) -> None:
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = self.floor
+        self.increases = 0
+        self.decreases = 0
+        self.baseline_connect_ms: Optional[float] = None
+        self.baseline_timeout_rate: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._samples = 0
+        self._timeouts = 0
+        self._connect_total = 0.0
+        self._connect_count = 0
+        self._saturated = False
+
+    def mark_saturated(self) -> None:
+        self._saturated = True
+
+    def on_result(self, result: Dict[str, Any]) -> None:
+        """Feed the outcome of one probe"""
+        timings = result.get("timings") or {}
+        with self._lock:
+            self._samples += 1
+            if result.get("status") == 408:
+                self._timeouts += 1
+            connect = timings.get("tcp_connect")
+            if connect is not None:
+                # Reused connections have no connect phase and are skipped
+                self._connect_total += connect + timings.get("tls_handshake", 0.0)
+                self._connect_count += 1
+            if self._samples >= WINDOW_SIZE:
+                self._evaluate_window()
+
+    def _evaluate_window(self) -> None:
+        timeout_rate = self._timeouts / self._samples
+        connect_ms = (
+            self._connect_total / self._connect_count if self._connect_count else None
+        )
+
+        spike = False
+        if (
+            self.baseline_timeout_rate is not None
+            and timeout_rate > self.baseline_timeout_rate + TIMEOUT_RATE_TOLERANCE
+        ):
+            spike = True
+        if (
+            connect_ms is not None
+            and self.baseline_connect_ms is not None
+            and connect_ms > self.baseline_connect_ms * LATENCY_TOLERANCE + LATENCY_SLACK_MS
+        ):
+            spike = True
+
+        if spike:
+            new_limit = max(self.floor, int(self.limit * BACKOFF_FACTOR))
+            if new_limit < self.limit:
+                self.decreases += 1
+            self.limit = new_limit
+        elif self._saturated and self.limit < self.ceiling:
+            self.limit += 1
+            self.increases += 1
+
+        self.baseline_timeout_rate = _ewma(self.baseline_timeout_rate, timeout_rate)
+        if connect_ms is not None:
+            self.baseline_connect_ms = _ewma(self.baseline_connect_ms, connect_ms)
+        self._reset_window()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "floor": self.floor,
+            "ceiling": self.ceiling,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "baseline_connect_ms": round(self.baseline_connect_ms, 1)
+            if self.baseline_connect_ms is not None
+            else None,
+            "baseline_timeout_rate": round(self.baseline_timeout_rate, 3)
+            if self.baseline_timeout_rate is not None
+            else None,
+        }
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return value
+    return previous + BASELINE_ALPHA * (value - previous)
+
+
+class ConcurrencyGate:
+    """Per-cycle async gate admitting at most ``limiter.limit`` probes"""
+
+    def __init__(self, limiter: AdaptiveLimiter) -> None:
+        self._limiter = limiter
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> "ConcurrencyGate":
+        async with self._condition:
+            if self._in_flight >= self._limiter.limit:
+                self._limiter.mark_saturated()
+                self._waiting += 1
+                try:
+                    await self._condition.wait_for(
+                        lambda: self._in_flight < self._limiter.limit
+                    )
+                finally:
+                    self._waiting -= 1
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            if self._waiting:
+                # Probes are queued behind the limit: it is the bottleneck
+                self._limiter.mark_saturated()
+            # The limit may have grown meanwhile: wake every free slot
+            self._condition.notify(max(1, self._limiter.limit - self._in_flight))
+
+
+_limiter_state: Dict[str, Optional[AdaptiveLimiter]] = {"limiter": None}
+_limiter_lock = threading.Lock()
+
+
+def get_adaptive_limiter() -> Optional[AdaptiveLimiter]:
+    """Shared limiter when ADAPTIVE_CONCURRENCY is enabled, else None"""
+    if not ADAPTIVE_CONCURRENCY:
+        return None
+    with _limiter_lock:
+        if _limiter_state["limiter"] is None:
+            _limiter_state["limiter"] = AdaptiveLimiter(
+                ADAPTIVE_CONCURRENCY_MIN, ADAPTIVE_CONCURRENCY_MAX
+            )
+        return _limiter_state["limiter"]
+
+
+def concurrency_ceiling() -> int:
+    """Highest number of probes that can run at once"""
+    return ADAPTIVE_CONCURRENCY_MAX if ADAPTIVE_CONCURRENCY else MAX_CONCURRENT_REQUESTS
+
+
+def _metrics() -> Dict[str, Any]:
+    limiter = get_adaptive_limiter()
+    if limiter is None:
+        return {"mode": "fixed", "limit": MAX_CONCURRENT_REQUESTS}
+    return {"mode": "adaptive", **limiter.snapshot()}
+
+
+register_metrics_provider("concurrency", _metrics)
@@ -26,9 +26,122 @@ CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "30"))  # 30 seconds
 # How often the background task should re-discover URLs from Kubernetes.
 # Independent from KUBERNETES_POLL_INTERVAL (which is the K8s API call cache TTL).
 DISCOVERY_INTERVAL = int(os.getenv("DISCOVERY_INTERVAL", str(KUBERNETES_POLL_INTERVAL)))
+# Rolling sampled checking: the inventory is split into SAMPLING_SLICES
+# rotating slices and one slice is probed per cycle (1 = probe everything).
+# Failing URLs are probed on every cycle regardless of their slice.
+SAMPLING_SLICES = max(1, int(os.getenv("SAMPLING_SLICES", "1")))
 # SSL certificate info cache TTL (certs don't change frequently).
 SSL_CACHE_TTL_SECONDS = int(os.getenv("SSL_CACHE_TTL_SECONDS", "3600"))  # 1 hour
 
+# Per-phase probe budgets in seconds, 0 = only REQUEST_TIMEOUT applies.
+# The first-byte budget also bounds every later read of the response.
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "0")) or None
+TLS_TIMEOUT = float(os.getenv("TLS_TIMEOUT", "0")) or None
+FIRST_BYTE_TIMEOUT = float(os.getenv("FIRST_BYTE_TIMEOUT", "0")) or None
+# Derive each URL's budgets from its own latency history:
+# p99 x ADAPTIVE_TIMEOUT_FACTOR, capped by the static budgets above.
+ADAPTIVE_TIMEOUTS = os.getenv("ADAPTIVE_TIMEOUTS", "false").lower() == "true"
+ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv("ADAPTIVE_TIMEOUT_FACTOR", "3"))
+
+# AIMD concurrency: start at the floor, add one slot per stable window,
+# back off multiplicatively on connect-latency or timeout spikes. When
+# disabled, MAX_CONCURRENT_REQUESTS is a fixed limit.
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "false").lower() == "true"
+ADAPTIVE_CONCURRENCY_MIN = int(os.getenv("ADAPTIVE_CONCURRENCY_MIN", "5"))
+ADAPTIVE_CONCURRENCY_MAX = int(os.getenv("ADAPTIVE_CONCURRENCY_MAX", "200"))
+
+# Probe https URLs over HTTP/2 (ALPN, falls back to HTTP/1.1): probes of
+# one host, and of hosts sharing an IP and certificate, are multiplexed
+# over a single connection.
+HTTP2_PROBES = os.getenv("HTTP2_PROBES", "false").lower() == "true"
+
+# Per-host circuit breaker: after CIRCUIT_BREAKER_THRESHOLD consecutive
+# connect failures/timeouts, URLs of the host report the cached failure
+# and a single probe is let through every CIRCUIT_BREAKER_COOLDOWN_SECONDS.
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "false").lower() == "true"
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "3"))
+CIRCUIT_BREAKER_COOLDOWN_SECONDS = int(os.getenv("CIRCUIT_BREAKER_COOLDOWN_SECONDS", "300"))
+
+# Run every event loop (checks, API, Hypercorn) on uvloop when installed.
+USE_UVLOOP = os.getenv("USE_UVLOOP", "false").lower() == "true"
+
+# Worker processes running the probes, each with its own event loop and
+# connection pool ("auto" = container CPU limit). 1 keeps the probes on
+# the background thread of the main process.
+CHECK_WORKERS = os.getenv("CHECK_WORKERS", "1")
+# Time a worker gets to return the results of its shard; beyond it the
+# worker is restarted and the missing URLs are reported as timeouts.
+CHECK_WORKER_TIMEOUT_SECONDS = int(os.getenv("CHECK_WORKER_TIMEOUT_SECONDS", "300"))
+
+# DNS cache shared across check cycles. Record TTLs are honored when the
+# optional aiodns package is installed, DNS_CACHE_MAX_TTL_SECONDS is both
+# the cap and the TTL used with the system resolver.
+DNS_CACHE_ENABLED = os.getenv("DNS_CACHE_ENABLED", "true").lower() == "true"
+DNS_CACHE_MAX_TTL_SECONDS = int(os.getenv("DNS_CACHE_MAX_TTL_SECONDS", "300"))
+DNS_NEGATIVE_TTL_SECONDS = int(os.getenv("DNS_NEGATIVE_TTL_SECONDS", "30"))
+# Resolve every unique host concurrently before probing; URLs whose host
+# does not exist (NXDOMAIN) are reported immediately without an HTTP attempt.
+DNS_PRERESOLVE = os.getenv("DNS_PRERESOLVE", "false").lower() == "true"
+
+# Connect to the load-balancer address published in each route's Ingress /
+# Gateway status instead of resolving the host through public DNS (SNI and
+# Host header unchanged). Routes without an address are reported at once
+# and hosts whose DNS doesn't point at their load balancer are flagged.
+LB_PINNING = os.getenv("LB_PINNING", "false").lower() == "true"
+
+# Labels substituted for "*" in wildcard Ingress/HTTPRoute hosts (e.g.
+# "www,status"). Without them (and without a portal-checker.io/probe-hosts
+# annotation) wildcard routes are reported as not probeable.
+WILDCARD_HOST_LABELS = [
+    label.strip()
+    for label in os.getenv("WILDCARD_HOST_LABELS", "").split(",")
+    if label.strip()
+]
+
+# Watch EndpointSlices: URLs whose backend Service has no ready endpoint
+# are reported down without a probe, and rechecked as soon as it recovers.
+ENDPOINT_READINESS = os.getenv("ENDPOINT_READINESS", "false").lower() == "true"
+
+# Keep the last URL_HISTORY_SAMPLES results of every URL in memory
+# (/api/urls/<id>/history). URL_HISTORY_MEMORY_MB is a hard cap: with many
+# URLs, fewer samples are kept per URL.
+URL_HISTORY = os.getenv("URL_HISTORY", "false").lower() == "true"
+URL_HISTORY_SAMPLES = int(os.getenv("URL_HISTORY_SAMPLES", "1000"))
+URL_HISTORY_MEMORY_MB = int(os.getenv("URL_HISTORY_MEMORY_MB", "64"))
+
+# Durable history in SQLite (WAL) at HISTORY_DB_PATH: raw samples plus
+# 1-minute and 1-hour rollups, each pruned after its own retention.
+HISTORY_DB = os.getenv("HISTORY_DB", "false").lower() == "true"
+HISTORY_DB_PATH = os.getenv(
+    "HISTORY_DB_PATH",
+    "config/history.db" if FLASK_ENV == "development" else "/app/data/history.db",
+)
+HISTORY_RAW_RETENTION_HOURS = float(os.getenv("HISTORY_RAW_RETENTION_HOURS", "48"))
+HISTORY_MINUTE_RETENTION_DAYS = float(os.getenv("HISTORY_MINUTE_RETENTION_DAYS", "14"))
+HISTORY_HOUR_RETENTION_DAYS = float(os.getenv("HISTORY_HOUR_RETENTION_DAYS", "400"))
+
+# Rolling availability counters per URL / namespace / cluster behind
+# /api/sla, with error-budget burn rates against SLA_TARGET (percent).
+SLA_TRACKING = os.getenv("SLA_TRACKING", "false").lower() == "true"
+SLA_TARGET = float(os.getenv("SLA_TARGET", "99.9")) / 100
+
+# Response time p50/p95/p99 per URL / namespace / cluster over the last
+# LATENCY_WINDOW_MINUTES, from DDSketches (/api/latency).
+LATENCY_SKETCHES = os.getenv("LATENCY_SKETCHES", "false").lower() == "true"
+LATENCY_WINDOW_MINUTES = int(os.getenv("LATENCY_WINDOW_MINUTES", "60"))
+
+# Per-URL EWMA baselines of latency and error rate, scored after every
+# cycle (optional numpy extra). A latency is anomalous ANOMALY_Z_THRESHOLD
+# standard deviations and ANOMALY_MIN_DELTA_MS above its mean, an error
+# rate when its short-term average exceeds the baseline by
+# ANOMALY_ERROR_DELTA. URLs need ANOMALY_MIN_SAMPLES checks first.
+ANOMALY_DETECTION = os.getenv("ANOMALY_DETECTION", "false").lower() == "true"
+ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.1"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4"))
+ANOMALY_MIN_DELTA_MS = float(os.getenv("ANOMALY_MIN_DELTA_MS", "50"))
+ANOMALY_ERROR_DELTA = float(os.getenv("ANOMALY_ERROR_DELTA", "0.3"))
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "10"))
+
 # Swagger Discovery Configuration
 SWAGGER_DISCOVERY_INTERVAL = int(
     os.getenv("SWAGGER_DISCOVERY_INTERVAL", "3600")
@@ -45,6 +158,11 @@ EXCLUDED_URLS_FILE = os.getenv(
     if FLASK_ENV == "development"
     else "/app/config/excluded-urls.yaml",
 )
+# Silences (maintenance windows) created through /api/silences
+SILENCES_FILE = os.getenv(
+    "SILENCES_FILE",
+    "config/silences.yaml" if FLASK_ENV == "development" else "/app/data/silences.yaml",
+)
 
 # SSL Configuration
 CUSTOM_CERT: Optional[str] = os.getenv("CUSTOM_CERT")
@@ -65,6 +183,52 @@ ENABLE_SLACK_NOTIFICATIONS = (
     os.getenv("ENABLE_SLACK_NOTIFICATIONS", "false").lower() == "true"
 )
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
+# Slack alerts are queued (ALERT_QUEUE_SIZE, extra alerts are dropped),
+# grouped per ALERT_BATCH_WINDOW_SECONDS into one message, posted at most
+# once per ALERT_MIN_INTERVAL_SECONDS and retried ALERT_MAX_RETRIES times.
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "1000"))
+ALERT_BATCH_WINDOW_SECONDS = float(os.getenv("ALERT_BATCH_WINDOW_SECONDS", "10"))
+ALERT_MIN_INTERVAL_SECONDS = float(os.getenv("ALERT_MIN_INTERVAL_SECONDS", "1"))
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES", "3"))
+# Alerts are sent on state transitions only: a URL is down after
+# ALERT_FAILURE_THRESHOLD consecutive failures, up again after
+# ALERT_RECOVERY_THRESHOLD consecutive successes, and flapping when its
+# outcome changed ALERT_FLAP_THRESHOLD times over its last 20 probes
+# (0 = no flap detection). States survive restarts in ALERT_STATE_FILE.
+ALERT_FAILURE_THRESHOLD = int(os.getenv("ALERT_FAILURE_THRESHOLD", "2"))
+ALERT_RECOVERY_THRESHOLD = int(os.getenv("ALERT_RECOVERY_THRESHOLD", "2"))
+ALERT_FLAP_THRESHOLD = int(os.getenv("ALERT_FLAP_THRESHOLD", "6"))
+ALERT_STATE_FILE = os.getenv(
+    "ALERT_STATE_FILE",
+    "config/alert-state.json" if FLASK_ENV == "development" else "/app/data/alert-state.json",
+)
+
+# Warm start: results and certificate info are saved to SNAPSHOT_FILE
+# every SNAPSHOT_INTERVAL_SECONDS and on shutdown, and served (marked
+# stale) at startup while the first live cycle runs in the background.
+# Snapshots older than SNAPSHOT_MAX_AGE_HOURS are ignored; an empty
+# SNAPSHOT_FILE disables them.
+SNAPSHOT_FILE = os.getenv(
+    "SNAPSHOT_FILE",
+    "config/results-snapshot.json.gz" if FLASK_ENV == "development" else "/app/data/results-snapshot.json.gz",
+)
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "300"))
+SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("SNAPSHOT_MAX_AGE_HOURS", "24"))
+# /livez fails when no result was published for this long
+LIVENESS_TIMEOUT_SECONDS = int(os.getenv("LIVENESS_TIMEOUT_SECONDS", "900"))
+
+# Append-only log of state changes (down, recovered, certificate changed,
+# route added/removed) behind /api/events: JSON-lines segments of
+# EVENTS_SEGMENT_KB in EVENTS_DIR, the oldest deleted beyond
+# EVENTS_MAX_SEGMENTS; the last EVENTS_TAIL events are also kept in memory.
+EVENT_JOURNAL = os.getenv("EVENT_JOURNAL", "false").lower() == "true"
+EVENTS_DIR = os.getenv(
+    "EVENTS_DIR",
+    "config/events" if FLASK_ENV == "development" else "/app/data/events",
+)
+EVENTS_SEGMENT_KB = int(os.getenv("EVENTS_SEGMENT_KB", "1024"))
+EVENTS_MAX_SEGMENTS = int(os.getenv("EVENTS_MAX_SEGMENTS", "16"))
+EVENTS_TAIL = int(os.getenv("EVENTS_TAIL", "10000"))
 ENABLE_AUTOSWAGGER = os.getenv("ENABLE_AUTOSWAGGER", "true").lower() == "true"
 
 # Development/Debug
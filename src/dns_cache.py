@@ -0,0 +1,249 @@
+"""
+Caching DNS resolver shared across check cycles
+"""
+
+import asyncio
+import socket
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from aiohttp.abc import AbstractResolver
+from loguru import logger
+
+from .config import DNS_CACHE_MAX_TTL_SECONDS, DNS_NEGATIVE_TTL_SECONDS
+from .metrics import register_metrics_provider
+
+# aiodns (c-ares) reports record TTLs; without it we fall back to the
+# system resolver (thread pool) and DNS_CACHE_MAX_TTL_SECONDS.
+AIODNS_AVAILABLE = False
+try:
+    import aiodns
+
+    AIODNS_AVAILABLE = True
+except ImportError:
+    aiodns = None
+
+# Floor applied to record TTLs (0 for /etc/hosts entries) so that a host
+# is never resolved more than once per cycle.
+DNS_CACHE_MIN_TTL_SECONDS = 5
+DNS_CACHE_MAX_ENTRIES = 20000
+PRERESOLVE_CONCURRENCY = 100
+
+# c-ares ARES_ENOTFOUND / ARES_ENODATA
+_ARES_NOT_FOUND = {1, 4}
+
+Address = Tuple[int, str]  # (family, ip)
+
+
+class HostNotFoundError(socket.gaierror):
+    """The host does not exist (NXDOMAIN / no address)"""
+
+    def __init__(self, host: str) -> None:
+        super().__init__(socket.EAI_NONAME, f"Host not found: {host}")
+        self.host = host
+
+
+class CachingResolver(AbstractResolver):
+    """aiohttp resolver with a TTL-aware positive and negative cache.
+
+    One instance is shared by every cycle and every event loop (background
+    thread and Flask request threads), so the cache itself is guarded by a
+    threading lock while in-flight lookups are deduplicated per loop.
+    """
+
+    def __init__(
+        self,
+        max_ttl: int = DNS_CACHE_MAX_TTL_SECONDS,
+        negative_ttl: int = DNS_NEGATIVE_TTL_SECONDS,
+        max_entries: int = DNS_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # (host, family) -> (expires_at, addresses or None for NXDOMAIN)
+        self._cache: Dict[Tuple[str, int], Tuple[float, Optional[List[Address]]]] = {}
+        self._lock = threading.Lock()
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._aiodns_resolvers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "errors": 0}
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> List[Dict[str, Any]]:
+        addresses = await self.lookup(host, family)
+        return [
+            {
+                "hostname": host,
+                "host": ip,
+                "port": port,
+                "family": addr_family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+            }
+            for addr_family, ip in addresses
+        ]
+
+    async def close(self) -> None:
+        # Shared across sessions: connectors must not close it.
+        pass
+
+    async def lookup(self, host: str, family: int = socket.AF_UNSPEC) -> List[Address]:
+        """Return cached addresses, resolving (once per loop) on a miss"""
+        key = (host, family)
+        cached = self._cache_get(key)
+        if cached is not None:
+            expires_at, addresses = cached
+            if addresses is None:
+                self.stats["negative_hits"] += 1
+                raise HostNotFoundError(host)
+            self.stats["hits"] += 1
+            return addresses
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        future = inflight.get(key)
+        if future is None:
+            self.stats["misses"] += 1
+            future = loop.create_task(self._resolve_and_cache(host, family))
+            inflight[key] = future
+            future.add_done_callback(lambda _: inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _resolve_and_cache(self, host: str, family: int) -> List[Address]:
+        key = (host, family)
+        try:
+            addresses, ttl = await self._query(host, family)
+        except HostNotFoundError:
+            self._cache_set(key, None, self.negative_ttl)
+            raise
+        except OSError:
+            # SERVFAIL, timeouts...: not cached, the next probe retries
+            self.stats["errors"] += 1
+            raise
+        if not addresses:
+            self._cache_set(key, None, self.negative_ttl)
+            raise HostNotFoundError(host)
+        if ttl is None:
+            ttl = self.max_ttl
+        self._cache_set(key, addresses, min(self.max_ttl, max(DNS_CACHE_MIN_TTL_SECONDS, ttl)))
+        return addresses
+
+    async def _query(self, host: str, family: int) -> Tuple[List[Address], Optional[int]]:
+        if AIODNS_AVAILABLE:
+            return await self._query_aiodns(host, family)
+        return await self._query_system(host, family)
+
+    async def _query_aiodns(self, host: str, family: int) -> Tuple[List[Address], Optional[int]]:
+        loop = asyncio.get_running_loop()
+        resolver = self._aiodns_resolvers.get(loop)
+        if resolver is None:
+            resolver = aiodns.DNSResolver(loop=loop)
+            self._aiodns_resolvers[loop] = resolver
+        try:
+            result = await resolver.getaddrinfo(
+                host, family=family, port=0, type=socket.SOCK_STREAM
+            )
+        except aiodns.error.DNSError as exc:
+            if exc.args and exc.args[0] in _ARES_NOT_FOUND:
+                raise HostNotFoundError(host) from exc
+            raise OSError(None, f"DNS error for {host}: {exc}") from exc
+        addresses: List[Address] = []
+        ttls = []
+        for node in result.nodes:
+            ip = node.addr[0]
+            if isinstance(ip, bytes):
+                ip = ip.decode()
+            address = (node.family, ip)
+            if address not in addresses:
+                addresses.append(address)
+            ttls.append(node.ttl)
+        return addresses, min(ttls) if ttls else None
+
+    async def _query_system(self, host: str, family: int) -> Tuple[List[Address], Optional[int]]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(
+                host, None, family=family, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as exc:
+            if exc.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", None)):
+                raise HostNotFoundError(host) from exc
+            raise
+        addresses: List[Address] = []
+        for addr_family, _, _, _, sockaddr in infos:
+            address = (addr_family, sockaddr[0])
+            if address not in addresses:
+                addresses.append(address)
+        return addresses, None
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        return entry
+
+    def _cache_set(self, key, addresses: Optional[List[Address]], ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._cache) >= self.max_entries:
+                for stale in [k for k, (exp, _) in self._cache.items() if exp < now]:
+                    del self._cache[stale]
+                while len(self._cache) >= self.max_entries:
+                    # dicts keep insertion order: drop the oldest entry
+                    del self._cache[next(iter(self._cache))]
+            self._cache[key] = (now + ttl, addresses)
+
+    def is_known_missing(self, host: str) -> bool:
+        """True if the host is negatively cached (NXDOMAIN)"""
+        entry = self._cache_get((host, socket.AF_UNSPEC))
+        return entry is not None and entry[1] is None
+
+    async def preresolve(
+        self, hosts: Iterable[str], concurrency: int = PRERESOLVE_CONCURRENCY
+    ) -> Set[str]:
+        """Resolve all hosts concurrently, return the ones that don't exist"""
+        sem = asyncio.Semaphore(concurrency)
+        missing: Set[str] = set()
+
+        async def resolve_one(host: str) -> None:
+            async with sem:
+                try:
+                    await self.lookup(host)
+                except HostNotFoundError:
+                    missing.add(host)
+                except OSError as exc:
+                    logger.debug(f"Pré-résolution DNS échouée pour {host}: {exc}")
+
+        await asyncio.gather(*(resolve_one(host) for host in set(hosts)))
+        return missing
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._cache), "aiodns": AIODNS_AVAILABLE}
+
+
+_shared_resolver: Optional[CachingResolver] = None
+_shared_resolver_lock = threading.Lock()
+
+
+def get_shared_resolver() -> CachingResolver:
+    """Process-wide resolver, created on first use"""
+    global _shared_resolver
+    with _shared_resolver_lock:
+        if _shared_resolver is None:
+            _shared_resolver = CachingResolver()
+        return _shared_resolver
+
+
+register_metrics_provider("dns_cache", lambda: get_shared_resolver().snapshot_stats())
@@ -0,0 +1,241 @@
+"""
+Backend readiness from EndpointSlices, kept up to date by a Kubernetes watch
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from kubernetes import client, watch
+from kubernetes.client.exceptions import ApiException
+from loguru import logger
+
+from .config import ENDPOINT_READINESS
+from .metrics import register_metrics_provider
+
+SERVICE_NAME_LABEL = "kubernetes.io/service-name"
+# Server-side timeout of one watch request; the watch resumes from the
+# last resourceVersion afterwards, without relisting.
+WATCH_TIMEOUT_SECONDS = 300
+# Delay before reconnecting after an API error
+WATCH_RETRY_SECONDS = 5
+
+ServiceKey = Tuple[str, str]  # (namespace, service)
+
+
+def backend_key(data: Dict[str, Any]) -> Optional[ServiceKey]:
+    """(namespace, service) a URL is routed to, None without a backend.
+
+    The backend namespace defaults to the route's (HTTPRoute backendRefs
+    may point to another namespace).
+    """
+    backend = data.get("backend") or {}
+    service = backend.get("service")
+    if not service:
+        return None
+    return backend.get("namespace") or data.get("namespace", ""), service
+
+
+def _ready_endpoints(endpoint_slice: Any) -> int:
+    ready = 0
+    for endpoint in endpoint_slice.endpoints or []:
+        conditions = endpoint.conditions
+        # An unset condition means ready (discovery.k8s.io/v1)
+        if conditions is None or conditions.ready is None or conditions.ready:
+            ready += 1
+    return ready
+
+
+class BackendReadiness:
+    """Ready endpoint count of every Service, aggregated over its slices.
+
+    Services without any EndpointSlice (ExternalName, selector-less) are
+    unknown and their URLs are probed as usual. A Service whose slices
+    hold no ready endpoint is down: its URLs are reported without a probe.
+    When it gets ready endpoints again, its URLs are queued for an
+    immediate recheck and ``wake`` is set.
+    """
+
+    def __init__(self) -> None:
+        # (namespace, service) -> {slice name: ready endpoints}
+        self._services: Dict[ServiceKey, Dict[str, int]] = {}
+        self._recovered: Set[ServiceKey] = set()
+        self._lock = threading.Lock()
+        self.wake = threading.Event()
+        self.synced = False
+        self.short_circuited = 0
+
+    def _service_of(self, endpoint_slice: Any) -> Optional[ServiceKey]:
+        labels = endpoint_slice.metadata.labels or {}
+        service = labels.get(SERVICE_NAME_LABEL)
+        if not service:
+            return None
+        return endpoint_slice.metadata.namespace, service
+
+    def replace(self, slices: List[Any]) -> None:
+        """Reset the view from a full list of EndpointSlices"""
+        services: Dict[ServiceKey, Dict[str, int]] = {}
+        for endpoint_slice in slices:
+            key = self._service_of(endpoint_slice)
+            if key is not None:
+                services.setdefault(key, {})[endpoint_slice.metadata.name] = (
+                    _ready_endpoints(endpoint_slice)
+                )
+        with self._lock:
+            previous = {key: sum(s.values()) for key, s in self._services.items()}
+            self._services = services
+            for key, slice_counts in services.items():
+                self._transition(key, previous.get(key), sum(slice_counts.values()))
+            self.synced = True
+
+    def apply(self, event_type: str, endpoint_slice: Any) -> None:
+        """Apply one watch event (ADDED, MODIFIED, DELETED)"""
+        key = self._service_of(endpoint_slice)
+        if key is None:
+            return
+        name = endpoint_slice.metadata.name
+        with self._lock:
+            slice_counts = self._services.get(key)
+            before = sum(slice_counts.values()) if slice_counts else None
+            if event_type == "DELETED":
+                if slice_counts is None:
+                    return
+                slice_counts.pop(name, None)
+                if not slice_counts:
+                    # Service gone (or no longer selector-based): unknown
+                    del self._services[key]
+                    return
+            else:
+                slice_counts = self._services.setdefault(key, {})
+                slice_counts[name] = _ready_endpoints(endpoint_slice)
+            self._transition(key, before, sum(slice_counts.values()))
+
+    def _transition(self, key: ServiceKey, before: Optional[int], after: int) -> None:
+        namespace, service = key
+        if after == 0 and before != 0:
+            logger.warning(f"⚠️ Backend {namespace}/{service} sans endpoint prêt")
+        elif after > 0 and before == 0:
+            logger.info(f"✅ Backend {namespace}/{service} de nouveau prêt ({after} endpoints)")
+            self._recovered.add(key)
+            self.wake.set()
+
+    def ready_endpoints(self, key: ServiceKey) -> Optional[int]:
+        """Ready endpoints of a Service, None if it has no EndpointSlice"""
+        with self._lock:
+            slice_counts = self._services.get(key)
+            return sum(slice_counts.values()) if slice_counts is not None else None
+
+    def down_reason(self, data: Dict[str, Any]) -> Optional[str]:
+        """Why a URL is down without probing it, None if it must be probed"""
+        key = backend_key(data)
+        if key is None or self.ready_endpoints(key) != 0:
+            return None
+        self.short_circuited += 1
+        return f"Backend sans endpoint prêt: {key[0]}/{key[1]}"
+
+    def take_recovered(self) -> Set[ServiceKey]:
+        """Services that got ready endpoints back since the last call"""
+        with self._lock:
+            recovered, self._recovered = self._recovered, set()
+        self.wake.clear()
+        return recovered
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            down = sorted(
+                f"{ns}/{svc}" for (ns, svc), s in self._services.items() if not sum(s.values())
+            )
+            services = len(self._services)
+        return {
+            "synced": self.synced,
+            "services": services,
+            "down": len(down),
+            "down_services": down[:50],
+            "short_circuited": self.short_circuited,
+        }
+
+
+def watch_endpoint_slices(readiness: BackendReadiness, stop: threading.Event) -> None:
+    """List EndpointSlices once, then follow changes until ``stop`` is set.
+
+    The list is only repeated when the watch can't resume (410 Gone after
+    its resourceVersion was compacted, or an API error).
+    """
+    api = client.DiscoveryV1Api()
+    resource_version: Optional[str] = None
+    while not stop.is_set():
+        try:
+            if resource_version is None:
+                slices = api.list_endpoint_slice_for_all_namespaces()
+                readiness.replace(slices.items)
+                resource_version = slices.metadata.resource_version
+                logger.info(f"✅ {len(slices.items)} EndpointSlices chargées")
+
+            stream = watch.Watch()
+            for event in stream.stream(
+                api.list_endpoint_slice_for_all_namespaces,
+                resource_version=resource_version,
+                timeout_seconds=WATCH_TIMEOUT_SECONDS,
+            ):
+                if stop.is_set():
+                    stream.stop()
+                    break
+                if event["type"] == "ERROR":
+                    # Expired resourceVersion reported in-stream
+                    resource_version = None
+                    break
+                readiness.apply(event["type"], event["object"])
+                resource_version = event["object"].metadata.resource_version
+        except ApiException as e:
+            if e.status != 410:
+                logger.error(f"❌ Erreur du watch EndpointSlice: {e.status} {e.reason}")
+                stop.wait(WATCH_RETRY_SECONDS)
+            resource_version = None
+        except Exception as e:
+            logger.error(f"❌ Erreur du watch EndpointSlice: {e}")
+            stop.wait(WATCH_RETRY_SECONDS)
+            resource_version = None
+
+
+_readiness_state: Dict[str, Any] = {"readiness": None, "thread": None}
+_readiness_lock = threading.Lock()
+_stop_watch = threading.Event()
+
+
+def get_backend_readiness() -> Optional[BackendReadiness]:
+    """Shared readiness view when ENDPOINT_READINESS is enabled, else None"""
+    if not ENDPOINT_READINESS:
+        return None
+    with _readiness_lock:
+        if _readiness_state["readiness"] is None:
+            _readiness_state["readiness"] = BackendReadiness()
+        return _readiness_state["readiness"]
+
+
+def start_readiness_watch() -> None:
+    """Start the EndpointSlice watch thread (no-op when disabled)"""
+    readiness = get_backend_readiness()
+    if readiness is None:
+        return
+    with _readiness_lock:
+        if _readiness_state["thread"] is not None:
+            return
+        thread = threading.Thread(
+            target=watch_endpoint_slices, args=(readiness, _stop_watch), daemon=True
+        )
+        _readiness_state["thread"] = thread
+        thread.start()
+    logger.info("🚀 Watch EndpointSlice démarré")
+
+
+def stop_readiness_watch() -> None:
+    """Ask the EndpointSlice watch thread to stop"""
+    _stop_watch.set()
+
+
+def _metrics() -> Dict[str, Any]:
+    readiness = get_backend_readiness()
+    return readiness.snapshot() if readiness else {"enabled": False}
+
+
+register_metrics_provider("endpoint_readiness", _metrics)
+
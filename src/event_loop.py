@@ -0,0 +1,56 @@
+"""
+Event loop factory shared by the checker, the API and the server
+"""
+
+import asyncio
+from typing import Any, Coroutine, TypeVar
+
+from loguru import logger
+
+from .config import USE_UVLOOP
+from .metrics import register_metrics_provider
+
+# uvloop is optional: without it every loop is a standard asyncio loop.
+UVLOOP_AVAILABLE = False
+try:
+    import uvloop
+
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    uvloop = None
+
+T = TypeVar("T")
+
+_fallback_logged = False
+
+
+def uvloop_enabled() -> bool:
+    """True if loops are created with uvloop (opt-in and installed)"""
+    global _fallback_logged
+    if USE_UVLOOP and not UVLOOP_AVAILABLE and not _fallback_logged:
+        _fallback_logged = True
+        logger.warning("⚠️ USE_UVLOOP activé mais uvloop n'est pas installé, boucle asyncio standard utilisée")
+    return USE_UVLOOP and UVLOOP_AVAILABLE
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop of the configured implementation"""
+    if uvloop_enabled():
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    """asyncio.run() on a loop of the configured implementation"""
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        return runner.run(coro)
+
+
+def loop_implementation() -> str:
+    return "uvloop" if uvloop_enabled() else "asyncio"
+
+
+register_metrics_provider(
+    "event_loop",
+    lambda: {"implementation": loop_implementation(), "uvloop_available": UVLOOP_AVAILABLE},
+)
@@ -0,0 +1,313 @@
+"""
+Append-only journal of URL state changes, in bounded on-disk segments
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import IO, Any, Deque, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from .config import (
+    EVENT_JOURNAL,
+    EVENTS_DIR,
+    EVENTS_MAX_SEGMENTS,
+    EVENTS_SEGMENT_KB,
+    EVENTS_TAIL,
+)
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key, url_id
+
+DOWN = "down"
+RECOVERED = "recovered"
+CERT_CHANGED = "cert_changed"
+ROUTE_ADDED = "route_added"
+ROUTE_REMOVED = "route_removed"
+
+SEGMENT_SUFFIX = ".jsonl"
+# Route inventory of the last cycle, so restarts don't reset the baseline
+INVENTORY_FILE = "inventory.json"
+MAX_PAGE = 5000
+
+
+def _segment_name(first_id: int) -> str:
+    # Zero-padded so that names sort like ids
+    return f"{first_id:020d}{SEGMENT_SUFFIX}"
+
+
+def _event(kind: str, key: ResultKey, **fields: Any) -> Dict[str, Any]:
+    url, namespace, name = key
+    return {
+        "type": kind,
+        "url": url,
+        "namespace": namespace,
+        "name": name,
+        "url_id": url_id({"url": url, "namespace": namespace, "name": name}),
+        **fields,
+    }
+
+
+def result_events(previous: Optional[Dict[str, Any]], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Changes between the previous probed result and the new one of a URL"""
+    events: List[Dict[str, Any]] = []
+    healthy = result.get("healthy")
+    if healthy is None:
+        return events
+    key = result_key(result)
+    was_healthy = previous.get("healthy") if previous else None
+    if healthy is False and was_healthy is not False:
+        events.append(_event(DOWN, key, status=result.get("status"), details=result.get("details", "")))
+    elif healthy is True and was_healthy is False:
+        events.append(_event(RECOVERED, key, status=result.get("status")))
+
+    cert = result.get("ssl_info") or {}
+    previous_cert = (previous or {}).get("ssl_info") or {}
+    if cert and previous_cert and (
+        cert.get("expiry_date") != previous_cert.get("expiry_date")
+        or cert.get("issuer") != previous_cert.get("issuer")
+    ):
+        events.append(
+            _event(
+                CERT_CHANGED,
+                key,
+                previous_expiry=previous_cert.get("expiry_date"),
+                expiry=cert.get("expiry_date"),
+            )
+        )
+    return events
+
+
+class EventJournal:
+    """Events with increasing ids, appended to JSON-lines segment files.
+
+    A segment is named after the id of its first event and closed once
+    it reaches ``segment_bytes``; beyond ``max_segments`` the oldest is
+    deleted. The last ``tail_size`` events are also kept in memory, so
+    consumers that keep up never touch the disk. Ids continue across
+    restarts from the last segment, route changes from the saved
+    inventory.
+
+    Results are compared with the last probed result of their URL:
+    skipped ones (maintenance, no backend) don't hide a recovery.
+    """
+
+    def __init__(
+        self,
+        directory: str = EVENTS_DIR,
+        segment_bytes: int = EVENTS_SEGMENT_KB * 1024,
+        max_segments: int = EVENTS_MAX_SEGMENTS,
+        tail_size: int = EVENTS_TAIL,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self._tail: Deque[Dict[str, Any]] = deque(maxlen=max(1, tail_size))
+        self._segments: List[int] = []
+        self._file: Optional[IO[str]] = None
+        self._file_bytes = 0
+        self._inventory: Optional[Set[ResultKey]] = None
+        self._last_probed: Dict[ResultKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.last_id = 0
+        self.appended = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+        self._load_inventory()
+
+    def _path(self, first_id: int) -> str:
+        return os.path.join(self.directory, _segment_name(first_id))
+
+    def _open(self) -> None:
+        """Find the segments of a previous run, reload the tail and the last id"""
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        self._segments = [int(n[: -len(SEGMENT_SUFFIX)]) for n in names if n[: -len(SEGMENT_SUFFIX)].isdigit()]
+        if not self._segments:
+            return
+        # Newest segments first, until the tail is full
+        recent: List[Dict[str, Any]] = []
+        for first_id in reversed(self._segments):
+            recent = self._read_file(first_id) + recent
+            if len(recent) >= self._tail.maxlen:
+                break
+        self._tail.extend(recent)
+        self.last_id = max(recent[-1]["id"] if recent else 0, self._segments[-1] - 1)
+        logger.info(f"📜 Journal d'événements: {len(self._segments)} segments, dernier id {self.last_id}")
+
+    def _load_inventory(self) -> None:
+        try:
+            with open(os.path.join(self.directory, INVENTORY_FILE)) as f:
+                self._inventory = {tuple(key) for key in json.load(f)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Inventaire du journal d'événements illisible: {e}")
+
+    def _save_inventory(self, keys: Set[ResultKey]) -> None:
+        path = os.path.join(self.directory, INVENTORY_FILE)
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(sorted(keys), f, separators=(",", ":"))
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"⚠️ Écriture de l'inventaire du journal impossible: {e}")
+
+    def _read_file(self, first_id: int) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        try:
+            with open(self._path(first_id)) as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # Partial line of an interrupted write
+                        continue
+        except FileNotFoundError:
+            pass
+        return events
+
+    def _read_segments(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        """Events with id > after from the segment files"""
+        start = max(0, bisect_right(self._segments, after + 1) - 1)
+        events: List[Dict[str, Any]] = []
+        for first_id in self._segments[start:]:
+            events.extend(e for e in self._read_file(first_id) if e.get("id", 0) > after)
+            if len(events) >= limit:
+                break
+        return events[:limit]
+
+    def _rotate(self, first_id: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._path(first_id), "a")
+        self._file_bytes = 0
+        self._segments.append(first_id)
+        while len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Assign ids and write events, return how many were appended"""
+        count = 0
+        now = round(time.time(), 3)
+        with self._lock:
+            for event in events:
+                self.last_id += 1
+                event = {"id": self.last_id, "ts": now, **event}
+                if self._file is None or self._file_bytes >= self.segment_bytes:
+                    self._rotate(self.last_id)
+                line = json.dumps(event, separators=(",", ":"), default=str) + "\n"
+                try:
+                    self._file.write(line)
+                except OSError as e:
+                    logger.warning(f"⚠️ Écriture du journal d'événements impossible: {e}")
+                self._file_bytes += len(line)
+                self._tail.append(event)
+                count += 1
+            self.appended += count
+        return count
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.flush()
+                except OSError as e:
+                    logger.warning(f"⚠️ Écriture du journal d'événements impossible: {e}")
+
+    def record(self, previous: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        """Log the changes of a new result; ``previous`` (the stored result)
+        is only used until the URL was probed once by this process"""
+        if result.get("healthy") is None:
+            return
+        key = result_key(result)
+        with self._lock:
+            previous = self._last_probed.get(key, previous)
+            self._last_probed[key] = result
+        events = result_events(previous, result)
+        if events:
+            self.append(events)
+
+    def sync_inventory(self, keys: Iterable[ResultKey]) -> None:
+        """Log routes added to / removed from the inventory since the
+        last cycle (the first call only records the inventory)"""
+        keys = set(keys)
+        previous, self._inventory = self._inventory, keys
+        with self._lock:
+            for key in [k for k in self._last_probed if k not in keys]:
+                del self._last_probed[key]
+        if keys != previous:
+            self._save_inventory(keys)
+        if previous is None:
+            return
+        self.append(
+            [_event(ROUTE_ADDED, key) for key in sorted(keys - previous)]
+            + [_event(ROUTE_REMOVED, key) for key in sorted(previous - keys)]
+        )
+
+    def read(self, after: int = 0, limit: int = 500) -> Dict[str, Any]:
+        """Events with id > after, oldest first.
+
+        ``truncated`` is set when events after the cursor were already
+        deleted with their segment.
+        """
+        limit = max(1, min(limit, MAX_PAGE))
+        with self._lock:
+            tail = list(self._tail)
+            if tail and after >= tail[0]["id"] - 1:
+                start = bisect_right([e["id"] for e in tail], after)
+                events = tail[start : start + limit]
+            else:
+                if self._file is not None:
+                    self._file.flush()
+                events = self._read_segments(after, limit)
+            last_id = self.last_id
+        oldest = events[0]["id"] if events else last_id + 1
+        next_cursor = events[-1]["id"] if events else max(after, 0)
+        return {
+            "events": events,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor < last_id,
+            "truncated": oldest > after + 1 and after < last_id,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "last_id": self.last_id,
+            "appended": self.appended,
+            "segments": len(self._segments),
+            "tail": len(self._tail),
+        }
+
+
+_journal_state: Dict[str, Any] = {"journal": None, "failed": False}
+_journal_lock = threading.Lock()
+
+
+def get_event_journal() -> Optional[EventJournal]:
+    """Shared journal when EVENT_JOURNAL is enabled (and could be opened), else None"""
+    if not EVENT_JOURNAL or _journal_state["failed"]:
+        return None
+    with _journal_lock:
+        if _journal_state["journal"] is None:
+            try:
+                _journal_state["journal"] = EventJournal()
+            except OSError as e:
+                _journal_state["failed"] = True
+                logger.error(f"❌ Journal d'événements indisponible ({EVENTS_DIR}): {e}")
+                return None
+        return _journal_state["journal"]
+
+
+def _metrics() -> Dict[str, Any]:
+    journal = get_event_journal()
+    return journal.snapshot() if journal else {"enabled": False}
+
+
+register_metrics_provider("events", _metrics)
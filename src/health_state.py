@@ -0,0 +1,257 @@
+"""
+Per-URL health state machine: alerts on transitions only, with hysteresis
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from loguru import logger
+
+from .config import (
+    ALERT_FAILURE_THRESHOLD,
+    ALERT_FLAP_THRESHOLD,
+    ALERT_RECOVERY_THRESHOLD,
+    ALERT_STATE_FILE,
+    ENABLE_SLACK_NOTIFICATIONS,
+    SLACK_WEBHOOK_URL,
+)
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key
+
+UP = "up"
+DEGRADED = "degraded"
+DOWN = "down"
+FLAPPING = "flapping"
+STATES = (UP, DEGRADED, DOWN, FLAPPING)
+
+# Outcomes remembered per URL for flap detection (one bit each, 1 = failure)
+FLAP_WINDOW = 20
+STATE_FILE_VERSION = 1
+
+
+def _flips(history: int, samples: int) -> int:
+    """Number of healthy/failing changes between consecutive outcomes"""
+    if samples < 2:
+        return 0
+    return bin((history ^ (history >> 1)) & ((1 << (samples - 1)) - 1)).count("1")
+
+
+class _UrlHealth:
+    __slots__ = ("state", "failures", "successes", "history", "samples", "since")
+
+    def __init__(self) -> None:
+        self.state = UP
+        self.failures = 0
+        self.successes = 0
+        self.history = 0
+        self.samples = 0
+        self.since = time.time()
+
+    def as_list(self) -> list:
+        return [self.state, self.failures, self.successes, self.history, self.samples, self.since]
+
+    @classmethod
+    def from_list(cls, values: list) -> "_UrlHealth":
+        entry = cls()
+        state, failures, successes, history, samples, since = values
+        if state not in STATES:
+            raise ValueError(f"unknown state {state}")
+        entry.state = state
+        entry.failures = int(failures)
+        entry.successes = int(successes)
+        entry.history = int(history) & ((1 << FLAP_WINDOW) - 1)
+        entry.samples = min(int(samples), FLAP_WINDOW)
+        entry.since = float(since)
+        return entry
+
+
+def _key_string(key: ResultKey) -> str:
+    return "|".join(key)
+
+
+class HealthTracker:
+    """up / degraded / down / flapping state per URL.
+
+    A failure moves an up URL to degraded; ``failure_threshold``
+    consecutive failures make it down. A down URL needs
+    ``recovery_threshold`` consecutive successes to be up again. URLs
+    whose outcome changed ``flap_threshold`` times over the last
+    FLAP_WINDOW probes are flapping until the changes drop to half of it.
+
+    ``observe`` returns an alert only when a URL enters down or flapping,
+    or comes back up from them; degraded is never alerted.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = ALERT_FAILURE_THRESHOLD,
+        recovery_threshold: int = ALERT_RECOVERY_THRESHOLD,
+        flap_threshold: int = ALERT_FLAP_THRESHOLD,
+        path: str = ALERT_STATE_FILE,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_threshold = max(1, recovery_threshold)
+        # 0 disables flap detection
+        self.flap_threshold = flap_threshold
+        self.path = path
+        self._urls: Dict[str, _UrlHealth] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.transitions = 0
+        if path:
+            self.load()
+
+    def observe(self, result: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Record a published result, return an alert on a state transition"""
+        healthy = result.get("healthy")
+        if healthy is None:
+            # Not probed (skipped route): no evidence either way
+            return None
+        failed = healthy is False
+        key = _key_string(result_key(result))
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is None:
+                if not failed:
+                    # Healthy URLs without history are not tracked
+                    return None
+                entry = self._urls[key] = _UrlHealth()
+            previous, previous_since = entry.state, entry.since
+            entry.history = ((entry.history << 1) | int(failed)) & ((1 << FLAP_WINDOW) - 1)
+            entry.samples = min(entry.samples + 1, FLAP_WINDOW)
+            if failed:
+                entry.failures += 1
+                entry.successes = 0
+            else:
+                entry.successes += 1
+                entry.failures = 0
+            entry.state = self._next_state(entry, failed)
+            self._dirty = True
+
+            if entry.state == UP and not entry.history:
+                # Clean record again: stop tracking
+                del self._urls[key]
+            if entry.state == previous:
+                return None
+            entry.since = time.time() if now is None else now
+            self.transitions += 1
+            duration = entry.since - previous_since
+
+        if entry.state == DEGRADED or (entry.state == UP and previous == DEGRADED):
+            return None
+        logger.info(f"🔔 {result.get('url', '')}: {previous} → {entry.state}")
+        return {
+            "url": result.get("url", ""),
+            "status": result.get("status"),
+            "details": result.get("details") or "",
+            "state": entry.state,
+            "previous": previous,
+            "duration": duration,
+        }
+
+    def _next_state(self, entry: _UrlHealth, failed: bool) -> str:
+        flips = _flips(entry.history, entry.samples)
+        if self.flap_threshold > 0:
+            if entry.state != FLAPPING and flips >= self.flap_threshold:
+                return FLAPPING
+            if entry.state == FLAPPING:
+                if flips > self.flap_threshold // 2:
+                    return FLAPPING
+                # Settled: report where it landed
+                return DOWN if failed else UP
+
+        if failed:
+            if entry.state == DOWN or entry.failures >= self.failure_threshold:
+                return DOWN
+            return DEGRADED
+        if entry.state == DOWN and entry.successes < self.recovery_threshold:
+            return DOWN
+        return UP
+
+    def state(self, result: Dict[str, Any]) -> str:
+        entry = self._urls.get(_key_string(result_key(result)))
+        return entry.state if entry else UP
+
+    def forget(self, keep: Iterable[ResultKey]) -> None:
+        """Drop URLs that left the inventory"""
+        keep_strings = {_key_string(key) for key in keep}
+        with self._lock:
+            for key in [k for k in self._urls if k not in keep_strings]:
+                del self._urls[key]
+                self._dirty = True
+
+    def load(self) -> None:
+        """Restore states saved by a previous run (missing file = all up)"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ État des alertes illisible ({self.path}): {e}")
+            return
+        if saved.get("version") != STATE_FILE_VERSION:
+            return
+        restored: Dict[str, _UrlHealth] = {}
+        for key, values in saved.get("urls", {}).items():
+            try:
+                restored[key] = _UrlHealth.from_list(values)
+            except (TypeError, ValueError):
+                continue
+        with self._lock:
+            self._urls = restored
+        logger.info(f"🔔 État des alertes restauré: {len(restored)} URLs suivies")
+
+    def save(self) -> None:
+        """Write the states if they changed (atomic replace)"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "version": STATE_FILE_VERSION,
+                "urls": {key: entry.as_list() for key, entry in self._urls.items()},
+            }
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"⚠️ Sauvegarde de l'état des alertes impossible: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {state: 0 for state in STATES if state != UP}
+            for entry in self._urls.values():
+                if entry.state in counts:
+                    counts[entry.state] += 1
+        return {**counts, "tracked": len(self._urls), "transitions": self.transitions}
+
+
+_tracker_state: Dict[str, Optional[HealthTracker]] = {"tracker": None}
+_tracker_lock = threading.Lock()
+
+
+def get_health_tracker() -> Optional[HealthTracker]:
+    """Shared tracker when Slack notifications are configured, else None"""
+    if not ENABLE_SLACK_NOTIFICATIONS or not SLACK_WEBHOOK_URL:
+        return None
+    with _tracker_lock:
+        if _tracker_state["tracker"] is None:
+            _tracker_state["tracker"] = HealthTracker()
+        return _tracker_state["tracker"]
+
+
+def _metrics() -> Dict[str, Any]:
+    tracker = get_health_tracker()
+    return tracker.snapshot() if tracker else {"enabled": False}
+
+
+register_metrics_provider("health_state", _metrics)
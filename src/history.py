@@ -0,0 +1,234 @@
+"""
+Per-URL check history in fixed-size ring buffers of typed arrays
+"""
+
+import math
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import URL_HISTORY, URL_HISTORY_MEMORY_MB, URL_HISTORY_SAMPLES
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key, url_id
+
+# Phase timings kept per sample (ms), keys of ProbeTimings.as_dict()
+PHASES = ("dns", "tcp_connect", "tls_handshake", "ttfb")
+# Bytes per sample: timestamp (uint32), status (uint16), response time
+# and phases (float32)
+SAMPLE_BYTES = 4 + 2 + 4 + 4 * len(PHASES)
+# Fixed cost of one ring: the object, its arrays and index entries
+RING_OVERHEAD_BYTES = 1024
+# Rings are never shrunk below this many samples to make room
+MIN_CAPACITY = 16
+# Slack left for new URLs when capacities are recomputed
+GROWTH_HEADROOM = 1.25
+
+_NAN = float("nan")
+
+
+class _Ring:
+    """Fixed-capacity ring of samples, one typed array per column"""
+
+    __slots__ = ("key", "capacity", "head", "ts", "status", "response_time", "phases")
+
+    def __init__(self, key: ResultKey, capacity: int) -> None:
+        self.key = key
+        self.capacity = capacity
+        # Next slot to overwrite once the ring is full
+        self.head = 0
+        self.ts = array("I")
+        self.status = array("H")
+        self.response_time = array("f")
+        self.phases = tuple(array("f") for _ in PHASES)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def append(self, ts: int, status: int, response_time: float, phases: List[float]) -> None:
+        if len(self.ts) < self.capacity:
+            self.ts.append(ts)
+            self.status.append(status)
+            self.response_time.append(response_time)
+            for column, value in zip(self.phases, phases):
+                column.append(value)
+            return
+        i = self.head
+        self.ts[i] = ts
+        self.status[i] = status
+        self.response_time[i] = response_time
+        for column, value in zip(self.phases, phases):
+            column[i] = value
+        self.head = (i + 1) % self.capacity
+
+    def _order(self) -> List[int]:
+        """Slot indexes from oldest to newest"""
+        size = len(self.ts)
+        if size < self.capacity:
+            return list(range(size))
+        return list(range(self.head, size)) + list(range(self.head))
+
+    def resize(self, capacity: int) -> None:
+        """Change the capacity, keeping the newest samples"""
+        order = self._order()[-capacity:]
+        if self.head or len(order) < len(self.ts):
+            self.ts = array("I", (self.ts[i] for i in order))
+            self.status = array("H", (self.status[i] for i in order))
+            self.response_time = array("f", (self.response_time[i] for i in order))
+            self.phases = tuple(array("f", (column[i] for i in order)) for column in self.phases)
+        self.capacity = capacity
+        self.head = 0
+
+    def samples(self, since: float = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        order = [i for i in self._order() if self.ts[i] >= since]
+        if limit is not None:
+            order = order[-limit:] if limit > 0 else []
+        samples = []
+        for i in order:
+            timings = {}
+            for phase, column in zip(PHASES, self.phases):
+                value = column[i]
+                if not math.isnan(value):
+                    timings[phase] = round(value, 1)
+            samples.append(
+                {
+                    "ts": self.ts[i],
+                    "status": self.status[i],
+                    "response_time": round(self.response_time[i], 1),
+                    "timings": timings,
+                }
+            )
+        return samples
+
+
+class UrlHistory:
+    """Ring buffer of recent results per URL under a global memory cap.
+
+    Each URL keeps up to ``samples`` results. When the URL count would
+    push the total over ``memory_bytes``, every ring is shrunk (newest
+    samples kept) so that the cap holds whatever the inventory size; once
+    rings are down to MIN_CAPACITY, new URLs are not recorded.
+    """
+
+    def __init__(
+        self,
+        samples: int = URL_HISTORY_SAMPLES,
+        memory_bytes: int = URL_HISTORY_MEMORY_MB * 1024 * 1024,
+    ) -> None:
+        self.max_samples = max(MIN_CAPACITY, samples)
+        self.memory_bytes = memory_bytes
+        self.capacity = self.max_samples
+        self._rings: Dict[str, _Ring] = {}
+        self._lock = threading.Lock()
+        self.resizes = 0
+        # Results not recorded because the cap was reached
+        self.rejected = 0
+
+    def _capacity_for(self, rings: int) -> int:
+        """Samples per URL for ``rings`` rings (plus headroom) under the cap"""
+        per_ring = self.memory_bytes // max(1, int(rings * GROWTH_HEADROOM)) - RING_OVERHEAD_BYTES
+        return min(self.max_samples, per_ring // SAMPLE_BYTES)
+
+    def _set_capacity(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.resizes += 1
+        for ring in self._rings.values():
+            ring.resize(capacity)
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """Append a published result (skipped URLs are not recorded)"""
+        if result.get("healthy") is None:
+            return
+        key = result_key(result)
+        rid = url_id(result)
+        timings = result.get("timings") or {}
+        phases = [float(timings.get(phase, _NAN)) for phase in PHASES]
+        with self._lock:
+            ring = self._rings.get(rid)
+            if ring is None:
+                rings = len(self._rings) + 1
+                if rings * (self.capacity * SAMPLE_BYTES + RING_OVERHEAD_BYTES) > self.memory_bytes:
+                    capacity = self._capacity_for(rings)
+                    if capacity < MIN_CAPACITY:
+                        # Cap reached even with minimal rings
+                        self.rejected += 1
+                        return
+                    self._set_capacity(capacity)
+                ring = self._rings[rid] = _Ring(key, self.capacity)
+            ring.append(
+                int(result.get("last_checked") or 0),
+                min(max(int(result.get("status") or 0), 0), 0xFFFF),
+                float(result.get("response_time") or 0),
+                phases,
+            )
+
+    def query(self, rid: str, since: float = 0, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Samples of a URL from oldest to newest, None if unknown"""
+        with self._lock:
+            ring = self._rings.get(rid)
+            if ring is None:
+                return None
+            samples = ring.samples(since, limit)
+            url, namespace, name = ring.key
+            capacity = ring.capacity
+        return {
+            "id": rid,
+            "url": url,
+            "namespace": namespace,
+            "name": name,
+            "capacity": capacity,
+            "count": len(samples),
+            "samples": samples,
+        }
+
+    def forget(self, keep: Iterable[ResultKey]) -> None:
+        """Drop URLs that left the inventory and grow rings back if possible"""
+        keep_ids = {url_id({"url": u, "namespace": ns, "name": n}) for u, ns, n in keep}
+        with self._lock:
+            for rid in [r for r in self._rings if r not in keep_ids]:
+                del self._rings[rid]
+            if self.capacity < self.max_samples:
+                capacity = self._capacity_for(len(self._rings))
+                # Grow by steps: resizing wrapped rings copies them
+                if capacity >= min(self.max_samples, self.capacity * GROWTH_HEADROOM):
+                    # Existing rings fill up to the new capacity over time
+                    self._set_capacity(capacity)
+
+    def memory_estimate(self) -> int:
+        """Upper bound of the bytes used, what the cap is checked against"""
+        return len(self._rings) * (self.capacity * SAMPLE_BYTES + RING_OVERHEAD_BYTES)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sum(len(ring) for ring in self._rings.values())
+            urls = len(self._rings)
+        return {
+            "urls": urls,
+            "samples": samples,
+            "capacity_per_url": self.capacity,
+            "memory_bytes": self.memory_estimate(),
+            "memory_cap_bytes": self.memory_bytes,
+            "resizes": self.resizes,
+            "rejected": self.rejected,
+        }
+
+
+_history_state: Dict[str, Optional[UrlHistory]] = {"history": None}
+_history_lock = threading.Lock()
+
+
+def get_url_history() -> Optional[UrlHistory]:
+    """Shared history when URL_HISTORY is enabled, else None"""
+    if not URL_HISTORY:
+        return None
+    with _history_lock:
+        if _history_state["history"] is None:
+            _history_state["history"] = UrlHistory()
+        return _history_state["history"]
+
+
+def _metrics() -> Dict[str, Any]:
+    history = get_url_history()
+    return history.snapshot() if history else {"enabled": False}
+
+
+register_metrics_provider("history", _metrics)
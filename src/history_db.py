@@ -0,0 +1,374 @@
+"""
+Durable check history in SQLite (WAL), with 1-minute and 1-hour rollups
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import (
+    HISTORY_DB,
+    HISTORY_DB_PATH,
+    HISTORY_HOUR_RETENTION_DAYS,
+    HISTORY_MINUTE_RETENTION_DAYS,
+    HISTORY_RAW_RETENTION_HOURS,
+)
+from .metrics import register_metrics_provider
+from .scheduler import url_id
+
+# Resolutions: table and bucket width in seconds (0 = raw samples)
+RESOLUTIONS = {"raw": ("samples", 0), "1m": ("rollup_1m", 60), "1h": ("rollup_1h", 3600)}
+# Longest range served from each resolution when none is requested
+AUTO_RAW_MAX_SECONDS = 6 * 3600
+AUTO_MINUTE_MAX_SECONDS = 7 * 86400
+# Rows written in one transaction at most (a cycle is split beyond it)
+MAX_BATCH_ROWS = 25_000
+QUEUE_SIZE = 100_000
+PRUNE_INTERVAL_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    namespace TEXT,
+    name TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS samples (
+    url_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    healthy INTEGER NOT NULL,
+    response_time REAL,
+    dns REAL,
+    tcp_connect REAL,
+    tls_handshake REAL,
+    ttfb REAL,
+    PRIMARY KEY (url_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+"""
+
+_ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    url_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    rt_sum REAL NOT NULL,
+    rt_min REAL NOT NULL,
+    rt_max REAL NOT NULL,
+    PRIMARY KEY (url_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_ts ON {table} (ts);
+"""
+
+_INSERT_SAMPLE = "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_UPSERT_ROLLUP = """
+INSERT INTO {table} VALUES (?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (url_id, ts) DO UPDATE SET
+    count = count + 1,
+    failures = failures + excluded.failures,
+    rt_sum = rt_sum + excluded.rt_sum,
+    rt_min = min(rt_min, excluded.rt_min),
+    rt_max = max(rt_max, excluded.rt_max)
+"""
+
+_END_OF_CYCLE = object()
+
+Row = Tuple[Any, ...]
+
+
+def connect(path: str, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    else:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def init_schema(connection: sqlite3.Connection) -> None:
+    connection.executescript(_SCHEMA)
+    for table, width in RESOLUTIONS.values():
+        if width:
+            connection.executescript(_ROLLUP_SCHEMA.format(table=table))
+
+
+def _sample_row(result: Dict[str, Any]) -> Optional[Row]:
+    if result.get("healthy") is None:
+        return None
+    timings = result.get("timings") or {}
+    return (
+        url_id(result),
+        int(result.get("last_checked") or time.time()),
+        int(result.get("status") or 0),
+        int(bool(result.get("healthy"))),
+        float(result.get("response_time") or 0),
+        timings.get("dns"),
+        timings.get("tcp_connect"),
+        timings.get("tls_handshake"),
+        timings.get("ttfb"),
+    )
+
+
+class HistoryDB:
+    """SQLite history written by a dedicated thread.
+
+    ``record`` only puts the result on a queue (dropped and counted when
+    full), so the event loop never waits on the disk. ``end_cycle`` marks
+    the end of a check cycle: the writer inserts the cycle's samples and
+    updates the 1-minute and 1-hour rollups in one transaction. Each
+    resolution is pruned with its own retention; queries pick the
+    coarsest resolution that fits the range and only read the (url_id, ts)
+    primary key range.
+    """
+
+    def __init__(
+        self,
+        path: str = HISTORY_DB_PATH,
+        raw_retention: float = HISTORY_RAW_RETENTION_HOURS * 3600,
+        minute_retention: float = HISTORY_MINUTE_RETENTION_DAYS * 86400,
+        hour_retention: float = HISTORY_HOUR_RETENTION_DAYS * 86400,
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        self.path = path
+        self.retention = {
+            "samples": raw_retention,
+            "rollup_1m": minute_retention,
+            "rollup_1h": hour_retention,
+        }
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+        # First purge one interval after startup
+        self._last_prune = time.time()
+        self.stats = {
+            "queued": 0,
+            "dropped": 0,
+            "rows_written": 0,
+            "transactions": 0,
+            "write_errors": 0,
+            "pruned_rows": 0,
+        }
+        connection = connect(path)
+        try:
+            init_schema(connection)
+        finally:
+            connection.close()
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """Queue a published result (never blocks)"""
+        row = _sample_row(result)
+        if row is None:
+            return
+        try:
+            self._queue.put_nowait(
+                (row, result.get("url", ""), result.get("namespace", ""), result.get("name", ""))
+            )
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return
+        self.stats["queued"] += 1
+        self._ensure_started()
+
+    def end_cycle(self) -> None:
+        """Write the results recorded since the previous cycle"""
+        try:
+            self._queue.put_nowait(_END_OF_CYCLE)
+        except queue.Full:
+            # The writer will flush when it reaches MAX_BATCH_ROWS
+            return
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="history-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until the queue is written (tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _run(self) -> None:
+        connection = connect(self.path)
+        pending: List[Any] = []
+        taken = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._queue.get(timeout=1)
+                except queue.Empty:
+                    self._maybe_prune(connection)
+                    continue
+                taken += 1
+                if item is not _END_OF_CYCLE:
+                    pending.append(item)
+                if item is _END_OF_CYCLE or len(pending) >= MAX_BATCH_ROWS:
+                    self._write(connection, pending)
+                    pending = []
+                    for _ in range(taken):
+                        self._queue.task_done()
+                    taken = 0
+                    self._maybe_prune(connection)
+        finally:
+            self._write(connection, pending)
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, items: List[Any]) -> None:
+        if not items:
+            return
+        rows = [item[0] for item in items]
+        urls = {item[0][0]: item[1:] for item in items}
+        rollup_rows: Dict[str, List[Row]] = {}
+        for table, width in RESOLUTIONS.values():
+            if width:
+                rollup_rows[table] = [
+                    (row[0], row[1] - row[1] % width, 1 - row[3], row[4], row[4], row[4])
+                    for row in rows
+                ]
+        try:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR IGNORE INTO urls VALUES (?, ?, ?, ?)",
+                [(rid, *meta) for rid, meta in urls.items()],
+            )
+            connection.executemany(_INSERT_SAMPLE, rows)
+            for table, table_rows in rollup_rows.items():
+                connection.executemany(_UPSERT_ROLLUP.format(table=table), table_rows)
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"❌ Écriture de l'historique impossible: {e}")
+            try:
+                connection.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return
+        self.stats["rows_written"] += len(rows)
+        self.stats["transactions"] += 1
+
+    def _maybe_prune(self, connection: sqlite3.Connection, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        self.prune(connection, now)
+
+    def prune(self, connection: sqlite3.Connection, now: Optional[float] = None) -> int:
+        """Delete rows older than the retention of their resolution"""
+        now = time.time() if now is None else now
+        removed = 0
+        try:
+            for table, retention in self.retention.items():
+                cursor = connection.execute(
+                    f"DELETE FROM {table} WHERE ts < ?", (int(now - retention),)
+                )
+                removed += cursor.rowcount
+            connection.execute(
+                "DELETE FROM urls WHERE url_id NOT IN (SELECT DISTINCT url_id FROM rollup_1h)"
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Purge de l'historique impossible: {e}")
+            return removed
+        self.stats["pruned_rows"] += removed
+        if removed:
+            logger.debug(f"🧹 {removed} lignes d'historique purgées")
+        return removed
+
+    def query(
+        self,
+        rid: str,
+        since: float,
+        until: Optional[float] = None,
+        resolution: str = "auto",
+    ) -> Optional[Dict[str, Any]]:
+        """Samples or rollups of a URL over [since, until), None if unknown"""
+        until = time.time() if until is None else until
+        if resolution == "auto":
+            span = until - since
+            if span <= AUTO_RAW_MAX_SECONDS and since >= until - self.retention["samples"]:
+                resolution = "raw"
+            elif span <= AUTO_MINUTE_MAX_SECONDS:
+                resolution = "1m"
+            else:
+                resolution = "1h"
+        if resolution not in RESOLUTIONS:
+            raise ValueError("resolution: raw, 1m, 1h ou auto attendu")
+        table, _ = RESOLUTIONS[resolution]
+
+        connection = connect(self.path, read_only=True)
+        try:
+            url = connection.execute(
+                "SELECT url, namespace, name FROM urls WHERE url_id = ?", (rid,)
+            ).fetchone()
+            if url is None:
+                return None
+            cursor = connection.execute(
+                f"SELECT * FROM {table} WHERE url_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (rid, int(since), int(until)),
+            )
+            columns = [d[0] for d in cursor.description][1:]
+            points = [dict(zip(columns, row[1:])) for row in cursor]
+        finally:
+            connection.close()
+
+        if resolution != "raw":
+            for point in points:
+                point["availability"] = round(1 - point["failures"] / point["count"], 4)
+                point["rt_avg"] = round(point.pop("rt_sum") / point["count"], 1)
+        return {
+            "id": rid,
+            "url": url[0],
+            "namespace": url[1],
+            "name": url[2],
+            "resolution": resolution,
+            "count": len(points),
+            "points": points,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self._queue.qsize()}
+
+
+_db_state: Dict[str, Any] = {"db": None, "failed": False}
+_db_lock = threading.Lock()
+
+
+def get_history_db() -> Optional[HistoryDB]:
+    """Shared store when HISTORY_DB is enabled (and could be opened), else None"""
+    if not HISTORY_DB or _db_state["failed"]:
+        return None
+    with _db_lock:
+        if _db_state["db"] is None:
+            try:
+                _db_state["db"] = HistoryDB()
+            except sqlite3.Error as e:
+                _db_state["failed"] = True
+                logger.error(f"❌ Historique persistant indisponible ({HISTORY_DB_PATH}): {e}")
+                return None
+        return _db_state["db"]
+
+
+def _metrics() -> Dict[str, Any]:
+    db = get_history_db()
+    return db.snapshot() if db else {"enabled": False}
+
+
+register_metrics_provider("history_db", _metrics)
@@ -0,0 +1,424 @@
+"""
+HTTP/2 probe transport: multiplexed streams and connection coalescing
+"""
+
+import asyncio
+import socket
+import ssl
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from loguru import logger
+
+from .dns_cache import get_shared_resolver
+from .metrics import register_metrics_provider
+from .timeouts import TimeoutBudget
+from .tracing import ProbeTimings
+
+# h2 is pulled in by Hypercorn; the transport is disabled without it.
+H2_AVAILABLE = False
+try:
+    import h2.config
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.exceptions
+
+    H2_AVAILABLE = True
+except ImportError:
+    h2 = None
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 10
+READ_SIZE = 65536
+# Origins that negotiated HTTP/1.1 are not offered h2 again for this long
+H1_ORIGIN_TTL_SECONDS = 3600
+USER_AGENT = "portal-checker"
+
+_h1_origins: Dict[Tuple[str, int], float] = {}
+
+_stats = {
+    "connections_opened": 0,
+    "streams": 0,
+    "coalesced": 0,
+    "http1_fallbacks": 0,
+}
+
+
+class H2ProbeError(aiohttp.ClientConnectionError):
+    """Connection-level failure of an HTTP/2 probe"""
+
+
+def cert_covers(cert: Dict[str, Any], host: str) -> bool:
+    """True if a peer certificate (getpeercert() dict) is valid for host"""
+    host = host.lower()
+    for kind, name in cert.get("subjectAltName", ()):
+        if kind != "DNS":
+            continue
+        name = name.lower()
+        if name == host:
+            return True
+        if name.startswith("*.") and "." in host:
+            # A wildcard matches exactly one leftmost label
+            if host.split(".", 1)[1] == name[2:]:
+                return True
+    return False
+
+
+class _Stream:
+    __slots__ = ("status", "headers", "received", "ended", "error", "changed")
+
+    def __init__(self) -> None:
+        self.status: Optional[int] = None
+        self.headers: Dict[str, str] = {}
+        self.received = 0
+        self.ended = False
+        self.error: Optional[Exception] = None
+        self.changed = asyncio.Event()
+
+
+class H2ClientConnection:
+    """One TLS connection speaking HTTP/2, shared by concurrent probes"""
+
+    def __init__(self, reader, writer, host: str, ip: str, port: int) -> None:
+        self.host = host
+        self.ip = ip
+        self.port = port
+        ssl_object = writer.get_extra_info("ssl_object")
+        self.cert: Dict[str, Any] = (ssl_object.getpeercert() if ssl_object else None) or {}
+        self._reader = reader
+        self._writer = writer
+        self._conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=True, header_encoding="utf-8")
+        )
+        self._streams: Dict[int, _Stream] = {}
+        self._slots = asyncio.Condition()
+        self._tasks: set = set()
+        self.closed = False
+        self._conn.initiate_connection()
+        self._flush()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    def can_serve(self, host: str, addresses: List[str], port: int) -> bool:
+        """Connection reuse rules of RFC 9113 section 9.1.1"""
+        if self.closed or port != self.port:
+            return False
+        if host == self.host:
+            return True
+        return self.ip in addresses and cert_covers(self.cert, host)
+
+    def _flush(self) -> None:
+        data = self._conn.data_to_send()
+        if data and not self.closed:
+            self._writer.write(data)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                data = await self._reader.read(READ_SIZE)
+                if not data:
+                    raise H2ProbeError(f"Connexion HTTP/2 fermée par {self.host}")
+                for event in self._conn.receive_data(data):
+                    self._handle_event(event)
+                self._flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_all(e if isinstance(e, H2ProbeError) else H2ProbeError(str(e)))
+
+    def _handle_event(self, event) -> None:
+        stream = self._streams.get(getattr(event, "stream_id", None))
+        if isinstance(event, h2.events.ResponseReceived) and stream is not None:
+            stream.headers = dict(event.headers)
+            stream.status = int(stream.headers.get(":status", 0))
+            stream.changed.set()
+        elif isinstance(event, h2.events.DataReceived):
+            self._conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream is not None:
+                stream.received += len(event.data)
+                stream.changed.set()
+        elif isinstance(event, h2.events.StreamEnded) and stream is not None:
+            stream.ended = True
+            stream.changed.set()
+        elif isinstance(event, h2.events.StreamReset) and stream is not None:
+            stream.error = H2ProbeError(f"Stream HTTP/2 réinitialisé ({event.error_code!r})")
+            stream.changed.set()
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            self._fail_all(H2ProbeError(f"GOAWAY reçu de {self.host} ({event.error_code!r})"))
+        elif isinstance(event, h2.events.RemoteSettingsChanged):
+            self._spawn(self._notify_slots())
+
+    def _fail_all(self, error: Exception) -> None:
+        self.closed = True
+        for stream in self._streams.values():
+            if stream.error is None and not stream.ended:
+                stream.error = error
+            stream.changed.set()
+        self._spawn(self._notify_slots())
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _notify_slots(self) -> None:
+        async with self._slots:
+            self._slots.notify_all()
+
+    def _has_free_slot(self) -> bool:
+        return self.closed or len(self._streams) < self._conn.remote_settings.max_concurrent_streams
+
+    async def request(
+        self,
+        method: str,
+        authority: str,
+        path: str,
+        budget: TimeoutBudget,
+        max_body_bytes: Optional[int],
+        timings: ProbeTimings,
+    ) -> _Stream:
+        """Send one request, return once the status (and body part) arrived"""
+        async with self._slots:
+            await self._slots.wait_for(self._has_free_slot)
+        if self.closed:
+            raise H2ProbeError(f"Connexion HTTP/2 vers {self.host} fermée")
+
+        stream_id = self._conn.get_next_available_stream_id()
+        stream = self._streams[stream_id] = _Stream()
+        _stats["streams"] += 1
+        try:
+            self._conn.send_headers(
+                stream_id,
+                [
+                    (":method", method),
+                    (":authority", authority),
+                    (":scheme", "https"),
+                    (":path", path),
+                    ("user-agent", USER_AGENT),
+                    ("accept", "*/*"),
+                ],
+                end_stream=True,
+            )
+            self._flush()
+            timings.start("ttfb")
+
+            def ready() -> bool:
+                if stream.error is not None or stream.ended:
+                    return True
+                if stream.status is None:
+                    return False
+                return not max_body_bytes or stream.received >= max_body_bytes
+
+            while not ready():
+                stream.changed.clear()
+                try:
+                    await asyncio.wait_for(stream.changed.wait(), budget.first_byte)
+                except asyncio.TimeoutError:
+                    raise aiohttp.SocketTimeoutError(
+                        f"Timeout on reading data from {self.host}"
+                    ) from None
+            timings.stop("ttfb")
+            if stream.error is not None and stream.status is None:
+                raise stream.error
+            return stream
+        finally:
+            if not stream.ended and not self.closed:
+                # Status is enough: don't download the rest of the body
+                try:
+                    self._conn.reset_stream(stream_id, h2.errors.ErrorCodes.CANCEL)
+                    self._flush()
+                except h2.exceptions.ProtocolError:
+                    pass
+            del self._streams[stream_id]
+            await self._notify_slots()
+
+    async def close(self) -> None:
+        self._reader_task.cancel()
+        if not self.closed:
+            self.closed = True
+            try:
+                self._conn.close_connection()
+                self._writer.write(self._conn.data_to_send())
+            except Exception:
+                pass
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+
+
+class H2Pool:
+    """HTTP/2 connections of one check cycle.
+
+    Requests to an origin reuse any open connection to the same IP whose
+    certificate covers the host, so hosts behind one controller with a
+    wildcard certificate share a single connection. Origins that don't
+    negotiate h2 through ALPN are reported for HTTP/1.1 fallback.
+    """
+
+    def __init__(self, ssl_context: ssl.SSLContext, resolver: Optional[Any] = None) -> None:
+        ssl_context.set_alpn_protocols(["h2", "http/1.1"])
+        self._ssl_context = ssl_context
+        self._resolver = resolver or get_shared_resolver()
+        self._connections: List[H2ClientConnection] = []
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    @staticmethod
+    def is_http1_origin(host: str, port: int) -> bool:
+        expires_at = _h1_origins.get((host, port))
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            _h1_origins.pop((host, port), None)
+            return False
+        return True
+
+    async def get_connection(
+        self, host: str, port: int, budget: TimeoutBudget, timings: ProbeTimings
+    ) -> Optional[H2ClientConnection]:
+        """h2 connection for an origin, None if it only speaks HTTP/1.1"""
+        if self.is_http1_origin(host, port):
+            return None
+        timings.start("dns")
+        try:
+            addresses = [ip for _, ip in await self._resolver.lookup(host)]
+        except OSError as e:
+            raise H2ProbeError(f"Cannot connect to host {host}:{port} [{e}]") from e
+        finally:
+            timings.stop("dns")
+
+        while True:
+            for conn in self._connections:
+                if conn.can_serve(host, addresses, port):
+                    timings.reused = True
+                    if conn.host != host:
+                        _stats["coalesced"] += 1
+                    return conn
+            # One connection attempt at a time per IP, so concurrent probes
+            # of hosts behind the same controller can coalesce onto it.
+            key = (addresses[0], port)
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            await asyncio.wait([pending])
+            if self.is_http1_origin(host, port):
+                return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            conn = await self._open(host, addresses[0], port, budget, timings)
+            if conn is not None:
+                self._connections.append(conn)
+            future.set_result(conn)
+            return conn
+        except BaseException:
+            # Waiters only need the signal: they retry or open their own
+            future.set_result(None)
+            raise
+        finally:
+            del self._pending[key]
+
+    async def _open(
+        self, host: str, ip: str, port: int, budget: TimeoutBudget, timings: ProbeTimings
+    ) -> Optional[H2ClientConnection]:
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        started = time.monotonic()
+        connected: Optional[float] = None
+        try:
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), budget.connect)
+            except asyncio.TimeoutError:
+                raise aiohttp.ConnectionTimeoutError(
+                    f"Connection timeout to host {host}:{port}"
+                ) from None
+            connected = time.monotonic()
+            timings.add("tcp_connect", connected - started)
+            reader, writer = await asyncio.open_connection(
+                sock=sock,
+                ssl=self._ssl_context,
+                server_hostname=host,
+                ssl_handshake_timeout=budget.tls,
+            )
+            timings.add("tls_handshake", time.monotonic() - connected)
+        except ssl.SSLCertVerificationError as e:
+            sock.close()
+            raise H2ProbeError(f"SSL certificate verify failed for {host}: {e}") from e
+        except (OSError, ssl.SSLError) as e:
+            sock.close()
+            if connected is not None:
+                timings.handshake_failed(time.monotonic() - connected, budget.tls)
+            raise H2ProbeError(f"Cannot connect to host {host}:{port} [{e}]") from e
+
+        ssl_object = writer.get_extra_info("ssl_object")
+        if ssl_object is None or ssl_object.selected_alpn_protocol() != "h2":
+            _h1_origins[(host, port)] = time.monotonic() + H1_ORIGIN_TTL_SECONDS
+            _stats["http1_fallbacks"] += 1
+            logger.debug(f"HTTP/2 non négocié par {host}:{port}, repli HTTP/1.1")
+            writer.close()
+            return None
+        _stats["connections_opened"] += 1
+        return H2ClientConnection(reader, writer, host, ip, port)
+
+    async def probe(
+        self,
+        method: str,
+        url: str,
+        budget: TimeoutBudget,
+        timings: ProbeTimings,
+        max_body_bytes: Optional[int] = None,
+    ) -> Tuple[Optional[int], str, str]:
+        """Probe a URL over HTTP/2, following redirects.
+
+        Returns (status, reason, url). status is None when the current URL
+        must be requested over HTTP/1.1 instead (plain http or an origin
+        without h2); url is then where to continue.
+        """
+        async with asyncio.timeout(budget.total):
+            for _ in range(MAX_REDIRECTS + 1):
+                parsed = urlparse(url)
+                if parsed.scheme != "https" or not parsed.hostname:
+                    return None, "", url
+                host = parsed.hostname
+                port = parsed.port or 443
+                conn = await self.get_connection(host, port, budget, timings)
+                if conn is None:
+                    return None, "", url
+                authority = parsed.netloc.rsplit("@", 1)[-1]
+                path = parsed.path or "/"
+                if parsed.query:
+                    path = f"{path}?{parsed.query}"
+                stream = await conn.request(
+                    method, authority, path, budget, max_body_bytes, timings
+                )
+                location = stream.headers.get("location")
+                if stream.status not in REDIRECT_STATUSES or not location:
+                    return stream.status, _reason(stream.status), url
+                timings.redirected()
+                if stream.status == 303:
+                    method = "GET"
+                url = urljoin(url, location)
+            raise H2ProbeError(f"Trop de redirections ({MAX_REDIRECTS})")
+
+    async def close(self) -> None:
+        await asyncio.gather(
+            *(conn.close() for conn in self._connections), return_exceptions=True
+        )
+        self._connections = []
+
+
+def _reason(status: Optional[int]) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+register_metrics_provider("http2", lambda: {**_stats, "http1_origins": len(_h1_origins)})
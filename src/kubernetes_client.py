@@ -3,6 +3,7 @@ Kubernetes client for discovering and managing ingress/routes
 """
 
 import fnmatch
+import re
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Set, Tuple
 
@@ -18,7 +19,18 @@ from .config import (
     SELF_APP_NAME,
     SELF_POD_NAME,
     SELF_POD_NAMESPACE,
+    WILDCARD_HOST_LABELS,
 )
+from .policy import ANNOTATION_PREFIX, compile_policy
+
+# Concrete targets for routes that can't be probed literally
+PROBE_HOSTS_ANNOTATION = f"{ANNOTATION_PREFIX}probe-hosts"
+PROBE_PATH_ANNOTATION = f"{ANNOTATION_PREFIX}probe-path"
+
+# Characters that make an Ingress/HTTPRoute path a regular expression
+_REGEX_PATH_CHARS = re.compile(r"[()\[\]{}*+?|^$\\]")
+# ...and, inside a regex path, every metacharacter
+_REGEX_METACHARS = re.compile(r"[.()\[\]{}*+?|^$\\]")
 
 # Cache global pour les ressources Kubernetes
 _kubernetes_cache: Dict[str, Any] = {"data": None, "last_updated": None, "expiry": None}
@@ -139,8 +151,10 @@ def _filter_annotations(annotations: Dict[str, str]) -> Dict[str, str]:
     other_annotations = {}
 
     for key, value in annotations.items():
-        # Garder les annotations essentielles en priorité
-        if key in essential_annotations:
+        # Garder les annotations essentielles en priorité. Les annotations
+        # portal-checker.io/* pilotent la politique de test et ne doivent
+        # jamais être évincées par la limite.
+        if key in essential_annotations or key.startswith(ANNOTATION_PREFIX):
             result[key] = value
         # Pour les autres, filtrer celles avec des valeurs trop longues
         elif len(str(value)) <= 50:
@@ -180,6 +194,144 @@ def _is_self_resource(name: str, namespace: str, labels: Dict[str, str]) -> bool
     return SELF_APP_NAME in name
 
 
+def _ingress_lb_addresses(ingress: Any) -> List[str]:
+    """IPs / hostnames published in status.loadBalancer.ingress"""
+    status = getattr(ingress, "status", None)
+    load_balancer = getattr(status, "load_balancer", None) if status else None
+    addresses = []
+    for entry in getattr(load_balancer, "ingress", None) or []:
+        address = entry.ip or entry.hostname
+        if address and address not in addresses:
+            addresses.append(address)
+    return addresses
+
+
+def _gateway_lb_addresses(
+    custom_api: Any,
+    namespace: str,
+    name: str,
+    cache: Dict[Tuple[str, str], List[str]],
+) -> List[str]:
+    """Addresses published in a Gateway's status (cached per discovery)"""
+    key = (namespace, name)
+    if key not in cache:
+        try:
+            gateway = custom_api.get_namespaced_custom_object(
+                group="gateway.networking.k8s.io",
+                version="v1beta1",
+                namespace=namespace,
+                plural="gateways",
+                name=name,
+            )
+            cache[key] = [
+                address["value"]
+                for address in gateway.get("status", {}).get("addresses", [])
+                if address.get("value")
+            ]
+        except Exception as e:
+            logger.debug(f"Gateway {namespace}/{name} introuvable: {e}")
+            cache[key] = []
+    return cache[key]
+
+
+def _is_regex_path(path: str, path_type: Optional[str]) -> bool:
+    return path_type == "RegularExpression" or bool(_REGEX_PATH_CHARS.search(path))
+
+
+def _literal_path(path: str) -> Optional[str]:
+    """Literal prefix of a regex path, if the regex itself matches it.
+
+    ``/api(/|$)(.*)`` gives ``/api``; ``/user/[0-9]+`` gives None since
+    ``/user/`` would not be routed.
+    """
+    pattern = path.lstrip("^")
+    prefix = _REGEX_METACHARS.split(pattern, 1)[0] or "/"
+    try:
+        return prefix if re.fullmatch(pattern, prefix) else None
+    except re.error:
+        return None
+
+
+def _probe_targets(
+    host: str, path: str, path_type: Optional[str], annotations: Dict[str, str]
+) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+    """Pre-flight classification of one route rule.
+
+    Returns the concrete (host, path) pairs to probe, or no target and the
+    reason why the route can't be probed as discovered (wildcard host,
+    regex path without a literal form).
+    """
+    hosts = [host]
+    if host.startswith("*."):
+        probe_hosts = annotations.get(PROBE_HOSTS_ANNOTATION, "")
+        hosts = [h.strip() for h in probe_hosts.split(",") if h.strip()]
+        if not hosts:
+            hosts = [f"{label}{host[1:]}" for label in WILDCARD_HOST_LABELS]
+        if not hosts:
+            return [], f"hôte wildcard {host}"
+
+    if _is_regex_path(path, path_type):
+        literal = annotations.get(PROBE_PATH_ANNOTATION) or _literal_path(path)
+        if literal is None:
+            return [], f"chemin regex {path}"
+        path = literal
+
+    return [(target_host, path) for target_host in hosts], None
+
+
+def _build_url(host: str, path: str) -> str:
+    return f"https://{host}{path}" if path != "/" else f"https://{host}"
+
+
+def _namespace_services(
+    v1_core: Any, namespace: str, cache: Dict[str, Optional[Set[str]]]
+) -> Optional[Set[str]]:
+    """Service names of a namespace (None if they can't be listed)"""
+    if namespace not in cache:
+        try:
+            services = v1_core.list_namespaced_service(namespace)
+            cache[namespace] = {svc.metadata.name for svc in services.items}
+        except Exception as e:
+            logger.debug(f"Services de {namespace} non listables: {e}")
+            cache[namespace] = None
+    return cache[namespace]
+
+
+def _missing_backend(
+    v1_core: Any,
+    backends: List[Tuple[str, str]],
+    cache: Dict[str, Optional[Set[str]]],
+) -> Optional[str]:
+    """Reason if none of the (namespace, service) backends exists"""
+    if not backends:
+        return None
+    for namespace, name in backends:
+        services = _namespace_services(v1_core, namespace, cache)
+        if services is None or name in services:
+            return None
+    namespace, name = backends[0]
+    return f"Service backend introuvable: {namespace}/{name}"
+
+
+def _route_entries(
+    host: str,
+    path: str,
+    path_type: Optional[str],
+    annotations: Dict[str, str],
+    backend_reason: Optional[str],
+    preflight: Dict[str, int],
+) -> List[Tuple[str, str, Optional[str]]]:
+    """(url, path, probe_skip reason) entries generated for one route rule"""
+    targets, reason = _probe_targets(host, path, path_type, annotations)
+    reason = reason or backend_reason
+    if reason:
+        preflight["skipped"] += 1
+        return [(_build_url(host, path), path, reason)]
+    if len(targets) > 1 or targets[0] != (host, path):
+        preflight["substituted"] += 1
+    return [(_build_url(h, p), p, None) for h, p in targets]
+
+
 def _deduplicate_urls(urls_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Remove duplicate URLs based on (url, namespace, name) triplet"""
     seen: Set[Tuple[str, str, str]] = set()
@@ -225,11 +377,25 @@ def get_all_urls_with_details(force_refresh: bool = False) -> List[Dict[str, Any
     try:
         namespaces = v1_core.list_namespace()
         namespace_names = [ns.metadata.name for ns in namespaces.items]
+        # portal-checker.io/* annotations of a namespace are the default
+        # policy of its routes (e.g. probe: tcp for a whole namespace)
+        namespace_policies = {
+            ns.metadata.name: {
+                key: value
+                for key, value in (ns.metadata.annotations or {}).items()
+                if key.startswith(ANNOTATION_PREFIX)
+            }
+            for ns in namespaces.items
+        }
         logger.debug(f"📦 {len(namespace_names)} namespaces trouvés")
     except Exception as e:
         logger.error(f"❌ Erreur lors de la récupération des namespaces: {e}")
         return []
 
+    # Pre-flight classification state, shared by Ingresses and HTTPRoutes
+    namespace_services: Dict[str, Optional[Set[str]]] = {}
+    preflight = {"skipped": 0, "substituted": 0}
+
     # Process Ingresses
     self_excluded_count = 0
     for namespace in namespace_names:
@@ -255,45 +421,64 @@ def get_all_urls_with_details(force_refresh: bool = False) -> List[Dict[str, Any
                         "kubernetes.io/ingress.class", "nginx"
                     )
 
+                lb_addresses = _ingress_lb_addresses(ingress)
                 for rule in ingress.spec.rules or []:
                     host = rule.host
                     if not host:
                         continue
 
                     for path in rule.http.paths if rule.http else []:
-                        url = (
-                            f"https://{host}{path.path}"
-                            if path.path != "/"
-                            else f"https://{host}"
-                        )
-
                         filtered_annotations = _filter_annotations(
                             ingress.metadata.annotations or {}
                         )
+                        policy = compile_policy(
+                            {
+                                **namespace_policies.get(namespace, {}),
+                                **(ingress.metadata.annotations or {}),
+                            }
+                        )
+                        backend_service = (
+                            path.backend.service.name if path.backend.service else None
+                        )
+                        backend_reason = _missing_backend(
+                            v1_core,
+                            [(namespace, backend_service)] if backend_service else [],
+                            namespace_services,
+                        )
 
-                        url_data = {
-                            "url": url,
-                            "namespace": namespace,
-                            "name": ingress.metadata.name,
-                            "type": "ingress",
-                            "ingress_class": ingress_class,
-                            "annotations": filtered_annotations,
-                            "labels": ingress.metadata.labels or {},
-                            "path": path.path,
-                            "backend": {
-                                "service": path.backend.service.name
-                                if path.backend.service
-                                else None,
-                                "port": path.backend.service.port.number
-                                if path.backend.service and path.backend.service.port
-                                else None,
-                            },
-                        }
-                        all_urls_data.append(url_data)
+                        for url, probe_path, probe_skip in _route_entries(
+                            host,
+                            path.path or "/",
+                            path.path_type,
+                            ingress.metadata.annotations or {},
+                            backend_reason,
+                            preflight,
+                        ):
+                            url_data = {
+                                "url": url,
+                                "namespace": namespace,
+                                "name": ingress.metadata.name,
+                                "type": "ingress",
+                                "ingress_class": ingress_class,
+                                "annotations": filtered_annotations,
+                                "labels": ingress.metadata.labels or {},
+                                "path": probe_path,
+                                "backend": {
+                                    "service": backend_service,
+                                    "port": path.backend.service.port.number
+                                    if path.backend.service and path.backend.service.port
+                                    else None,
+                                },
+                                "policy": policy.overrides(),
+                                "lb_addresses": lb_addresses,
+                                "probe_skip": probe_skip,
+                            }
+                            all_urls_data.append(url_data)
         except Exception as e:
             logger.debug(f"Pas d'Ingress dans {namespace}: {e}")
 
     # Process HTTPRoutes (Gateway API)
+    gateway_addresses: Dict[Tuple[str, str], List[str]] = {}
     for namespace in namespace_names:
         try:
             routes = custom_api.list_namespaced_custom_object(
@@ -320,17 +505,29 @@ def get_all_urls_with_details(force_refresh: bool = False) -> List[Dict[str, Any
                     for rule in route["spec"].get("rules", []):
                         for match in rule.get("matches", [{}]):
                             path = match.get("path", {}).get("value", "/")
-                            url = (
-                                f"https://{hostname}{path}"
-                                if path != "/"
-                                else f"https://{hostname}"
-                            )
+                            path_type = match.get("path", {}).get("type")
 
                             filtered_annotations = _filter_annotations(
                                 route["metadata"].get("annotations", {})
                             )
+                            policy = compile_policy(
+                                {
+                                    **namespace_policies.get(namespace, {}),
+                                    **route["metadata"].get("annotations", {}),
+                                }
+                            )
 
                             backend_refs = rule.get("backendRefs", [])
+                            backend_reason = _missing_backend(
+                                v1_core,
+                                [
+                                    (ref.get("namespace", namespace), ref["name"])
+                                    for ref in backend_refs
+                                    if ref.get("kind", "Service") == "Service"
+                                    and ref.get("name")
+                                ],
+                                namespace_services,
+                            )
                             backend_info = {
                                 "service": backend_refs[0].get("name")
                                 if backend_refs
@@ -339,22 +536,42 @@ def get_all_urls_with_details(force_refresh: bool = False) -> List[Dict[str, Any
                                 if backend_refs
                                 else None,
                             }
+                            if backend_refs and backend_refs[0].get("namespace"):
+                                # Cross-namespace backend (ReferenceGrant)
+                                backend_info["namespace"] = backend_refs[0]["namespace"]
 
                             gateway_ref = route["spec"].get("parentRefs", [{}])[0]
                             gateway_name = gateway_ref.get("name", "unknown")
+                            lb_addresses = _gateway_lb_addresses(
+                                custom_api,
+                                gateway_ref.get("namespace", namespace),
+                                gateway_name,
+                                gateway_addresses,
+                            )
 
-                            url_data = {
-                                "url": url,
-                                "namespace": namespace,
-                                "name": route_name,
-                                "type": "httproute",
-                                "ingress_class": f"gateway/{gateway_name}",
-                                "annotations": filtered_annotations,
-                                "labels": route["metadata"].get("labels", {}),
-                                "path": path,
-                                "backend": backend_info,
-                            }
-                            all_urls_data.append(url_data)
+                            for url, probe_path, probe_skip in _route_entries(
+                                hostname,
+                                path,
+                                path_type,
+                                route["metadata"].get("annotations", {}),
+                                backend_reason,
+                                preflight,
+                            ):
+                                url_data = {
+                                    "url": url,
+                                    "namespace": namespace,
+                                    "name": route_name,
+                                    "type": "httproute",
+                                    "ingress_class": f"gateway/{gateway_name}",
+                                    "annotations": filtered_annotations,
+                                    "labels": route["metadata"].get("labels", {}),
+                                    "path": probe_path,
+                                    "backend": backend_info,
+                                    "policy": policy.overrides(),
+                                    "lb_addresses": lb_addresses,
+                                    "probe_skip": probe_skip,
+                                }
+                                all_urls_data.append(url_data)
         except Exception as e:
             logger.debug(f"Pas de HTTPRoute dans {namespace}: {e}")
 
@@ -378,6 +595,11 @@ def get_all_urls_with_details(force_refresh: bool = False) -> List[Dict[str, Any
     logger.info(
         f"🔍 {len(all_urls_data)} URLs totales générées, {excluded_count} URLs exclues"
     )
+    if preflight["skipped"] or preflight["substituted"]:
+        logger.info(
+            f"🚧 {preflight['skipped']} routes non testables (wildcard, regex, backend absent), "
+            f"{preflight['substituted']} routes converties en cibles concrètes"
+        )
 
     # Deduplicate URLs
     unique_urls = _deduplicate_urls(filtered_urls)
@@ -446,6 +668,9 @@ def save_urls_to_file(urls_data: List[Dict[str, Any]], filepath: str) -> None:
                     "labels": data.get("labels", {}),
                     "path": data.get("path", "/"),
                     "backend": data.get("backend", {}),
+                    "policy": data.get("policy", {}),
+                    "lb_addresses": data.get("lb_addresses", []),
+                    "probe_skip": data.get("probe_skip"),
                 }
                 for data in urls_data
             ]
@@ -0,0 +1,148 @@
+"""
+Layer-4 probes: TCP connect and optional TLS handshake, without HTTP
+"""
+
+import asyncio
+import contextlib
+import os
+import socket
+import ssl
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from .config import CUSTOM_CERT
+from .policy import CheckPolicy
+from .timeouts import TimeoutBudget
+from .tracing import ProbeTimings
+
+# Time allowed to the TLS close_notify exchange after a handshake probe
+CLOSE_TIMEOUT_SECONDS = 1.0
+
+_context_state: Dict[str, Optional[ssl.SSLContext]] = {"context": None}
+
+
+def _verifying_context() -> ssl.SSLContext:
+    """TLS context shared by L4 probes (always verifies the certificate)"""
+    if _context_state["context"] is None:
+        context = ssl.create_default_context()
+        if CUSTOM_CERT and os.path.exists(CUSTOM_CERT):
+            context.load_verify_locations(CUSTOM_CERT)
+        _context_state["context"] = context
+    return _context_state["context"]
+
+
+def cert_info(cert: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ssl_info of a result from a getpeercert() dict"""
+    not_after = cert.get("notAfter") if cert else None
+    if not not_after:
+        return None
+    # Date format: 'Jan 1 00:00:00 2025 GMT'
+    expiry_date = datetime.strptime(not_after, "%b %d %H:%M:%S %Y %Z")
+    return {
+        "expiry_date": expiry_date.isoformat(),
+        "days_remaining": (expiry_date - datetime.now()).days,
+        "issuer": cert.get("issuer", []),
+        "subject": cert.get("subject", []),
+    }
+
+
+def _fail(data: Dict[str, Any], status: int, details: str) -> Dict[str, Any]:
+    data["status"] = status
+    data["details"] = details
+    data["healthy"] = False
+    return data
+
+
+async def check_l4(
+    data: Dict[str, Any],
+    policy: CheckPolicy,
+    budget: TimeoutBudget,
+    resolver: Any,
+) -> Dict[str, Any]:
+    """Probe a URL's listener: TCP connect, plus the TLS handshake and its
+    certificate with the "tls" probe. No HTTP request is sent.
+
+    Failures are reported with the statuses of HTTP probes (408 timeouts,
+    495 certificate errors, 503 connect errors).
+    """
+    url = data.get("url", "")
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = parsed.hostname or ""
+    port = parsed.port or (80 if parsed.scheme == "http" else 443)
+    # Plain http listeners have no handshake: "tls" falls back to "tcp"
+    use_tls = policy.probe == "tls" and parsed.scheme != "http"
+
+    data["last_checked"] = time.time()
+    timings = ProbeTimings()
+    phase = "tcp_connect"
+    sock: Optional[socket.socket] = None
+    tls_writer: Optional[asyncio.StreamWriter] = None
+    try:
+        async with asyncio.timeout(budget.total):
+            timings.start("dns")
+            try:
+                family, ip = (await resolver.lookup(host))[0]
+            except OSError as e:
+                return _fail(data, 503, f"DNS Error: {str(e)[:150]}")
+            finally:
+                timings.stop("dns")
+
+            loop = asyncio.get_running_loop()
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            started = time.monotonic()
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), budget.connect)
+            connected = time.monotonic()
+            timings.add("tcp_connect", connected - started)
+
+            ssl_info: Optional[Dict[str, Any]] = None
+            details = "Connexion TCP établie"
+            if use_tls:
+                phase = "tls_handshake"
+                _, tls_writer = await asyncio.wait_for(
+                    asyncio.open_connection(
+                        sock=sock, ssl=_verifying_context(), server_hostname=host
+                    ),
+                    budget.tls,
+                )
+                sock = None  # owned by the transport from now on
+                timings.add("tls_handshake", time.monotonic() - connected)
+                ssl_info = cert_info(tls_writer.get_extra_info("ssl_object").getpeercert())
+                details = "Handshake TLS réussi"
+            elif parsed.scheme == "http":
+                ssl_info = {"http_only": True}
+
+        data["status"] = 200
+        data["details"] = details
+        data["healthy"] = True
+        data["ssl_info"] = ssl_info
+        return data
+
+    except (asyncio.TimeoutError, TimeoutError):
+        if phase == "tls_handshake":
+            return _fail(data, 408, "Timeout (TLS)")
+        return _fail(data, 408, "Timeout (connexion)")
+
+    except ssl.SSLCertVerificationError as e:
+        logger.debug(f"Certificat invalide pour {host}:{port}: {e}")
+        return _fail(data, 495, "SSL Certificate Error")
+
+    except (OSError, ssl.SSLError) as e:
+        return _fail(data, 503, f"Connection Error: {str(e)[:150]}")
+
+    finally:
+        if sock is not None:
+            sock.close()
+        timings.finish()
+        data["timings"] = timings.as_dict()
+        data["response_time"] = int(timings.phases["total"] * 1000)
+        if tls_writer is not None:
+            tls_writer.close()
+            # Finish the transport teardown, outside the measured time; a
+            # peer that never answers the close_notify doesn't matter.
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(tls_writer.wait_closed(), CLOSE_TIMEOUT_SECONDS)
@@ -0,0 +1,158 @@
+"""
+Pin probed hosts to the load-balancer addresses published by their Ingress
+or Gateway, bypassing public DNS
+"""
+
+import asyncio
+import ipaddress
+import socket
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+from aiohttp.abc import AbstractResolver
+from loguru import logger
+
+from .dns_cache import Address, CachingResolver, HostNotFoundError
+from .metrics import register_metrics_provider
+
+MISMATCH_CHECK_CONCURRENCY = 100
+
+_stats = {"pinned_hosts": 0, "unassigned_urls": 0, "dns_mismatches": 0}
+
+
+def _hostname(url: str) -> Optional[str]:
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    return (parsed.hostname or "").lower() or None
+
+
+def _ip_family(address: str) -> Optional[int]:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return None
+    return socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+
+
+def build_pin_map(data_urls: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """{hostname: load-balancer addresses} of URLs with an assigned address"""
+    pins: Dict[str, List[str]] = {}
+    for data in data_urls:
+        host = _hostname(data.get("url", ""))
+        if not host:
+            continue
+        for address in data.get("lb_addresses") or []:
+            targets = pins.setdefault(host, [])
+            if address not in targets:
+                targets.append(address)
+    return pins
+
+
+def has_no_lb_address(data: Dict[str, Any]) -> bool:
+    """True for discovered routes whose Ingress/Gateway has no address yet.
+
+    URLs without the field (not discovered from a route) are resolved
+    through DNS as usual.
+    """
+    return "lb_addresses" in data and not data["lb_addresses"]
+
+
+class PinnedResolver(AbstractResolver):
+    """Resolve pinned hosts to their load-balancer addresses.
+
+    The connection keeps the original host for SNI and the Host header;
+    only the address it connects to changes. Load balancers published as
+    hostnames (cloud LBs) and unpinned hosts go through ``upstream``.
+    """
+
+    def __init__(self, pins: Dict[str, List[str]], upstream: CachingResolver) -> None:
+        self.pins = pins
+        self._upstream = upstream
+
+    async def lookup(self, host: str, family: int = socket.AF_UNSPEC) -> List[Address]:
+        targets = self.pins.get(host.lower())
+        if not targets:
+            return await self._upstream.lookup(host, family)
+        addresses: List[Address] = []
+        for target in targets:
+            target_family = _ip_family(target)
+            if target_family is None:
+                try:
+                    addresses.extend(await self._upstream.lookup(target, family))
+                except OSError as e:
+                    logger.debug(f"Load balancer {target} de {host} non résolu: {e}")
+            elif family in (socket.AF_UNSPEC, target_family):
+                addresses.append((target_family, target))
+        if not addresses:
+            raise HostNotFoundError(host)
+        return addresses
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> List[Dict[str, Any]]:
+        addresses = await self.lookup(host, family)
+        return [
+            {
+                "hostname": host,
+                "host": ip,
+                "port": port,
+                "family": addr_family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+            }
+            for addr_family, ip in addresses
+        ]
+
+    async def close(self) -> None:
+        pass
+
+    async def find_dns_mismatches(
+        self, concurrency: int = MISMATCH_CHECK_CONCURRENCY
+    ) -> Dict[str, str]:
+        """Pinned hosts whose public DNS doesn't point at their load balancer"""
+        sem = asyncio.Semaphore(concurrency)
+        mismatches: Dict[str, str] = {}
+
+        async def check(host: str) -> None:
+            async with sem:
+                try:
+                    lb_ips = {ip for _, ip in await self.lookup(host)}
+                except OSError:
+                    return
+                try:
+                    dns_ips = {ip for _, ip in await self._upstream.lookup(host)}
+                except HostNotFoundError:
+                    mismatches[host] = "DNS: NXDOMAIN"
+                    return
+                except OSError as e:
+                    logger.debug(f"Vérification DNS/LB impossible pour {host}: {e}")
+                    return
+                if not dns_ips & lb_ips:
+                    mismatches[host] = (
+                        f"DNS {', '.join(sorted(dns_ips))} ≠ LB {', '.join(sorted(lb_ips))}"
+                    )
+
+        await asyncio.gather(*(check(host) for host in self.pins))
+        return mismatches
+
+
+def record_pinning_cycle(
+    pins: Dict[str, List[str]], unassigned: int, mismatches: Dict[str, str]
+) -> None:
+    _stats["pinned_hosts"] = len(pins)
+    _stats["unassigned_urls"] = unassigned
+    _stats["dns_mismatches"] = len(mismatches)
+    if unassigned:
+        logger.warning(f"⚠️ {unassigned} URLs sans adresse de load balancer assignée")
+    for host, details in sorted(mismatches.items()):
+        logger.warning(f"⚠️ DNS incohérent avec le load balancer pour {host}: {details}")
+
+
+def unpinned_hosts(
+    data_urls: Iterable[Dict[str, Any]], pins: Dict[str, List[str]]
+) -> Set[str]:
+    """Hosts of URLs still resolved through DNS"""
+    hosts = {_hostname(data.get("url", "")) for data in data_urls}
+    return {host for host in hosts if host and host not in pins}
+
+
+register_metrics_provider("lb_pinning", lambda: dict(_stats))
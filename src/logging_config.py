@@ -0,0 +1,63 @@
+"""
+Loguru setup shared by the main process and the check workers
+"""
+
+import sys
+
+from loguru import logger
+
+
+def setup_logger(log_format: str = "text", log_level: str = "INFO") -> None:
+    """
+    Configure logger according to desired format (text or JSON)
+    """
+    # Remove existing handlers to avoid duplication
+    logger.remove()
+
+    if log_format.lower() == "json":
+        # JSON format configuration
+        logger.add(
+            sys.stdout,
+            level=log_level,
+            serialize=True,  # Enable native JSON serialization
+            format="{message}",
+            enqueue=True,  # Make logging thread-safe
+            backtrace=True,  # Include detailed stack traces
+            diagnose=False,  # Disable local variable display in traces
+            catch=True,  # Capture logging errors
+        )
+    else:
+        # Human-readable text format (without icons)
+        def clean_message(record):
+            # Clean message from icons
+            message = record["message"]
+            message = (
+                message.replace("🐞", "")
+                .replace("🔧", "")
+                .replace("⚠️", "")
+                .replace("❌", "")
+                .replace("✅", "")
+            )
+            message = (
+                message.replace("🔄", "")
+                .replace("📊", "")
+                .replace("🚀", "")
+                .replace("💾", "")
+                .replace("ℹ️", "")
+            )
+            record["message"] = message.strip()
+            return True
+
+        # Configure colored text logging with cleaned messages
+        logger.add(
+            sys.stdout,
+            level=log_level,
+            format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | <level>{message}</level>",
+            enqueue=True,
+            backtrace=True,
+            diagnose=True,
+            catch=True,
+            filter=clean_message,  # Apply message cleaning
+        )
+
+    logger.info(f"🔧 Logger configuré en mode {log_format.upper()}")
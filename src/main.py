@@ -10,7 +10,14 @@ import hypercorn.asyncio
 from hypercorn import Config as HypercornConfig
 from loguru import logger
 
-from .api import _run_url_tests, app, refresh_urls_if_needed
+from .alerts import get_alert_dispatcher
+from .api import (
+    _run_url_tests,
+    _test_results_cache,
+    app,
+    get_tick_interval,
+    refresh_urls_if_needed,
+)
 from .config import (
     CHECK_INTERVAL,
     DISCOVERY_INTERVAL,
@@ -20,67 +27,25 @@ from .config import (
     PORT,
     URLS_FILE,
 )
+from .endpoints import (
+    get_backend_readiness,
+    start_readiness_watch,
+    stop_readiness_watch,
+)
+from .event_loop import loop_implementation, new_event_loop, run_coroutine
+from .events import get_event_journal
 from .kubernetes_client import (
     get_all_urls_with_details,
     init_kubernetes,
     save_urls_to_file,
 )
-
-
-def setup_logger(log_format: str = "text", log_level: str = "INFO") -> None:
-    """
-    Configure logger according to desired format (text or JSON)
-    """
-    # Remove existing handlers to avoid duplication
-    logger.remove()
-
-    if log_format.lower() == "json":
-        # JSON format configuration
-        logger.add(
-            sys.stdout,
-            level=log_level,
-            serialize=True,  # Enable native JSON serialization
-            format="{message}",
-            enqueue=True,  # Make logging thread-safe
-            backtrace=True,  # Include detailed stack traces
-            diagnose=False,  # Disable local variable display in traces
-            catch=True,  # Capture logging errors
-        )
-    else:
-        # Human-readable text format (without icons)
-        def clean_message(record):
-            # Clean message from icons
-            message = record["message"]
-            message = (
-                message.replace("🐞", "")
-                .replace("🔧", "")
-                .replace("⚠️", "")
-                .replace("❌", "")
-                .replace("✅", "")
-            )
-            message = (
-                message.replace("🔄", "")
-                .replace("📊", "")
-                .replace("🚀", "")
-                .replace("💾", "")
-                .replace("ℹ️", "")
-            )
-            record["message"] = message.strip()
-            return True
-
-        # Configure colored text logging with cleaned messages
-        logger.add(
-            sys.stdout,
-            level=log_level,
-            format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | <level>{message}</level>",
-            enqueue=True,
-            backtrace=True,
-            diagnose=True,
-            catch=True,
-            filter=clean_message,  # Apply message cleaning
-        )
-
-    logger.info(f"🔧 Logger configuré en mode {log_format.upper()}")
+from .logging_config import setup_logger
+from .warm_start import (
+    heartbeat,
+    mark_background_started,
+    save_snapshot,
+    take_initial_cycle,
+)
 
 
 async def periodic_url_tests():
@@ -92,6 +57,7 @@ async def periodic_url_tests():
     """
     global _stop_background_task
     last_discovery_at = 0.0
+    readiness = get_backend_readiness()
 
     while not _stop_background_task:
         try:
@@ -105,23 +71,30 @@ async def periodic_url_tests():
                     logger.error(f"❌ Erreur de re-découverte K8s: {exc}")
                 last_discovery_at = now
 
+            # The initial check probes every URL, then only due ones
+            initial = take_initial_cycle()
             logger.debug(
-                f"🔄 Démarrage du test périodique (intervalle: {CHECK_INTERVAL}s)"
+                f"🔄 Démarrage du test {'initial' if initial else 'périodique'} "
+                f"(intervalle: {get_tick_interval()}s)"
             )
-            await _run_url_tests(update_cache=True)
+            await _run_url_tests(update_cache=True, only_due=not initial)
 
             if not _stop_background_task:
                 logger.info(
-                    f"✅ Test périodique terminé, prochaine exécution dans {CHECK_INTERVAL}s"
+                    f"✅ Test périodique terminé, prochaine exécution dans {get_tick_interval()}s"
                 )
 
         except Exception as e:
             logger.error(f"❌ Erreur lors du test périodique: {e}")
 
-        # Wait for next interval or until stop signal
-        for _ in range(CHECK_INTERVAL):
+        # Wait for next scheduler tick, a backend recovery or stop signal
+        for _ in range(get_tick_interval()):
+            heartbeat()
             if _stop_background_task:
                 break
+            if readiness is not None and readiness.wake.is_set():
+                logger.debug("🔄 Backend rétabli, test anticipé")
+                break
             await asyncio.sleep(1)
 
 
@@ -130,7 +103,7 @@ def start_background_tasks():
 
     def run_background():
         try:
-            loop = asyncio.new_event_loop()
+            loop = new_event_loop()
             asyncio.set_event_loop(loop)
             loop.run_until_complete(periodic_url_tests())
         except Exception as e:
@@ -139,9 +112,13 @@ def start_background_tasks():
             loop.close()
 
     global _background_task
+    mark_background_started()
     _background_task = threading.Thread(target=run_background, daemon=True)
     _background_task.start()
-    logger.info(f"🚀 Tâche de fond démarrée (tests toutes les {CHECK_INTERVAL}s)")
+    logger.info(
+        f"🚀 Tâche de fond démarrée (tests toutes les {CHECK_INTERVAL}s, "
+        f"boucle {loop_implementation()})"
+    )
 
 
 # Global variables for background task management
@@ -151,6 +128,8 @@ _stop_background_task = False
 
 def main():
     """Main application entry point"""
+    global _stop_background_task
+
     # Setup logging
     setup_logger(LOG_FORMAT, LOG_LEVEL)
     logger.info("🚀 Démarrage de Portal Checker...")
@@ -162,12 +141,31 @@ def main():
         logger.error(f"❌ Impossible d'initialiser Kubernetes: {e}")
         sys.exit(1)
 
-    # Auto-refresh URLs if needed
+    # Warm start; the initial check runs in the background loop
     refresh_urls_if_needed()
 
     # Start background tasks
+    start_readiness_watch()
     start_background_tasks()
 
+    try:
+        serve()
+    finally:
+        # Snapshot for the next start (SIGTERM ends serve() gracefully)
+        _stop_background_task = True
+        stop_readiness_watch()
+        save_snapshot(_test_results_cache)
+        journal = get_event_journal()
+        if journal is not None:
+            journal.flush()
+        # Deliver the queued alerts (bounded) before the process exits
+        dispatcher = get_alert_dispatcher()
+        if dispatcher is not None:
+            dispatcher.stop()
+
+
+def serve():
+    """Run the web server until shutdown"""
     if FLASK_ENV == "development":
         # Development mode with Flask dev server
         logger.info(f"🔧 Mode développement - Serveur Flask sur http://0.0.0.0:{PORT}")
@@ -188,11 +186,9 @@ def main():
         try:
             # Convert Flask WSGI app to ASGI
             asgi_app = WsgiToAsgi(app)
-            asyncio.run(hypercorn.asyncio.serve(asgi_app, config))
+            run_coroutine(hypercorn.asyncio.serve(asgi_app, config))
         except KeyboardInterrupt:
             logger.info("🛑 Arrêt du serveur...")
-            global _stop_background_task
-            _stop_background_task = True
         except Exception as e:
             logger.error(f"❌ Erreur du serveur: {e}")
             sys.exit(1)
@@ -0,0 +1,28 @@
+"""
+Runtime metrics registry exposed by /api/metrics
+"""
+
+from typing import Any, Callable, Dict
+
+from loguru import logger
+
+# name -> callable returning a JSON-serializable dict. Modules register
+# their provider at import time, /api/metrics calls them on demand.
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics_provider(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) a metrics provider"""
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Collect every registered provider, isolating failures"""
+    metrics: Dict[str, Any] = {}
+    for name, provider in list(_providers.items()):
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            logger.debug(f"Erreur du fournisseur de métriques {name}: {e}")
+            metrics[name] = {"error": str(e)}
+    return metrics
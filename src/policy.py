@@ -0,0 +1,224 @@
+"""
+Per-URL check policies compiled from Kubernetes annotations
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from loguru import logger
+
+from .config import (
+    CHECK_INTERVAL,
+    CONNECT_TIMEOUT,
+    FIRST_BYTE_TIMEOUT,
+    REQUEST_TIMEOUT,
+    TLS_TIMEOUT,
+)
+
+ANNOTATION_PREFIX = "portal-checker.io/"
+
+INTERVAL_ANNOTATION = f"{ANNOTATION_PREFIX}interval"
+TIMEOUT_ANNOTATION = f"{ANNOTATION_PREFIX}timeout"
+CONNECT_TIMEOUT_ANNOTATION = f"{ANNOTATION_PREFIX}connect-timeout"
+TLS_TIMEOUT_ANNOTATION = f"{ANNOTATION_PREFIX}tls-timeout"
+FIRST_BYTE_TIMEOUT_ANNOTATION = f"{ANNOTATION_PREFIX}first-byte-timeout"
+METHOD_ANNOTATION = f"{ANNOTATION_PREFIX}method"
+EXPECTED_STATUS_ANNOTATION = f"{ANNOTATION_PREFIX}expected-status"
+MAX_BODY_BYTES_ANNOTATION = f"{ANNOTATION_PREFIX}max-body-bytes"
+PROBE_ANNOTATION = f"{ANNOTATION_PREFIX}probe"
+
+# OK or warning codes (not critical errors) used when no expected-status
+# annotation is set on the resource.
+DEFAULT_EXPECTED_STATUS: FrozenSet[int] = frozenset(
+    {200, 301, 302, 401, 403, 405, 429}
+)
+
+# Only safe methods are allowed: a probe must never mutate the target.
+ALLOWED_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# "http": full request; "tcp": connect only; "tls": connect + handshake
+PROBE_TYPES = {"http", "tcp", "tls"}
+
+_DURATION_RE = re.compile(r"^\s*(\d+)\s*(ms|s|m|h)?\s*$")
+_DURATION_UNITS = {None: 1.0, "ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass(frozen=True)
+class CheckPolicy:
+    """How a single URL is probed and how often"""
+
+    interval: int = CHECK_INTERVAL
+    timeout: float = REQUEST_TIMEOUT
+    method: str = "GET"
+    expected_status: FrozenSet[int] = DEFAULT_EXPECTED_STATUS
+    max_body_bytes: Optional[int] = None
+    # Phase budgets (None: only the total timeout applies)
+    connect_timeout: Optional[float] = CONNECT_TIMEOUT
+    tls_timeout: Optional[float] = TLS_TIMEOUT
+    first_byte_timeout: Optional[float] = FIRST_BYTE_TIMEOUT
+    probe: str = "http"
+
+    def is_expected(self, status_code: int) -> bool:
+        return status_code in self.expected_status
+
+    def overrides(self) -> Dict[str, Any]:
+        """Return only the fields differing from the global defaults"""
+        defaults = DEFAULT_POLICY
+        result: Dict[str, Any] = {}
+        for key, value in asdict(self).items():
+            if value == getattr(defaults, key):
+                continue
+            if key == "expected_status":
+                value = sorted(value)
+            result[key] = value
+        return result
+
+
+DEFAULT_POLICY = CheckPolicy()
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Parse '30', '30s', '500ms', '5m' or '1h' into seconds"""
+    match = _DURATION_RE.match(str(value))
+    if not match:
+        return None
+    amount, unit = match.groups()
+    seconds = int(amount) * _DURATION_UNITS[unit]
+    return seconds if seconds > 0 else None
+
+
+def parse_status_set(value: Any) -> Optional[FrozenSet[int]]:
+    """Parse '200,204,300-399' into a set of status codes"""
+    codes = set()
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                low, high = (int(x) for x in part.split("-", 1))
+                if low > high:
+                    return None
+                codes.update(range(low, high + 1))
+            else:
+                codes.add(int(part))
+        except ValueError:
+            return None
+    if not codes or any(code < 100 or code > 599 for code in codes):
+        return None
+    return frozenset(codes)
+
+
+def compile_policy(annotations: Optional[Dict[str, str]]) -> CheckPolicy:
+    """Build a CheckPolicy from portal-checker.io/* annotations.
+
+    Invalid values are logged and ignored so that a typo on one resource
+    never prevents the URL from being checked with the defaults.
+    """
+    if not annotations:
+        return DEFAULT_POLICY
+    items = tuple(
+        sorted(
+            (key, str(value))
+            for key, value in annotations.items()
+            if key.startswith(ANNOTATION_PREFIX)
+        )
+    )
+    if not items:
+        return DEFAULT_POLICY
+    return _compile_policy_items(items)
+
+
+@lru_cache(maxsize=1024)
+def _compile_policy_items(items: Tuple[Tuple[str, str], ...]) -> CheckPolicy:
+    annotations = dict(items)
+    fields: Dict[str, Any] = {}
+
+    if INTERVAL_ANNOTATION in annotations:
+        interval = parse_duration(annotations[INTERVAL_ANNOTATION])
+        if interval is None:
+            _warn_invalid(INTERVAL_ANNOTATION, annotations[INTERVAL_ANNOTATION])
+        else:
+            fields["interval"] = max(1, int(interval))
+
+    if TIMEOUT_ANNOTATION in annotations:
+        timeout = parse_duration(annotations[TIMEOUT_ANNOTATION])
+        if timeout is None:
+            _warn_invalid(TIMEOUT_ANNOTATION, annotations[TIMEOUT_ANNOTATION])
+        else:
+            fields["timeout"] = timeout
+
+    for annotation, field in (
+        (CONNECT_TIMEOUT_ANNOTATION, "connect_timeout"),
+        (TLS_TIMEOUT_ANNOTATION, "tls_timeout"),
+        (FIRST_BYTE_TIMEOUT_ANNOTATION, "first_byte_timeout"),
+    ):
+        if annotation in annotations:
+            budget = parse_duration(annotations[annotation])
+            if budget is None:
+                _warn_invalid(annotation, annotations[annotation])
+            else:
+                fields[field] = budget
+
+    if METHOD_ANNOTATION in annotations:
+        method = annotations[METHOD_ANNOTATION].strip().upper()
+        if method not in ALLOWED_METHODS:
+            _warn_invalid(METHOD_ANNOTATION, annotations[METHOD_ANNOTATION])
+        else:
+            fields["method"] = method
+
+    if EXPECTED_STATUS_ANNOTATION in annotations:
+        expected = parse_status_set(annotations[EXPECTED_STATUS_ANNOTATION])
+        if expected is None:
+            _warn_invalid(
+                EXPECTED_STATUS_ANNOTATION, annotations[EXPECTED_STATUS_ANNOTATION]
+            )
+        else:
+            fields["expected_status"] = expected
+
+    if MAX_BODY_BYTES_ANNOTATION in annotations:
+        raw = annotations[MAX_BODY_BYTES_ANNOTATION].strip()
+        if raw.isdigit():
+            fields["max_body_bytes"] = int(raw)
+        else:
+            _warn_invalid(MAX_BODY_BYTES_ANNOTATION, raw)
+
+    if PROBE_ANNOTATION in annotations:
+        probe = annotations[PROBE_ANNOTATION].strip().lower()
+        if probe not in PROBE_TYPES:
+            _warn_invalid(PROBE_ANNOTATION, annotations[PROBE_ANNOTATION])
+        else:
+            fields["probe"] = probe
+
+    return CheckPolicy(**fields) if fields else DEFAULT_POLICY
+
+
+def policy_from_dict(overrides: Optional[Dict[str, Any]]) -> CheckPolicy:
+    """Rebuild a CheckPolicy from the overrides persisted in urls.yaml"""
+    if not overrides:
+        return DEFAULT_POLICY
+    fields = dict(overrides)
+    if "expected_status" in fields:
+        fields["expected_status"] = frozenset(fields["expected_status"])
+    try:
+        return CheckPolicy(**fields)
+    except TypeError as e:
+        logger.warning(f"⚠️ Politique de test invalide ignorée {overrides}: {e}")
+        return DEFAULT_POLICY
+
+
+def get_check_policy(data: Dict[str, Any]) -> CheckPolicy:
+    """Return the policy for a URL entry.
+
+    Entries discovered by this version carry a pre-compiled ``policy``;
+    older urls.yaml files only have the annotations.
+    """
+    if "policy" in data:
+        return policy_from_dict(data["policy"])
+    return compile_policy(data.get("annotations"))
+
+
+def _warn_invalid(annotation: str, value: Any) -> None:
+    logger.warning(f"⚠️ Valeur invalide pour l'annotation {annotation}: {value!r}")
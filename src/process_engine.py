@@ -0,0 +1,280 @@
+"""
+Multi-process check engine: probes sharded across worker processes
+"""
+
+import asyncio
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from .config import CHECK_WORKER_TIMEOUT_SECONDS, CHECK_WORKERS
+from .metrics import register_metrics_provider
+from .results_store import CycleStats
+from .tracing import PhaseAggregator, record_cycle, record_probe_timings
+from .utils import make_skipped_result
+
+# Fields produced by a probe. Workers send only these back to the parent,
+# which merges them into its own copy of the URL entry.
+RESULT_FIELDS = (
+    "status",
+    "details",
+    "response_time",
+    "ssl_info",
+    "healthy",
+    "timings",
+    "last_checked",
+    "lb_dns_mismatch",
+)
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def detect_cpu_limit() -> int:
+    """CPUs available to the container (cgroup v2 quota, then affinity)"""
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_worker_count(value: str) -> int:
+    """Parse CHECK_WORKERS ("auto" or a number, at least 1)"""
+    if str(value).strip().lower() == "auto":
+        return detect_cpu_limit()
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"⚠️ CHECK_WORKERS invalide: {value}, 1 utilisé")
+        return 1
+
+
+def shard_of(data: Dict[str, Any], shards: int) -> int:
+    """Shard of a URL, by host so each worker keeps its connections warm"""
+    url = data.get("url", "")
+    host = urlparse(url if "://" in url else f"https://{url}").hostname or url
+    return zlib.crc32(host.encode()) % shards
+
+
+def _worker_main(conn, log_format: str, log_level: str) -> None:
+    """Worker process: run every received shard on a long-lived event loop"""
+    from .event_loop import new_event_loop
+    from .logging_config import setup_logger
+    from .utils import check_urls_async
+
+    setup_logger(log_format, log_level)
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    def send_result(index: int, result: Dict[str, Any]) -> None:
+        conn.send(("result", index, {k: result[k] for k in RESULT_FIELDS if k in result}))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            shard = message[1]
+            for index, data in enumerate(shard):
+                data["_shard_index"] = index
+            loop.run_until_complete(
+                check_urls_async(
+                    shard,
+                    on_result=lambda r: send_result(r.pop("_shard_index"), r),
+                )
+            )
+            conn.send(("done",))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        loop.close()
+
+
+class ShardedCheckEngine:
+    """Pool of persistent worker processes, each with its own event loop,
+    connection pool and DNS cache. Results stream back over one pipe per
+    worker as soon as each probe completes. A worker that has not finished
+    its shard within ``shard_timeout`` seconds is killed (and restarted by
+    the next cycle); the URLs it did not report are published as timeouts.
+    """
+
+    def __init__(self, workers: int, shard_timeout: float = CHECK_WORKER_TIMEOUT_SECONDS) -> None:
+        self.workers = workers
+        self.shard_timeout = shard_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[Any]] = [None] * workers
+        self._connections: List[Optional[Any]] = [None] * workers
+        # One cycle at a time per worker (scheduled and manual refreshes)
+        self._locks = [threading.Lock() for _ in range(workers)]
+        self.restarts = 0
+        self.timeouts = 0
+
+    def _ensure_worker(self, index: int):
+        process = self._processes[index]
+        if process is not None and process.is_alive():
+            return self._connections[index]
+        if process is not None:
+            self.restarts += 1
+            logger.warning(f"⚠️ Worker de test {index} redémarré")
+        from .config import LOG_FORMAT, LOG_LEVEL
+
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, LOG_FORMAT, LOG_LEVEL),
+            name=f"portal-checker-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._processes[index] = process
+        self._connections[index] = parent_conn
+        return parent_conn
+
+    def _run_shard(
+        self,
+        index: int,
+        shard: List[Dict[str, Any]],
+        publish: Callable[[Dict[str, Any]], None],
+    ) -> int:
+        """Send a shard to a worker and publish its results (blocking)"""
+        pending = set(range(len(shard)))
+        failure: Optional[tuple] = None
+        with self._locks[index]:
+            deadline = time.monotonic() + self.shard_timeout
+            conn = self._ensure_worker(index)
+            try:
+                conn.send(("check", shard))
+                while True:
+                    if not conn.poll(max(0.0, deadline - time.monotonic())):
+                        self.timeouts += 1
+                        logger.error(
+                            f"❌ Worker de test {index} sans réponse après "
+                            f"{self.shard_timeout}s, redémarrage"
+                        )
+                        failure = (408, "Timeout (worker de test)")
+                        break
+                    message = conn.recv()
+                    if message[0] == "done":
+                        break
+                    _, position, fields = message
+                    data = shard[position]
+                    data.update(fields)
+                    publish(data)
+                    pending.discard(position)
+            except (EOFError, OSError) as e:
+                logger.error(f"❌ Worker de test {index} interrompu: {e}")
+                failure = (503, "Worker de test interrompu")
+            if failure is not None:
+                process = self._processes[index]
+                process.kill()
+                process.join(timeout=5)
+        if failure is not None:
+            for position in sorted(pending):
+                publish(make_skipped_result(shard[position], *failure))
+        return len(shard) - len(pending)
+
+    async def check_urls(
+        self,
+        data_urls: List[Dict[str, Any]],
+        is_url_excluded_func: Optional[Any] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Same contract as utils.check_urls_async, across worker processes"""
+        if is_url_excluded_func:
+            data_urls = [
+                data
+                for data in data_urls
+                if not is_url_excluded_func(data.get("url", ""))
+            ]
+
+        shards: List[List[Dict[str, Any]]] = [[] for _ in range(self.workers)]
+        for data in data_urls:
+            shards[shard_of(data, self.workers)].append(data)
+
+        stats = CycleStats()
+        phases = PhaseAggregator()
+        results: List[Dict[str, Any]] = []
+        publish_lock = threading.Lock()
+        cycle_started = time.monotonic()
+
+        def publish(result: Dict[str, Any]) -> None:
+            with publish_lock:
+                results.append(result)
+                stats.add(result)
+                record_probe_timings(result.get("timings", {}), phases)
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.error(f"❌ Erreur lors de la publication du résultat: {e}")
+
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(self._run_shard, index, shard, publish)
+                for index, shard in enumerate(shards)
+                if shard
+            )
+        )
+        record_cycle(phases, time.monotonic() - cycle_started, len(results))
+
+        status_counts = stats.status_counts
+        logger.info(
+            f"📊 Récapitulatif ({self.workers} workers): ✅ {status_counts['success']} OK | "
+            f"⚠️ {status_counts['client_errors']} 4xx | "
+            f"❌ {status_counts['server_errors']} 5xx"
+        )
+        return results
+
+    def shutdown(self) -> None:
+        for index, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                continue
+            try:
+                self._connections[index].send(("stop",))
+            except OSError:
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for p in self._processes if p is not None and p.is_alive()),
+            "restarts": self.restarts,
+            "timeouts": self.timeouts,
+        }
+
+
+_engine_state: Dict[str, Any] = {"resolved": False, "engine": None}
+_engine_lock = threading.Lock()
+
+
+def get_check_engine() -> Optional[ShardedCheckEngine]:
+    """Process engine configured by CHECK_WORKERS, None for in-thread checks"""
+    with _engine_lock:
+        if not _engine_state["resolved"]:
+            _engine_state["resolved"] = True
+            workers = resolve_worker_count(CHECK_WORKERS)
+            if workers > 1:
+                logger.info(f"🚀 Moteur de test multi-processus: {workers} workers")
+                engine = ShardedCheckEngine(workers)
+                atexit.register(engine.shutdown)
+                register_metrics_provider("check_engine", engine.snapshot_stats)
+                _engine_state["engine"] = engine
+        return _engine_state["engine"]
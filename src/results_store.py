@@ -0,0 +1,123 @@
+"""
+Keyed, versioned store of the latest check result of every URL
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .scheduler import ResultKey, result_key
+
+
+def status_bucket(status: int) -> Optional[str]:
+    """Dashboard bucket of a status code (None for 1xx/3xx/unknown)"""
+    if 200 <= status < 300:
+        return "success"
+    if 400 <= status < 500:
+        return "client_errors"
+    if 500 <= status < 600:
+        return "server_errors"
+    return None
+
+
+class CycleStats:
+    """Status counters updated incrementally as results arrive"""
+
+    def __init__(self) -> None:
+        self.status_counts = {
+            "success": 0,
+            "client_errors": 0,
+            "server_errors": 0,
+            "total": 0,
+        }
+        self.error_summary: Dict[str, int] = {}
+
+    def add(self, result: Dict[str, Any], sign: int = 1) -> None:
+        status = result.get("status", 0) or 0
+        self.status_counts["total"] += sign
+        bucket = status_bucket(status)
+        if bucket:
+            self.status_counts[bucket] += sign
+        if status >= 400:
+            code = f"{status}"
+            count = self.error_summary.get(code, 0) + sign
+            if count:
+                self.error_summary[code] = count
+            else:
+                self.error_summary.pop(code, None)
+
+    def remove(self, result: Dict[str, Any]) -> None:
+        self.add(result, sign=-1)
+
+
+class ResultsStore:
+    """Latest result per URL, published as soon as each probe completes.
+
+    Writers serialize on a lock; readers never lock. ``snapshot()`` relies
+    on ``dict.copy()`` being a single C-level operation under the GIL, so
+    a reader always sees a consistent mapping even while probes publish.
+    Published result dicts must be treated as immutable: to change one,
+    publish a new dict.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[ResultKey, Dict[str, Any]] = {}
+        self._write_lock = threading.Lock()
+        self._stats = CycleStats()
+        self.version = 0
+        self.last_updated: Optional[datetime] = None
+
+    def publish(self, result: Dict[str, Any]) -> int:
+        """Insert or replace the result of one URL, return the new version"""
+        key = result_key(result)
+        with self._write_lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._stats.remove(previous)
+            self._stats.add(result)
+            self._entries[key] = result
+            self.version += 1
+            self.last_updated = datetime.now()
+            return self.version
+
+    def retain(self, keys: Iterable[ResultKey]) -> int:
+        """Drop the results of URLs no longer in the inventory"""
+        keep = set(keys)
+        with self._write_lock:
+            stale = [key for key in self._entries if key not in keep]
+            for key in stale:
+                self._stats.remove(self._entries.pop(key))
+            if stale:
+                self.version += 1
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._entries = {}
+            self._stats = CycleStats()
+            self.version += 1
+            self.last_updated = None
+
+    def get_result(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return list(self._entries.copy().values())
+
+    def status_counts(self) -> Dict[str, int]:
+        return dict(self._stats.status_counts)
+
+    def error_summary(self) -> Dict[str, int]:
+        return dict(self._stats.error_summary)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, key: str) -> Any:
+        # Read-only view matching the former {"results", "last_updated"}
+        # dict cache, kept for callers written against it.
+        if key == "results":
+            return self.snapshot()
+        if key == "last_updated":
+            return self.last_updated
+        raise KeyError(key)
@@ -0,0 +1,117 @@
+"""
+Check scheduling: decides which URLs are due in a given cycle
+"""
+
+import hashlib
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import CHECK_INTERVAL, SAMPLING_SLICES
+from .policy import get_check_policy
+
+ResultKey = Tuple[str, str, str]
+
+# Rotating slice cursor for the sampled checking mode, shared by every
+# scheduled cycle whatever thread/event loop runs it.
+_sampling_state: Dict[str, int] = {"cycle": 0}
+_sampling_lock = threading.Lock()
+
+
+def result_key(data: Dict[str, Any]) -> ResultKey:
+    """Identity of a URL entry, same triplet as discovery deduplication"""
+    return (data.get("url", ""), data.get("namespace", ""), data.get("name", ""))
+
+
+def url_id(data: Dict[str, Any]) -> str:
+    """Stable short id of a URL entry, used in API paths"""
+    url, namespace, name = result_key(data)
+    return hashlib.blake2b(f"{url}|{namespace}|{name}".encode(), digest_size=8).hexdigest()
+
+
+def slice_of(data: Dict[str, Any], slices: int) -> int:
+    """Stable slice assignment (crc32, identical across restarts)"""
+    if slices <= 1:
+        return 0
+    url, namespace, name = result_key(data)
+    return zlib.crc32(f"{url}|{namespace}|{name}".encode()) % slices
+
+
+def next_sample_slice(slices: int = SAMPLING_SLICES) -> Optional[int]:
+    """Return the slice to probe in this cycle and advance the cursor.
+
+    Returns None when sampling is disabled (a single slice).
+    """
+    if slices <= 1:
+        return None
+    with _sampling_lock:
+        current = _sampling_state["cycle"] % slices
+        _sampling_state["cycle"] += 1
+    return current
+
+
+def is_failing(result: Optional[Dict[str, Any]]) -> bool:
+    return bool(result) and result.get("healthy") is False
+
+
+def select_due_urls(
+    data_urls: List[Dict[str, Any]],
+    previous_results: List[Dict[str, Any]],
+    now: Optional[float] = None,
+    slice_index: Optional[int] = None,
+    slices: int = SAMPLING_SLICES,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split URLs into (due, carried) according to their policy interval.
+
+    ``carried`` holds the previous result of every URL that is not due yet,
+    so the caller can publish a complete result list without probing it.
+    When ``slice_index`` is given, only URLs of that slice (plus the ones
+    currently failing) are due; every URL is covered once per ``slices``
+    cycles.
+    """
+    now = time.time() if now is None else now
+    previous_by_key = {result_key(r): r for r in previous_results}
+    sampling = slice_index is not None and slices > 1
+
+    due: List[Dict[str, Any]] = []
+    carried: List[Dict[str, Any]] = []
+    for data in data_urls:
+        previous = previous_by_key.get(result_key(data))
+        if (
+            sampling
+            and not is_failing(previous)
+            and slice_of(data, slices) != slice_index
+        ):
+            if previous is not None:
+                carried.append(previous)
+            continue
+
+        last_checked = previous.get("last_checked") if previous else None
+        interval = get_check_policy(data).interval
+        # Half a second of slack so a URL whose interval equals the tick
+        # is not skipped because of scheduling jitter.
+        if last_checked is None or now - last_checked >= interval - 0.5:
+            due.append(data)
+        else:
+            carried.append(previous)
+    return due, carried
+
+
+def compute_tick_interval(
+    data_urls: List[Dict[str, Any]], default: int = CHECK_INTERVAL
+) -> int:
+    """Scheduler tick: the shortest interval requested by any URL"""
+    tick = default
+    for data in data_urls:
+        tick = min(tick, get_check_policy(data).interval)
+    return max(1, tick)
+
+
+def result_age(result: Dict[str, Any], now: Optional[float] = None) -> Optional[int]:
+    """Seconds since the result was produced, None if never checked"""
+    last_checked = result.get("last_checked")
+    if last_checked is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0, int(now - last_checked))
@@ -0,0 +1,346 @@
+"""
+Silences: mute alerts, and optionally skip probes, during maintenance windows
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import yaml
+from loguru import logger
+
+from .config import SILENCES_FILE
+from .metrics import register_metrics_provider
+from .scheduler import result_key
+from .utils import get_full_url
+
+# Longest window accepted through the API
+MAX_SILENCE_SECONDS = 30 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class Silence:
+    """A time window and the URLs it applies to.
+
+    A URL matches when it satisfies every matcher given: its namespace is
+    one of ``namespaces``, its host one of ``hosts`` ("*.example.com"
+    matches any subdomain) and it carries all ``labels``.
+    """
+
+    id: str
+    starts_at: float
+    ends_at: float
+    namespaces: Tuple[str, ...] = ()
+    hosts: Tuple[str, ...] = ()
+    labels: Tuple[Tuple[str, str], ...] = ()
+    skip_probes: bool = False
+    comment: str = ""
+    created_by: str = ""
+
+    def required_hits(self) -> int:
+        return int(bool(self.namespaces)) + int(bool(self.hosts)) + len(self.labels)
+
+    def is_active(self, now: float) -> bool:
+        return self.starts_at <= now < self.ends_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["namespaces"] = list(self.namespaces)
+        data["hosts"] = list(self.hosts)
+        data["labels"] = dict(self.labels)
+        return data
+
+    def describe(self) -> Dict[str, Any]:
+        """API representation, with ISO timestamps"""
+        data = self.as_dict()
+        for name in ("starts_at", "ends_at"):
+            data[name] = datetime.fromtimestamp(data[name], timezone.utc).isoformat()
+        data["active"] = self.is_active(time.time())
+        return data
+
+
+def _parse_time(value: Any, name: str) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"{name}: date ISO 8601 invalide") from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    raise ValueError(f"{name}: date ISO 8601 ou timestamp attendu")
+
+
+def _string_list(value: Any, name: str, lower: bool = False) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{name}: liste de chaînes attendue")
+    values = {v.strip().lower() if lower else v.strip() for v in value}
+    return tuple(sorted(v for v in values if v))
+
+
+def silence_from_dict(data: Dict[str, Any], now: Optional[float] = None) -> Silence:
+    """Validate a silence definition (API body or saved entry).
+
+    The window is ``starts_at``/``ends_at`` (ISO 8601 or epoch seconds)
+    or ``duration_minutes`` from ``starts_at`` (default: now).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("objet JSON attendu")
+    now = time.time() if now is None else now
+    matchers = data.get("matchers", data)
+    if not isinstance(matchers, dict):
+        raise ValueError("matchers: objet attendu")
+    labels = matchers.get("labels") or {}
+    if not isinstance(labels, dict):
+        raise ValueError("labels: objet clé/valeur attendu")
+
+    starts_at = _parse_time(data["starts_at"], "starts_at") if data.get("starts_at") else now
+    if data.get("ends_at"):
+        ends_at = _parse_time(data["ends_at"], "ends_at")
+    elif data.get("duration_minutes"):
+        try:
+            ends_at = starts_at + float(data["duration_minutes"]) * 60
+        except (TypeError, ValueError):
+            raise ValueError("duration_minutes: nombre attendu") from None
+    else:
+        raise ValueError("ends_at ou duration_minutes requis")
+    if ends_at <= starts_at:
+        raise ValueError("la fin doit être postérieure au début")
+    if ends_at - starts_at > MAX_SILENCE_SECONDS:
+        raise ValueError("durée maximale: 30 jours")
+
+    silence = Silence(
+        id=str(data.get("id") or uuid.uuid4().hex[:12]),
+        starts_at=starts_at,
+        ends_at=ends_at,
+        namespaces=_string_list(matchers.get("namespaces"), "namespaces"),
+        hosts=_string_list(matchers.get("hosts"), "hosts", lower=True),
+        labels=tuple(sorted((str(k), str(v)) for k, v in labels.items())),
+        skip_probes=bool(data.get("skip_probes", False)),
+        comment=str(data.get("comment") or ""),
+        created_by=str(data.get("created_by") or ""),
+    )
+    if not silence.required_hits():
+        raise ValueError("au moins un matcher requis (namespaces, hosts ou labels)")
+    return silence
+
+
+class _CompiledIndex:
+    """Matchers of all current silences, indexed by value.
+
+    Matching a URL costs a few dict lookups (its namespace, its host and
+    host suffixes, its labels) whatever the number of silences.
+    """
+
+    def __init__(self, silences: List[Silence]) -> None:
+        self.silences = {s.id: s for s in silences}
+        self.by_namespace: Dict[str, Set[str]] = {}
+        self.by_host: Dict[str, Set[str]] = {}
+        self.by_suffix: Dict[str, Set[str]] = {}
+        self.by_label: Dict[Tuple[str, str], Set[str]] = {}
+        # Candidates per URL, valid as long as this index is current
+        self.memo: Dict[Tuple[str, str, str], FrozenSet[str]] = {}
+        for silence in silences:
+            for namespace in silence.namespaces:
+                self.by_namespace.setdefault(namespace, set()).add(silence.id)
+            for host in silence.hosts:
+                if host.startswith("*."):
+                    self.by_suffix.setdefault(host[1:], set()).add(silence.id)
+                else:
+                    self.by_host.setdefault(host, set()).add(silence.id)
+            for pair in silence.labels:
+                self.by_label.setdefault(pair, set()).add(silence.id)
+
+    def candidates(self, namespace: str, host: str, labels: Dict[str, Any]) -> FrozenSet[str]:
+        """Ids of the silences whose matchers all match (time not checked)"""
+        if not self.silences:
+            return frozenset()
+        hits: Dict[str, int] = {}
+        for silence_id in self.by_namespace.get(namespace, ()):
+            hits[silence_id] = hits.get(silence_id, 0) + 1
+
+        host_ids = set(self.by_host.get(host, ()))
+        if self.by_suffix:
+            dot = host.find(".")
+            while dot != -1:
+                host_ids.update(self.by_suffix.get(host[dot:], ()))
+                dot = host.find(".", dot + 1)
+        for silence_id in host_ids:
+            hits[silence_id] = hits.get(silence_id, 0) + 1
+
+        if self.by_label and labels:
+            for pair in labels.items():
+                for silence_id in self.by_label.get((pair[0], str(pair[1])), ()):
+                    hits[silence_id] = hits.get(silence_id, 0) + 1
+
+        return frozenset(
+            silence_id
+            for silence_id, count in hits.items()
+            if count == self.silences[silence_id].required_hits()
+        )
+
+
+class SilenceStore:
+    """Current and upcoming silences, persisted to a YAML file.
+
+    The compiled index is rebuilt on every change and swapped atomically,
+    lookups don't take the lock. Per-URL candidates are memoized in the
+    index; only the time window is checked on each lookup.
+    """
+
+    def __init__(self, path: str = SILENCES_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = _CompiledIndex([])
+        self.muted_alerts = 0
+        self.skipped_probes = 0
+        if path:
+            self.load()
+
+    def _rebuild(self, silences: List[Silence]) -> None:
+        self._index = _CompiledIndex(silences)
+
+    def matching(self, data: Dict[str, Any], now: Optional[float] = None) -> List[Silence]:
+        """Active silences matching a URL entry or result"""
+        index = self._index
+        if not index.silences:
+            return []
+        key = result_key(data)
+        memo = index.memo
+        ids = memo.get(key)
+        if ids is None:
+            host = (urlparse(get_full_url(data.get("url", ""))).hostname or "").lower()
+            ids = memo[key] = index.candidates(
+                data.get("namespace", ""), host, data.get("labels") or {}
+            )
+        if not ids:
+            return []
+        now = time.time() if now is None else now
+        return [index.silences[i] for i in ids if index.silences[i].is_active(now)]
+
+    def is_muted(self, data: Dict[str, Any]) -> bool:
+        muted = bool(self.matching(data))
+        if muted:
+            self.muted_alerts += 1
+        return muted
+
+    def skip_reason(self, data: Dict[str, Any]) -> Optional[str]:
+        """Details of a URL whose probe is skipped by a silence, else None"""
+        for silence in self.matching(data):
+            if silence.skip_probes:
+                self.skipped_probes += 1
+                return f"En maintenance: {silence.comment or silence.id}"
+        return None
+
+    def add(self, silence: Silence) -> Silence:
+        with self._lock:
+            silences = [s for s in self._index.silences.values() if s.id != silence.id]
+            silences.append(silence)
+            self._rebuild(silences)
+            self._save(silences)
+        logger.info(f"🔇 Silence {silence.id} créé jusqu'au {datetime.fromtimestamp(silence.ends_at):%Y-%m-%d %H:%M}")
+        return silence
+
+    def expire(self, silence_id: str) -> bool:
+        """End a silence now, False if unknown"""
+        with self._lock:
+            if silence_id not in self._index.silences:
+                return False
+            silences = [s for s in self._index.silences.values() if s.id != silence_id]
+            self._rebuild(silences)
+            self._save(silences)
+        logger.info(f"🔊 Silence {silence_id} expiré")
+        return True
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop silences whose window has ended"""
+        now = time.time() if now is None else now
+        if all(s.ends_at > now for s in self._index.silences.values()):
+            return 0
+        with self._lock:
+            current = list(self._index.silences.values())
+            silences = [s for s in current if s.ends_at > now]
+            removed = len(current) - len(silences)
+            if removed:
+                self._rebuild(silences)
+                self._save(silences)
+        if removed:
+            logger.info(f"🧹 {removed} silences expirés supprimés")
+        return removed
+
+    def list(self) -> List[Silence]:
+        return sorted(self._index.silences.values(), key=lambda s: s.starts_at)
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                saved = yaml.safe_load(f) or []
+        except FileNotFoundError:
+            return
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"⚠️ Silences illisibles ({self.path}): {e}")
+            return
+        silences = []
+        for entry in saved if isinstance(saved, list) else []:
+            try:
+                silences.append(silence_from_dict(entry))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"⚠️ Silence ignoré: {e}")
+        with self._lock:
+            self._rebuild(silences)
+        if silences:
+            logger.info(f"🔇 {len(silences)} silences restaurés")
+
+    def _save(self, silences: List[Silence]) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w") as f:
+                yaml.dump(
+                    [s.as_dict() for s in silences],
+                    f,
+                    default_flow_style=False,
+                    allow_unicode=True,
+                    sort_keys=False,
+                )
+        except OSError as e:
+            logger.warning(f"⚠️ Sauvegarde des silences impossible: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        silences = list(self._index.silences.values())
+        return {
+            "active": sum(1 for s in silences if s.is_active(now)),
+            "pending": sum(1 for s in silences if s.starts_at > now),
+            "muted_alerts": self.muted_alerts,
+            "skipped_probes": self.skipped_probes,
+        }
+
+
+_store_state: Dict[str, Optional[SilenceStore]] = {"store": None}
+_store_lock = threading.Lock()
+
+
+def get_silence_store() -> SilenceStore:
+    """Shared silence store"""
+    with _store_lock:
+        if _store_state["store"] is None:
+            _store_state["store"] = SilenceStore()
+        return _store_state["store"]
+
+
+def _metrics() -> Dict[str, Any]:
+    return get_silence_store().snapshot()
+
+
+register_metrics_provider("silences", _metrics)
@@ -0,0 +1,272 @@
+"""
+Latency quantiles over a sliding window from mergeable DDSketches
+"""
+
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import LATENCY_SKETCHES, LATENCY_WINDOW_MINUTES
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key, url_id
+
+# Quantiles are within 2% of the true value: 1 ms to 1 min fits in ~280 bins
+RELATIVE_ACCURACY = 0.02
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# Values (ms) below this are counted as zero
+MIN_VALUE = 0.01
+# Bins per sketch at most (2 KB): the lowest are collapsed beyond it
+MAX_BINS = 512
+# Sub-windows the sliding window is made of
+WINDOW_BUCKETS = 6
+QUANTILES = (0.5, 0.95, 0.99)
+GROUP_BY = ("url", "namespace", "cluster")
+
+
+class DDSketch:
+    """Log-bucketed histogram with bounded relative error.
+
+    Bin k counts values in (gamma^(k-1), gamma^k]; bins are a dense
+    typed array starting at ``offset``. Sketches merge (and subtract)
+    bin by bin, which is what makes windows and rollups cheap.
+    """
+
+    __slots__ = ("offset", "bins", "zeros", "count")
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.bins = array("I")
+        self.zeros = 0
+        self.count = 0
+
+    @staticmethod
+    def key(value: float) -> int:
+        return math.ceil(math.log(value) / _LOG_GAMMA)
+
+    def _slot(self, key: int) -> int:
+        """Array index of a key, growing (or collapsing) the bins as needed"""
+        bins = self.bins
+        if not bins:
+            self.offset = key
+            bins.append(0)
+            return 0
+        if key < self.offset:
+            if self.offset + len(bins) - key > MAX_BINS:
+                # Out of the kept range: counted in the lowest bin
+                return 0
+            self.bins = array("I", bytes(4 * (self.offset - key))) + bins
+            self.offset = key
+            return 0
+        index = key - self.offset
+        if index >= len(bins):
+            bins.extend(array("I", bytes(4 * (index - len(bins) + 1))))
+            if len(bins) > MAX_BINS:
+                # Collapse the lowest bins into the first one kept
+                extra = len(bins) - MAX_BINS
+                folded = sum(bins[: extra + 1])
+                del bins[:extra]
+                bins[0] = folded
+                self.offset += extra
+                index -= extra
+        return index
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= MIN_VALUE:
+            self.zeros += count
+        else:
+            # _slot() may replace the array: resolve it first
+            index = self._slot(self.key(value))
+            self.bins[index] += count
+        self.count += count
+
+    def merge(self, other: "DDSketch") -> None:
+        self.zeros += other.zeros
+        self.count += other.count
+        for i, count in enumerate(other.bins):
+            if count:
+                index = self._slot(other.offset + i)
+                self.bins[index] += count
+
+    def subtract(self, other: "DDSketch") -> None:
+        """Remove a sketch previously merged into this one"""
+        self.zeros -= other.zeros
+        self.count -= other.count
+        for i, count in enumerate(other.bins):
+            if count:
+                index = max(0, other.offset + i - self.offset)
+                self.bins[min(index, len(self.bins) - 1)] -= count
+        if not self.count:
+            self.bins = array("I")
+            self.zeros = 0
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Values at increasing quantiles, in one pass over the bins"""
+        qs = list(qs)
+        if not self.count:
+            return [None] * len(qs)
+        values: List[Optional[float]] = []
+        ranks = iter(q * (self.count - 1) for q in qs)
+        rank = next(ranks, None)
+        seen = self.zeros
+        while rank is not None and rank < seen:
+            values.append(0.0)
+            rank = next(ranks, None)
+        for i, count in enumerate(self.bins):
+            if rank is None:
+                break
+            seen += count
+            while rank is not None and rank < seen:
+                # Bin midpoint: at most RELATIVE_ACCURACY from any value in it
+                values.append(2 * _GAMMA ** (self.offset + i) / (_GAMMA + 1))
+                rank = next(ranks, None)
+        top = 2 * _GAMMA ** (self.offset + len(self.bins) - 1) / (_GAMMA + 1)
+        return values + [top] * (len(qs) - len(values))
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[0]
+
+
+class _SlidingWindow:
+    """A DDSketch per sub-window plus their running merge"""
+
+    __slots__ = ("width", "current", "buckets", "window")
+
+    def __init__(self, width: float) -> None:
+        self.width = width
+        self.current = -1
+        self.buckets: List[Optional[DDSketch]] = [None] * WINDOW_BUCKETS
+        self.window = DDSketch()
+
+    def advance(self, now: float) -> None:
+        bucket = int(now // self.width)
+        if bucket <= self.current:
+            return
+        if self.current < 0 or bucket - self.current >= WINDOW_BUCKETS:
+            self.buckets = [None] * WINDOW_BUCKETS
+            self.window = DDSketch()
+        else:
+            for expired in range(self.current + 1, bucket + 1):
+                sketch = self.buckets[expired % WINDOW_BUCKETS]
+                if sketch is not None:
+                    self.window.subtract(sketch)
+                    self.buckets[expired % WINDOW_BUCKETS] = None
+        self.current = bucket
+
+    def add(self, now: float, value: float) -> None:
+        self.advance(now)
+        i = self.current % WINDOW_BUCKETS
+        sketch = self.buckets[i]
+        if sketch is None:
+            sketch = self.buckets[i] = DDSketch()
+        sketch.add(value)
+        self.window.add(value)
+
+
+def _quantiles(sketch: DDSketch) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"count": sketch.count}
+    for q, value in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+        report[f"p{int(q * 100)}"] = round(value, 1) if value is not None else None
+    return report
+
+
+class LatencySketches:
+    """Sliding-window response time sketch per URL.
+
+    Each result is added in O(1) to its URL's current sub-window and
+    window sketch; expired sub-windows are subtracted from the window.
+    Namespace and cluster quantiles merge the URL window sketches on
+    demand.
+    """
+
+    def __init__(self, window_seconds: float = LATENCY_WINDOW_MINUTES * 60) -> None:
+        self.window_seconds = window_seconds
+        self._windows: Dict[ResultKey, _SlidingWindow] = {}
+        self._lock = threading.Lock()
+
+    def record(self, result: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Add the response time of a successfully probed URL"""
+        if result.get("healthy") is not True or not result.get("response_time"):
+            return
+        now = time.time() if now is None else now
+        key = result_key(result)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = _SlidingWindow(
+                    self.window_seconds / WINDOW_BUCKETS
+                )
+            window.add(now, float(result["response_time"]))
+
+    def report(self, group_by: str = "url", now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """p50 / p95 / p99 (ms) per URL, namespace or for the cluster"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by: {', '.join(GROUP_BY)} attendu")
+        now = time.time() if now is None else now
+        report: List[Dict[str, Any]] = []
+        with self._lock:
+            for window in self._windows.values():
+                window.advance(now)
+            if group_by == "url":
+                for (url, namespace, name), window in self._windows.items():
+                    if window.window.count:
+                        report.append(
+                            {
+                                "id": url_id({"url": url, "namespace": namespace, "name": name}),
+                                "url": url,
+                                "namespace": namespace,
+                                "name": name,
+                                **_quantiles(window.window),
+                            }
+                        )
+                return report
+            merged: Dict[str, DDSketch] = {}
+            for (_, namespace, _), window in self._windows.items():
+                group = namespace if group_by == "namespace" else ""
+                if group not in merged:
+                    merged[group] = DDSketch()
+                merged[group].merge(window.window)
+        for group, sketch in merged.items():
+            if sketch.count:
+                prefix = {"namespace": group} if group_by == "namespace" else {}
+                report.append({**prefix, **_quantiles(sketch)})
+        return report
+
+    def forget(self, keep: Iterable[ResultKey]) -> None:
+        keep = set(keep)
+        with self._lock:
+            for key in [k for k in self._windows if k not in keep]:
+                del self._windows[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            bins = sum(
+                len(w.window.bins) + sum(len(b.bins) for b in w.buckets if b is not None)
+                for w in self._windows.values()
+            )
+            urls = len(self._windows)
+        return {"urls": urls, "bins": bins, "window_seconds": self.window_seconds}
+
+
+_sketch_state: Dict[str, Optional[LatencySketches]] = {"sketches": None}
+_sketch_lock = threading.Lock()
+
+
+def get_latency_sketches() -> Optional[LatencySketches]:
+    """Shared sketches when LATENCY_SKETCHES is enabled, else None"""
+    if not LATENCY_SKETCHES:
+        return None
+    with _sketch_lock:
+        if _sketch_state["sketches"] is None:
+            _sketch_state["sketches"] = LatencySketches()
+        return _sketch_state["sketches"]
+
+
+def _metrics() -> Dict[str, Any]:
+    sketches = get_latency_sketches()
+    return sketches.snapshot() if sketches else {"enabled": False}
+
+
+register_metrics_provider("latency_sketches", _metrics)
@@ -0,0 +1,219 @@
+"""
+Rolling availability (SLA) counters per URL, namespace and cluster
+"""
+
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import SLA_TARGET, SLA_TRACKING
+from .metrics import register_metrics_provider
+from .scheduler import ResultKey, result_key, url_id
+
+HOUR = 3600
+DAY = 86400
+
+# Window -> (bucket width, buckets summed). 24h is kept in hourly
+# buckets, 7d and 30d share one ring of daily buckets.
+WINDOWS: Dict[str, Tuple[int, int]] = {
+    "24h": (HOUR, 24),
+    "7d": (DAY, 7),
+    "30d": (DAY, 30),
+}
+GROUP_BY = ("url", "namespace", "cluster")
+
+
+class _BucketRing:
+    """Successes / failures / latency sums per time bucket.
+
+    Bucket i is stored at 3i..3i+2 of one float64 array, like the totals,
+    so subtracting an expired bucket cancels what it added. Running totals
+    are kept for every span (number of most recent buckets) so reading a
+    window never sums buckets.
+    """
+
+    __slots__ = ("width", "size", "spans", "current", "buckets", "totals")
+
+    def __init__(self, width: int, spans: Tuple[int, ...]) -> None:
+        self.width = width
+        self.size = max(spans)
+        self.spans = spans
+        self.current = -1
+        self.buckets = array("d", bytes(24 * self.size))
+        # successes, failures, latency of each span, in spans order
+        self.totals = array("d", bytes(24 * len(spans)))
+
+    def advance(self, now: float) -> None:
+        """Move to the bucket of ``now``, expiring buckets left behind"""
+        bucket = int(now // self.width)
+        if bucket <= self.current:
+            return
+        if self.current >= 0 and bucket - self.current < self.size:
+            buckets, totals = self.buckets, self.totals
+            while self.current < bucket:
+                self.current += 1
+                for j, span in enumerate(self.spans):
+                    # Bucket leaving this span
+                    i = 3 * ((self.current - span) % self.size)
+                    totals[3 * j] -= buckets[i]
+                    totals[3 * j + 1] -= buckets[i + 1]
+                    totals[3 * j + 2] -= buckets[i + 2]
+                i = 3 * (self.current % self.size)
+                buckets[i] = buckets[i + 1] = buckets[i + 2] = 0.0
+            return
+        if self.current >= 0:
+            # Idle for longer than the ring: everything expired
+            self.buckets = array("d", bytes(24 * self.size))
+            self.totals = array("d", bytes(24 * len(self.spans)))
+        self.current = bucket
+
+    def add(self, healthy: bool, response_time: float) -> None:
+        i = 3 * (self.current % self.size)
+        offset = 0 if healthy else 1
+        self.buckets[i + offset] += 1
+        self.buckets[i + 2] += response_time
+        totals = self.totals
+        for j in range(0, len(totals), 3):
+            totals[j + offset] += 1
+            totals[j + 2] += response_time
+
+    def total(self, span: int) -> Tuple[float, float, float]:
+        j = 3 * self.spans.index(span)
+        return self.totals[j], self.totals[j + 1], self.totals[j + 2]
+
+
+class _Rollup:
+    __slots__ = ("hourly", "daily")
+
+    def __init__(self) -> None:
+        self.hourly = _BucketRing(HOUR, (WINDOWS["24h"][1],))
+        self.daily = _BucketRing(DAY, (WINDOWS["7d"][1], WINDOWS["30d"][1]))
+
+    def add(self, now: float, healthy: bool, response_time: float) -> None:
+        for ring in (self.hourly, self.daily):
+            ring.advance(now)
+            ring.add(healthy, response_time)
+
+    def totals(self, window: str, now: float) -> Tuple[float, float, float]:
+        width, span = WINDOWS[window]
+        ring = self.hourly if width == HOUR else self.daily
+        ring.advance(now)
+        return ring.total(span)
+
+
+def _report(totals: Tuple[float, float, float], target: float) -> Dict[str, Any]:
+    successes, failures, latency = totals
+    checks = int(successes + failures)
+    failures = int(failures)
+    if not checks:
+        return {"checks": 0, "failures": 0, "availability": None}
+    error_rate = failures / checks
+    budget = 1 - target
+    burn_rate = error_rate / budget if budget > 0 else None
+    return {
+        "checks": checks,
+        "failures": failures,
+        "availability": round(1 - error_rate, 6),
+        "avg_response_time": round(latency / checks, 1),
+        # 1 = failing exactly at the rate the target allows over the window
+        "error_budget_burn_rate": round(burn_rate, 3) if burn_rate is not None else None,
+        "error_budget_remaining": round(1 - burn_rate, 4) if burn_rate is not None else None,
+    }
+
+
+class SlaTracker:
+    """Incremental availability counters per URL, namespace and cluster.
+
+    Every published result updates the hourly and daily buckets of its
+    URL, its namespace and the cluster in O(1). A report reads running
+    totals, so it costs the same for any history length.
+    """
+
+    def __init__(self, target: float = SLA_TARGET) -> None:
+        self.target = target
+        self._groups: Dict[str, Dict[Any, _Rollup]] = {group: {} for group in GROUP_BY}
+        self._lock = threading.Lock()
+
+    def record(self, result: Dict[str, Any], now: Optional[float] = None) -> None:
+        healthy = result.get("healthy")
+        if healthy is None:
+            return
+        now = time.time() if now is None else now
+        response_time = float(result.get("response_time") or 0)
+        namespace = result.get("namespace", "")
+        keys = (
+            ("url", result_key(result)),
+            ("namespace", namespace),
+            ("cluster", ""),
+        )
+        with self._lock:
+            for group, key in keys:
+                rollup = self._groups[group].get(key)
+                if rollup is None:
+                    rollup = self._groups[group][key] = _Rollup()
+                rollup.add(now, bool(healthy), response_time)
+
+    def report(
+        self, window: str, group_by: str = "url", now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Availability of every group over a window"""
+        if window not in WINDOWS:
+            raise ValueError(f"window: {', '.join(WINDOWS)} attendu")
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by: {', '.join(GROUP_BY)} attendu")
+        now = time.time() if now is None else now
+        with self._lock:
+            rollups = [
+                (key, rollup.totals(window, now))
+                for key, rollup in self._groups[group_by].items()
+            ]
+        report = []
+        for key, totals in rollups:
+            if group_by == "url":
+                url, namespace, name = key
+                group = {
+                    "id": url_id({"url": url, "namespace": namespace, "name": name}),
+                    "url": url,
+                    "namespace": namespace,
+                    "name": name,
+                }
+            elif group_by == "namespace":
+                group = {"namespace": key}
+            else:
+                group = {}
+            report.append({**group, **_report(totals, self.target)})
+        return report
+
+    def forget(self, keep: Iterable[ResultKey]) -> None:
+        """Drop URLs that left the inventory (namespace totals are kept)"""
+        keep = set(keep)
+        with self._lock:
+            urls = self._groups["url"]
+            for key in [k for k in urls if k not in keep]:
+                del urls[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {group: len(rollups) for group, rollups in self._groups.items()}
+
+
+_sla_state: Dict[str, Optional[SlaTracker]] = {"tracker": None}
+_sla_lock = threading.Lock()
+
+
+def get_sla_tracker() -> Optional[SlaTracker]:
+    """Shared tracker when SLA_TRACKING is enabled, else None"""
+    if not SLA_TRACKING:
+        return None
+    with _sla_lock:
+        if _sla_state["tracker"] is None:
+            _sla_state["tracker"] = SlaTracker()
+        return _sla_state["tracker"]
+
+
+def _metrics() -> Dict[str, Any]:
+    tracker = get_sla_tracker()
+    return tracker.snapshot() if tracker else {"enabled": False}
+
+
+register_metrics_provider("sla", _metrics)
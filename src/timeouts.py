@@ -0,0 +1,179 @@
+"""
+Per-phase probe timeouts, optionally derived from each URL's latency history
+"""
+
+import math
+import threading
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import aiohttp
+
+from .circuit_breaker import is_connect_failure
+from .config import ADAPTIVE_TIMEOUT_FACTOR, ADAPTIVE_TIMEOUTS
+from .metrics import register_metrics_provider
+from .policy import CheckPolicy
+from .scheduler import ResultKey, result_key
+
+# Samples kept per URL, and needed before budgets are derived from them
+HISTORY_SIZE = 200
+MIN_SAMPLES = 20
+# Derived budgets never go below this (seconds)
+ADAPTIVE_TIMEOUT_FLOOR = 0.5
+
+# TLS handshake budget of the probe running in the current task, applied
+# by the connector (aiohttp has no separate TLS timeout).
+current_tls_timeout: ContextVar[Optional[float]] = ContextVar(
+    "current_tls_timeout", default=None
+)
+
+
+@dataclass(frozen=True)
+class TimeoutBudget:
+    """Time allowed to each phase of one probe (seconds)"""
+
+    total: float
+    connect: Optional[float] = None
+    tls: Optional[float] = None
+    first_byte: Optional[float] = None
+    adaptive: bool = False
+
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        sock_connect = None
+        if self.connect is not None:
+            # aiohttp's connect budget also covers the TLS handshake
+            sock_connect = self.connect + (self.tls or 0)
+        return aiohttp.ClientTimeout(
+            total=self.total, sock_connect=sock_connect, sock_read=self.first_byte
+        )
+
+
+def _p99(values) -> Optional[float]:
+    if len(values) < MIN_SAMPLES:
+        return None
+    ordered = sorted(values)
+    return ordered[math.ceil(0.99 * len(ordered)) - 1]
+
+
+class LatencyHistory:
+    """Recent total / connect / first-byte latencies (ms) per URL.
+
+    Connect samples are TCP connect plus TLS handshake: that is what the
+    connect budget (aiohttp's sock_connect) has to cover.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE) -> None:
+        self.size = size
+        self._samples: Dict[ResultKey, Dict[str, Deque[float]]] = {}
+        # URLs whose last probe timed out: next probe gets the full budget
+        self._timed_out: set = set()
+        self._lock = threading.Lock()
+
+    def record(self, key: ResultKey, result: Dict[str, Any]) -> None:
+        with self._lock:
+            if result.get("status") == 408:
+                self._timed_out.add(key)
+                return
+            if is_connect_failure(result):
+                return
+            self._timed_out.discard(key)
+            timings = result.get("timings") or {}
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = {
+                    phase: deque(maxlen=self.size) for phase in ("total", "connect", "ttfb")
+                }
+            if "total" in timings:
+                samples["total"].append(timings["total"])
+            if "tcp_connect" in timings:
+                samples["connect"].append(
+                    timings["tcp_connect"] + timings.get("tls_handshake", 0.0)
+                )
+            if "ttfb" in timings:
+                samples["ttfb"].append(timings["ttfb"])
+
+    def p99(self, key: ResultKey) -> Optional[Tuple[float, Optional[float], Optional[float]]]:
+        """(total, connect, ttfb) p99 in ms, None while history is too short"""
+        with self._lock:
+            if key in self._timed_out:
+                return None
+            samples = self._samples.get(key)
+            if samples is None:
+                return None
+            total = _p99(samples["total"])
+            if total is None:
+                return None
+            return total, _p99(samples["connect"]), _p99(samples["ttfb"])
+
+    def forget(self, keep) -> None:
+        keep = set(keep)
+        with self._lock:
+            for key in [k for k in self._samples if k not in keep]:
+                del self._samples[key]
+            self._timed_out &= keep
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+_history_state: Dict[str, Optional[LatencyHistory]] = {"history": None}
+_history_lock = threading.Lock()
+
+
+def get_latency_history() -> Optional[LatencyHistory]:
+    """Shared history when ADAPTIVE_TIMEOUTS is enabled, else None"""
+    if not ADAPTIVE_TIMEOUTS:
+        return None
+    with _history_lock:
+        if _history_state["history"] is None:
+            _history_state["history"] = LatencyHistory()
+        return _history_state["history"]
+
+
+def _derived(p99_ms: Optional[float], ceiling: Optional[float]) -> Optional[float]:
+    if p99_ms is None:
+        return ceiling
+    budget = max(ADAPTIVE_TIMEOUT_FLOOR, p99_ms / 1000 * ADAPTIVE_TIMEOUT_FACTOR)
+    return min(budget, ceiling) if ceiling is not None else budget
+
+
+def compute_budget(policy: CheckPolicy, data: Dict[str, Any]) -> TimeoutBudget:
+    """Budgets of the next probe of a URL.
+
+    The policy budgets are ceilings. With ADAPTIVE_TIMEOUTS, each phase is
+    tightened to p99 x factor of the URL's own history, so unreachable
+    endpoints fail fast while slow ones keep the room they need. After a
+    timeout the next probe runs with the full budgets again.
+    """
+    static = TimeoutBudget(
+        total=policy.timeout,
+        connect=policy.connect_timeout,
+        tls=policy.tls_timeout,
+        first_byte=policy.first_byte_timeout,
+    )
+    history = get_latency_history()
+    if history is None:
+        return static
+    p99 = history.p99(result_key(data))
+    if p99 is None:
+        return static
+    total_ms, connect_ms, ttfb_ms = p99
+    return TimeoutBudget(
+        total=_derived(total_ms, static.total),
+        connect=_derived(connect_ms, static.connect or static.total),
+        tls=static.tls,
+        first_byte=_derived(ttfb_ms, static.first_byte or static.total),
+        adaptive=True,
+    )
+
+
+def _metrics() -> Dict[str, Any]:
+    history = get_latency_history()
+    if history is None:
+        return {"adaptive": False}
+    return {"adaptive": True, "urls_with_history": len(history)}
+
+
+register_metrics_provider("timeouts", _metrics)
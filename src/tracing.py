@@ -0,0 +1,259 @@
+"""
+Per-phase latency breakdown of URL probes (aiohttp trace hooks)
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from .metrics import register_metrics_provider
+from .timeouts import current_tls_timeout
+
+# Phases reported for every probe, in milliseconds on a monotonic clock.
+PHASES = (
+    "semaphore_wait",
+    "connection_queue",
+    "dns",
+    "tcp_connect",
+    "tls_handshake",
+    "ttfb",
+    "redirect",
+    "total",
+)
+# Phases of a single request hop, measured again after a redirect
+HOP_PHASES = ("connection_queue", "dns", "tcp_connect", "tls_handshake", "ttfb")
+
+# Event loop timers may fire this early (clock resolution)
+_TIMER_SLACK = 0.01
+
+# Timings of the probe running in the current task. The connector reads it
+# to split TCP connect from TLS handshake (no aiohttp trace signal for that).
+current_timings: ContextVar[Optional["ProbeTimings"]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+class ProbeTimings:
+    """Phase durations of a single probe, accumulated across redirects"""
+
+    __slots__ = ("started", "phases", "redirects", "reused", "tls_timed_out", "_marks")
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self.redirects = 0
+        self.reused = False
+        # Set by the connector when the handshake ran out of its TLS budget
+        self.tls_timed_out = False
+        self._marks: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    def start(self, phase: str) -> None:
+        self._marks[phase] = time.monotonic()
+
+    def stop(self, phase: str) -> None:
+        started = self._marks.pop(phase, None)
+        if started is not None:
+            self.add(phase, time.monotonic() - started)
+
+    def cancel(self, phase: str) -> None:
+        self._marks.pop(phase, None)
+
+    def handshake_failed(self, seconds: float, budget: Optional[float]) -> None:
+        """Record a TLS handshake that failed after ``seconds``"""
+        self.add("tls_handshake", seconds)
+        if budget is not None and seconds >= budget - _TIMER_SLACK:
+            self.tls_timed_out = True
+
+    def redirected(self) -> None:
+        """Start a new hop: everything spent so far counts as redirect
+        time and the per-hop phases describe the final hop only"""
+        self.redirects += 1
+        for phase in HOP_PHASES:
+            self.phases.pop(phase, None)
+            self._marks.pop(phase, None)
+        self.phases["redirect"] = time.monotonic() - self.started
+
+    def finish(self) -> None:
+        self.phases["total"] = time.monotonic() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()
+        }
+        result["redirects"] = self.redirects
+        result["reused_connection"] = self.reused
+        return result
+
+
+# aiohttp trace hooks. trace_request_ctx is the ProbeTimings of the request.
+
+
+async def _on_connection_queued_start(session, ctx, params):
+    ctx.trace_request_ctx.start("connection_queue")
+
+
+async def _on_connection_queued_end(session, ctx, params):
+    ctx.trace_request_ctx.stop("connection_queue")
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    ctx.trace_request_ctx.reused = True
+
+
+async def _on_dns_resolvehost_start(session, ctx, params):
+    ctx.trace_request_ctx.start("dns")
+
+
+async def _on_dns_resolvehost_end(session, ctx, params):
+    ctx.trace_request_ctx.stop("dns")
+
+
+async def _on_request_headers_sent(session, ctx, params):
+    ctx.trace_request_ctx.start("ttfb")
+
+
+async def _on_request_redirect(session, ctx, params):
+    ctx.trace_request_ctx.redirected()
+
+
+async def _on_request_end(session, ctx, params):
+    ctx.trace_request_ctx.stop("ttfb")
+
+
+def build_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig feeding the ProbeTimings passed as trace_request_ctx"""
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=_ctx_factory)
+    trace_config.on_connection_queued_start.append(_on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(_on_connection_queued_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_resolvehost_end)
+    trace_config.on_request_headers_sent.append(_on_request_headers_sent)
+    trace_config.on_request_redirect.append(_on_request_redirect)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
+
+
+def _ctx_factory(trace_request_ctx=None):
+    # Requests issued without timings (e.g. Slack webhooks) get a throwaway
+    # ProbeTimings so the hooks never have to check for None.
+    return SimpleNamespace(trace_request_ctx=trace_request_ctx or ProbeTimings())
+
+
+class TimedTCPConnector(aiohttp.TCPConnector):
+    """TCPConnector recording TCP connect and TLS handshake separately.
+
+    asyncio calls the protocol factory once the TCP socket is connected and
+    before the TLS handshake starts, which gives the split point. It also
+    applies the TLS budget of the current probe as the handshake timeout,
+    and flags the probe when a handshake fails after spending it.
+    """
+
+    async def _wrap_create_connection(self, *args: Any, **kwargs: Any):
+        tls_timeout = current_tls_timeout.get()
+        if tls_timeout is not None and kwargs.get("ssl"):
+            kwargs["ssl_handshake_timeout"] = tls_timeout
+        timings = current_timings.get()
+        if timings is None or not args:
+            return await super()._wrap_create_connection(*args, **kwargs)
+
+        protocol_factory = args[0]
+        connected_at: list = []
+
+        def timed_factory():
+            connected_at.append(time.monotonic())
+            return protocol_factory()
+
+        started = time.monotonic()
+        try:
+            result = await super()._wrap_create_connection(
+                timed_factory, *args[1:], **kwargs
+            )
+        except Exception:
+            if kwargs.get("ssl") and connected_at:
+                # TCP connected but the handshake did not finish
+                timings.handshake_failed(time.monotonic() - connected_at[0], tls_timeout)
+            raise
+        done = time.monotonic()
+        tcp_done = connected_at[0] if connected_at else done
+        timings.add("tcp_connect", tcp_done - started)
+        if kwargs.get("ssl"):
+            timings.add("tls_handshake", done - tcp_done)
+        return result
+
+
+class PhaseAggregator:
+    """count / total / max per phase, thread-safe"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, list] = {}
+
+    def add(self, timings: Dict[str, Any]) -> None:
+        with self._lock:
+            for phase in PHASES:
+                value = timings.get(phase)
+                if value is None:
+                    continue
+                stats = self._stats.setdefault(phase, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = max(stats[2], value)
+
+    def total_ms(self, phase: str) -> float:
+        stats = self._stats.get(phase)
+        return stats[1] if stats else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                phase: {
+                    "count": count,
+                    "total_ms": round(total, 1),
+                    "avg_ms": round(total / count, 1) if count else 0.0,
+                    "max_ms": round(maximum, 1),
+                }
+                for phase, (count, total, maximum) in self._stats.items()
+            }
+
+
+_cumulative_phases = PhaseAggregator()
+_last_cycle: Dict[str, Any] = {}
+
+
+def record_probe_timings(timings: Dict[str, Any], cycle: PhaseAggregator) -> None:
+    cycle.add(timings)
+    _cumulative_phases.add(timings)
+
+
+def record_cycle(cycle: PhaseAggregator, duration: float, probes: int) -> None:
+    """Keep the phase breakdown of the last completed cycle"""
+    global _last_cycle
+    semaphore_wait_ms = cycle.total_ms("semaphore_wait")
+    probe_ms = cycle.total_ms("total")
+    _last_cycle = (
+        {
+            "duration_ms": round(duration * 1000, 1),
+            "probes": probes,
+            "phases": cycle.snapshot(),
+            # Share of probe time spent waiting for our own semaphore
+            "semaphore_wait_ratio": round(
+                semaphore_wait_ms / (semaphore_wait_ms + probe_ms), 3
+            )
+            if semaphore_wait_ms + probe_ms
+            else 0.0,
+        }
+    )
+
+
+register_metrics_provider(
+    "probe_phases",
+    lambda: {"last_cycle": dict(_last_cycle), "cumulative": _cumulative_phases.snapshot()},
+)
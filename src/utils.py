@@ -7,8 +7,7 @@ import os
 import ssl
 import time
 import tomllib
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlparse
 
 import aiohttp
@@ -16,15 +15,42 @@ import urllib3
 import yaml
 from loguru import logger
 
+from .circuit_breaker import get_circuit_breaker, host_key
+from .concurrency import ConcurrencyGate, concurrency_ceiling, get_adaptive_limiter
 from .config import (
     CUSTOM_CERT,
-    ENABLE_SLACK_NOTIFICATIONS,
+    DNS_CACHE_ENABLED,
+    DNS_PRERESOLVE,
     FLASK_ENV,
+    HTTP2_PROBES,
+    LB_PINNING,
     MAX_CONCURRENT_REQUESTS,
     REQUEST_TIMEOUT,
-    SLACK_WEBHOOK_URL,
     SSL_CACHE_TTL_SECONDS,
 )
+from .dns_cache import get_shared_resolver
+from .http2 import H2_AVAILABLE, H2Pool
+from .l4_probe import cert_info, check_l4
+from .lb_pinning import (
+    PinnedResolver,
+    build_pin_map,
+    has_no_lb_address,
+    record_pinning_cycle,
+    unpinned_hosts,
+)
+from .policy import get_check_policy
+from .results_store import CycleStats
+from .scheduler import result_key
+from .timeouts import compute_budget, current_tls_timeout, get_latency_history
+from .tracing import (
+    PhaseAggregator,
+    ProbeTimings,
+    TimedTCPConnector,
+    build_trace_config,
+    current_timings,
+    record_cycle,
+    record_probe_timings,
+)
 
 # Disable SSL warnings for development environment
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -86,8 +112,31 @@ def _ssl_cache_set(key: tuple, info: Optional[Dict[str, Any]]) -> None:
     _ssl_info_cache[key] = (time.time(), info)
 
 
-async def get_ssl_cert_info(url: str) -> Optional[Dict[str, Any]]:
-    """Get SSL certificate information for a URL (cached)."""
+def export_ssl_cache() -> List[list]:
+    """Unexpired cert info entries as [host, port, cached_at, info]"""
+    now = time.time()
+    return [
+        [host, port, cached_at, info]
+        for (host, port), (cached_at, info) in list(_ssl_info_cache.items())
+        if now - cached_at <= SSL_CACHE_TTL_SECONDS
+    ]
+
+
+def import_ssl_cache(entries: List[list]) -> int:
+    """Restore entries from export_ssl_cache(), keeping their age"""
+    restored = 0
+    for host, port, cached_at, info in entries:
+        _ssl_info_cache.setdefault((host, port), (cached_at, info))
+        restored += 1
+    return restored
+
+
+async def get_ssl_cert_info(url: str, resolver: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """Get SSL certificate information for a URL (cached).
+
+    With a ``resolver`` (LB pinning), the certificate is fetched from the
+    address the probe connects to, with the hostname kept for SNI.
+    """
     try:
         parsed = urlparse(url if url.startswith("http") else f"https://{url}")
         hostname = parsed.hostname
@@ -113,8 +162,14 @@ async def get_ssl_cert_info(url: str) -> Optional[Dict[str, Any]]:
         # The certificate info retrieval needs SSL to be active
 
         # Connect and get certificate
+        address = hostname
+        if resolver is not None:
+            _, address = (await resolver.lookup(hostname))[0]
         reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(hostname, port, ssl=ssl_context), timeout=5
+            asyncio.open_connection(
+                address, port, ssl=ssl_context, server_hostname=hostname
+            ),
+            timeout=5,
         )
 
         # Get SSL object from transport
@@ -130,26 +185,7 @@ async def get_ssl_cert_info(url: str) -> Optional[Dict[str, Any]]:
         writer.close()
         await writer.wait_closed()
 
-        if not cert:
-            _ssl_cache_set(cache_key, None)
-            return None
-
-        # Parse expiration date
-        not_after = cert.get("notAfter")
-        if not not_after:
-            _ssl_cache_set(cache_key, None)
-            return None
-
-        # Parse date format: 'Jan 1 00:00:00 2025 GMT'
-        expiry_date = datetime.strptime(not_after, "%b %d %H:%M:%S %Y %Z")
-        days_remaining = (expiry_date - datetime.now()).days
-
-        info = {
-            "expiry_date": expiry_date.isoformat(),
-            "days_remaining": days_remaining,
-            "issuer": cert.get("issuer", []),
-            "subject": cert.get("subject", []),
-        }
+        info = cert_info(cert)
         _ssl_cache_set(cache_key, info)
         return info
 
@@ -215,135 +251,169 @@ def serialize_record(record: Dict[str, Any]) -> Dict[str, Any]:
     return subset
 
 
-async def send_slack_alert_async(
-    session: aiohttp.ClientSession, url: str, status_code: int, details: str
-) -> None:
-    """Send Slack alert for critical errors"""
-    if not ENABLE_SLACK_NOTIFICATIONS or not SLACK_WEBHOOK_URL:
-        return
+def get_full_url(url: str) -> str:
+    """URL as probed (https:// is assumed when no scheme is given)"""
+    if not url.startswith(("http://", "https://")):
+        return f"https://{url}"
+    return url
 
-    try:
-        message = {
-            "text": "🚨 Portal Checker Alert",
-            "attachments": [
-                {
-                    "color": "danger",
-                    "fields": [
-                        {"title": "URL", "value": url, "short": False},
-                        {"title": "Status", "value": f"{status_code}", "short": True},
-                        {"title": "Details", "value": details, "short": True},
-                        {
-                            "title": "Time",
-                            "value": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "short": True,
-                        },
-                    ],
-                }
-            ],
-        }
 
-        await session.post(SLACK_WEBHOOK_URL, json=message)
-        logger.debug(f"📧 Alerte Slack envoyée pour {url}")
-    except Exception as e:
-        logger.error(f"❌ Erreur lors de l'envoi de l'alerte Slack: {e}")
+def make_skipped_result(data: Dict[str, Any], status: int, details: str) -> Dict[str, Any]:
+    """Result of a URL reported without sending any HTTP request"""
+    data["last_checked"] = time.time()
+    data["status"] = status
+    data["details"] = details
+    data["healthy"] = False
+    data["response_time"] = 0
+    data["timings"] = {}
+    return data
 
 
 async def check_single_url(
-    session: aiohttp.ClientSession, data: Dict[str, Any]
+    session: aiohttp.ClientSession,
+    data: Dict[str, Any],
+    h2_pool: Optional[H2Pool] = None,
+    resolver: Optional[Any] = None,
 ) -> Dict[str, Any]:
-    """Check a single URL and return results"""
-    url = data.get("url", "")
+    """Check a single URL and return results.
 
-    if not url.startswith(("http://", "https://")):
-        full_url = f"https://{url}"
-    else:
-        full_url = url
+    The probe honors the URL's CheckPolicy (method, timeout, expected
+    status codes and optional body read limit). With an HTTP/2 pool,
+    https URLs are tried over HTTP/2 first. "tcp" and "tls" policies only
+    check the listener (see l4_probe), through ``resolver``.
+    """
+    url = data.get("url", "")
+    policy = get_check_policy(data)
+    full_url = get_full_url(url)
 
-    start_time = time.time()
+    if policy.probe != "http":
+        return await check_l4(
+            data, policy, compute_budget(policy, data), resolver or get_shared_resolver()
+        )
 
     # Kick off the SSL cert fetch concurrently with the HTTP request so the
     # extra TLS round trip doesn't add latency on top of the HTTP request.
     ssl_task: Optional[asyncio.Task] = None
     if full_url.startswith("https://"):
-        ssl_task = asyncio.create_task(get_ssl_cert_info(full_url))
+        ssl_task = asyncio.create_task(get_ssl_cert_info(full_url, resolver))
 
-    try:
-        async with session.get(full_url, allow_redirects=True) as response:
-            response_time = int((time.time() - start_time) * 1000)  # ms
-            status_code = response.status
+    # Durations use the monotonic clock; last_checked is a wall-clock epoch.
+    data["last_checked"] = time.time()
+    timings = ProbeTimings()
+    start_time = timings.started
+    timings_token = current_timings.set(timings)
+    budget = compute_budget(policy, data)
+    tls_token = current_tls_timeout.set(budget.tls)
+    request = getattr(session, policy.method.lower())
 
-            details = ""
-            # OK or warning codes (not critical errors)
-            ok_warning_codes = {200, 301, 302, 401, 403, 405, 429}
+    try:
+        status_code: Optional[int] = None
+        reason = ""
+        probe_url = full_url
+        if h2_pool is not None:
+            # HTTP/2 first; a None status means "continue over HTTP/1.1
+            # from probe_url" (plain http or origin without h2 support).
+            status_code, reason, probe_url = await h2_pool.probe(
+                policy.method, full_url, budget, timings, policy.max_body_bytes
+            )
+        if status_code is None:
+            async with request(
+                probe_url,
+                allow_redirects=True,
+                timeout=budget.client_timeout(),
+                trace_request_ctx=timings,
+            ) as response:
+                if policy.max_body_bytes:
+                    # Read (part of) the body so the measured time covers the
+                    # payload delivery, without downloading huge responses.
+                    await response.content.read(policy.max_body_bytes)
+                status_code = response.status
+                reason = response.reason
+        timings.finish()
+        response_time = int((time.monotonic() - start_time) * 1000)  # ms
+
+        details = ""
+        healthy = policy.is_expected(status_code)
+
+        if not healthy:
+            details = reason or "Unknown error"
+            logger.debug(
+                f"Erreur pour l'URL {full_url}: {status_code} {reason}"
+            )
 
-            if status_code not in ok_warning_codes:
-                details = response.reason or "Unknown error"
-                logger.debug(
-                    f"Erreur pour l'URL {full_url}: {status_code} {response.reason}"
-                )
-                if ENABLE_SLACK_NOTIFICATIONS:
-                    await send_slack_alert_async(session, url, status_code, details)
-
-            # Add specific messages for common status codes
-            if status_code == 401:
-                details = "Authentification requise"
-            elif status_code == 403:
-                details = "Accès interdit"
-            elif status_code == 404:
-                details = "Page non trouvée"
-                if ENABLE_SLACK_NOTIFICATIONS:
-                    await send_slack_alert_async(session, url, status_code, details)
-            elif status_code == 405:
-                details = "Méthode non autorisée"
-            elif status_code == 429:
-                details = "Trop de requêtes"
-            elif status_code in [301, 302]:
-                details = "Redirection"
-
-            # Collect SSL certificate info from the parallel task started
-            # before the HTTP request.
-            ssl_info: Optional[Dict[str, Any]] = None
-            if ssl_task is not None:
-                try:
-                    ssl_info = await ssl_task
-                except Exception as exc:
-                    logger.debug(f"⚠️ SSL fetch a échoué pour {url}: {exc}")
-                    ssl_info = None
-            else:
-                # HTTP URL - mark explicitly as no SSL
-                ssl_info = {"http_only": True}
+        # Add specific messages for common status codes
+        if status_code == 401:
+            details = "Authentification requise"
+        elif status_code == 403:
+            details = "Accès interdit"
+        elif status_code == 404:
+            details = "Page non trouvée"
+        elif status_code == 405:
+            details = "Méthode non autorisée"
+        elif status_code == 429:
+            details = "Trop de requêtes"
+        elif status_code in [301, 302]:
+            details = "Redirection"
+
+        # Collect SSL certificate info from the parallel task started
+        # before the HTTP request.
+        ssl_info: Optional[Dict[str, Any]] = None
+        if ssl_task is not None:
+            try:
+                ssl_info = await ssl_task
+            except Exception as exc:
+                logger.debug(f"⚠️ SSL fetch a échoué pour {url}: {exc}")
+                ssl_info = None
+        else:
+            # HTTP URL - mark explicitly as no SSL
+            ssl_info = {"http_only": True}
 
-            # Update original dict with results
-            data["status"] = status_code
-            data["details"] = details
-            data["response_time"] = response_time
-            data["ssl_info"] = ssl_info
+        # Update original dict with results
+        data["status"] = status_code
+        data["details"] = details
+        data["response_time"] = response_time
+        data["ssl_info"] = ssl_info
+        data["healthy"] = healthy
+        data["timings"] = timings.as_dict()
 
-            logger.debug(
-                f"Test de l'URL {url} : {status_code}, {response_time}ms, SSL: {ssl_info is not None}"
-            )
+        logger.debug(
+            f"Test de l'URL {url} : {status_code}, {response_time}ms, SSL: {ssl_info is not None}"
+        )
 
-            return data
+        return data
 
-    except asyncio.TimeoutError:
+    except asyncio.TimeoutError as e:
         if ssl_task is not None:
             ssl_task.cancel()
         data["status"] = 408
-        data["details"] = "Timeout"
-        data["response_time"] = int((time.time() - start_time) * 1000)
+        if timings.tls_timed_out:
+            data["details"] = "Timeout (TLS)"
+        elif isinstance(e, aiohttp.ConnectionTimeoutError):
+            data["details"] = "Timeout (connexion)"
+        elif isinstance(e, aiohttp.SocketTimeoutError):
+            data["details"] = "Timeout (premier octet)"
+        else:
+            data["details"] = "Timeout"
+        data["healthy"] = False
+        data["response_time"] = int((time.monotonic() - start_time) * 1000)
         return data
 
     except aiohttp.ClientError as e:
         if ssl_task is not None:
             ssl_task.cancel()
         error_msg = str(e)
-        if "certificate" in error_msg.lower():
+        data["healthy"] = False
+        if timings.tls_timed_out:
+            # TLS budget exceeded (ssl_handshake_timeout set by the connector)
+            data["status"] = 408
+            data["details"] = "Timeout (TLS)"
+        elif "certificate" in error_msg.lower():
             data["status"] = 495
             data["details"] = "SSL Certificate Error"
         else:
             data["status"] = 503
             data["details"] = f"Connection Error: {error_msg[:150]}"
-        data["response_time"] = int((time.time() - start_time) * 1000)
+        data["response_time"] = int((time.monotonic() - start_time) * 1000)
         return data
 
     except Exception as e:
@@ -351,28 +421,130 @@ async def check_single_url(
             ssl_task.cancel()
         data["status"] = 500
         data["details"] = f"Error: {str(e)[:150]}"
-        data["response_time"] = int((time.time() - start_time) * 1000)
+        data["healthy"] = False
+        data["response_time"] = int((time.monotonic() - start_time) * 1000)
         logger.error(f"Erreur inattendue pour {url}: {e}")
         return data
 
+    finally:
+        current_timings.reset(timings_token)
+        current_tls_timeout.reset(tls_token)
+        if "total" not in timings.phases:
+            # Failed probe: keep the phases reached before the error
+            timings.finish()
+            data["timings"] = timings.as_dict()
+
 
 async def check_urls_async(
     data_urls: List[Dict[str, Any]],
     update_cache: bool = True,
     is_url_excluded_func: Optional[Any] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> List[Dict[str, Any]]:
-    """Check all URLs asynchronously"""
+    """Check all URLs asynchronously.
+
+    ``on_result`` is called as soon as each probe completes, so a single
+    slow host doesn't delay the publication of every other result.
+    """
     ssl_context = get_ssl_context()
+    stats = CycleStats()
+    phases = PhaseAggregator()
+    cycle_started = time.monotonic()
+
+    # The gate below bounds concurrent probes and each probe holds at most
+    # one pooled connection (cert fetches open their own): the pool follows it.
+    connection_limit = concurrency_ceiling()
+    pinned_resolver = None
+    if LB_PINNING:
+        # Hosts connect to their Ingress/Gateway load balancer, not to DNS
+        pinned_resolver = PinnedResolver(build_pin_map(data_urls), get_shared_resolver())
+        connector = TimedTCPConnector(
+            ssl=ssl_context,
+            limit=connection_limit,
+            resolver=pinned_resolver,
+            use_dns_cache=False,
+        )
+    elif DNS_CACHE_ENABLED:
+        # Shared resolver: DNS answers survive across cycles and sessions
+        connector = TimedTCPConnector(
+            ssl=ssl_context,
+            limit=connection_limit,
+            resolver=get_shared_resolver(),
+            use_dns_cache=False,
+        )
+    else:
+        connector = TimedTCPConnector(ssl=ssl_context, limit=connection_limit)
+
+    # Optional HTTP/2 transport, with its own ALPN-enabled TLS context
+    h2_pool = (
+        H2Pool(get_ssl_context(), resolver=pinned_resolver)
+        if HTTP2_PROBES and H2_AVAILABLE
+        else None
+    )
 
     async with aiohttp.ClientSession(
         timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
-        connector=aiohttp.TCPConnector(ssl=ssl_context, limit=50),
+        connector=connector,
+        trace_configs=[build_trace_config()],
     ) as session:
-        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        limiter = get_adaptive_limiter()
+        if limiter is not None:
+            sem = ConcurrencyGate(limiter)
+        else:
+            sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        unresolvable_hosts: set = set()
+        dns_mismatches: Dict[str, str] = {}
+
+        def publish(result):
+            stats.add(result)
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.error(f"❌ Erreur lors de la publication du résultat: {e}")
+            return result
+
+        breaker = get_circuit_breaker()
+        latency_history = get_latency_history()
 
         async def bounded_test(data):
+            full_url = get_full_url(data.get("url", ""))
+            host = urlparse(full_url).hostname
+            if data.get("probe_skip"):
+                # Discovered as not probeable: reported without a request,
+                # neither healthy nor failing
+                result = make_skipped_result(data, 0, f"Non testable: {data['probe_skip']}")
+                result["healthy"] = None
+                return publish(result)
+            if pinned_resolver is not None and has_no_lb_address(data):
+                return publish(
+                    make_skipped_result(data, 503, "Aucune adresse de load balancer assignée")
+                )
+            if host in unresolvable_hosts:
+                return publish(make_skipped_result(data, 503, "DNS Error: NXDOMAIN"))
+            circuit = host_key(full_url)
+            if breaker is not None and not breaker.allow(circuit):
+                status, details = breaker.cached_failure(circuit)
+                return publish(make_skipped_result(data, status, details))
+            queued_at = time.monotonic()
             async with sem:
-                return await check_single_url(session, data)
+                semaphore_wait = time.monotonic() - queued_at
+                result = await check_single_url(
+                    session, data, h2_pool=h2_pool, resolver=pinned_resolver
+                )
+            result.setdefault("timings", {})["semaphore_wait"] = round(
+                semaphore_wait * 1000, 1
+            )
+            record_probe_timings(result["timings"], phases)
+            if limiter is not None:
+                limiter.on_result(result)
+            if breaker is not None:
+                breaker.record(circuit, result)
+            if latency_history is not None:
+                latency_history.record(result_key(result), result)
+            if pinned_resolver is not None:
+                result["lb_dns_mismatch"] = dns_mismatches.get((host or "").lower())
+            return publish(result)
 
         # Filter excluded URLs before testing
         filtered_data_urls = data_urls
@@ -394,45 +566,54 @@ async def check_urls_async(
                     f"(exclusions déjà appliquées en amont)"
                 )
 
+        if pinned_resolver is not None:
+            dns_mismatches = await pinned_resolver.find_dns_mismatches()
+            record_pinning_cycle(
+                pinned_resolver.pins,
+                sum(1 for data in filtered_data_urls if has_no_lb_address(data)),
+                dns_mismatches,
+            )
+
+        if DNS_CACHE_ENABLED and DNS_PRERESOLVE and filtered_data_urls:
+            if pinned_resolver is not None:
+                # Pinned hosts don't depend on DNS to be probed
+                hosts = unpinned_hosts(filtered_data_urls, pinned_resolver.pins)
+            else:
+                hosts = {
+                    urlparse(get_full_url(data.get("url", ""))).hostname
+                    for data in filtered_data_urls
+                }
+            unresolvable_hosts = await get_shared_resolver().preresolve(
+                host for host in hosts if host
+            )
+            if unresolvable_hosts:
+                logger.info(
+                    f"🌐 {len(unresolvable_hosts)} hôtes inexistants (NXDOMAIN), "
+                    f"URLs signalées sans requête HTTP"
+                )
+
         # Execute tests in parallel
         tasks = [bounded_test(data) for data in filtered_data_urls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if h2_pool is not None:
+                await h2_pool.close()
 
     final_results = [r for r in results if isinstance(r, dict)]
+    record_cycle(phases, time.monotonic() - cycle_started, len(final_results))
 
-    # Create summary
-    status_counts = {
-        "success": 0,
-        "client_errors": 0,
-        "server_errors": 0,
-        "total": len(final_results),
-    }
-
-    error_summary = {}
-
-    for result in final_results:
-        status = result.get("status", 0)
-        if 200 <= status < 300:
-            status_counts["success"] += 1
-        elif 400 <= status < 500:
-            status_counts["client_errors"] += 1
-        elif 500 <= status < 600:
-            status_counts["server_errors"] += 1
-
-        if status >= 400:
-            error_type = f"{status}"
-            error_summary[error_type] = error_summary.get(error_type, 0) + 1
-
-    # Log summary
+    # Log summary (counters were updated as each probe completed)
+    status_counts = stats.status_counts
     logger.info(
         f"📊 Récapitulatif: ✅ {status_counts['success']} OK | "
         f"⚠️ {status_counts['client_errors']} 4xx | "
         f"❌ {status_counts['server_errors']} 5xx"
     )
 
-    if error_summary:
+    if stats.error_summary:
         error_details = ", ".join(
-            [f"{code}: {count}" for code, count in sorted(error_summary.items())]
+            [f"{code}: {count}" for code, count in sorted(stats.error_summary.items())]
         )
         logger.info(f"🔍 Détail erreurs: {error_details}")
 
@@ -0,0 +1,185 @@
+"""
+Warm start from a results snapshot, and readiness / liveness state
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from .config import (
+    LIVENESS_TIMEOUT_SECONDS,
+    SNAPSHOT_FILE,
+    SNAPSHOT_INTERVAL_SECONDS,
+    SNAPSHOT_MAX_AGE_HOURS,
+)
+from .metrics import register_metrics_provider
+from .results_store import ResultsStore
+from .utils import export_ssl_cache, import_ssl_cache
+
+SNAPSHOT_VERSION = 1
+
+_lifecycle_state: Dict[str, Any] = {
+    "started_at": time.time(),
+    # Last sign of progress of the check loop
+    "heartbeat": time.time(),
+    "background": False,
+    "initial_cycle_pending": False,
+    "live_cycles": 0,
+    "snapshot_results": 0,
+    "snapshot_saved_at": None,
+    "last_save": 0.0,
+}
+_lifecycle_lock = threading.Lock()
+
+
+def save_snapshot(store: ResultsStore, path: str = SNAPSHOT_FILE) -> bool:
+    """Write the results and certificate info (gzip JSON, atomic replace)"""
+    if not path:
+        return False
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "results": store.snapshot(),
+        "ssl": export_ssl_cache(),
+    }
+    tmp_path = f"{path}.tmp"
+    try:
+        with gzip.open(tmp_path, "wt", compresslevel=3) as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Sauvegarde du snapshot impossible ({path}): {e}")
+        return False
+    with _lifecycle_lock:
+        _lifecycle_state["last_save"] = payload["saved_at"]
+    logger.debug(f"💾 Snapshot sauvegardé: {len(payload['results'])} résultats")
+    return True
+
+
+def maybe_save_snapshot(store: ResultsStore, path: str = SNAPSHOT_FILE) -> bool:
+    """Save if SNAPSHOT_INTERVAL_SECONDS elapsed since the last save"""
+    if time.time() - _lifecycle_state["last_save"] < SNAPSHOT_INTERVAL_SECONDS:
+        return False
+    return save_snapshot(store, path)
+
+
+def load_snapshot(
+    store: ResultsStore,
+    path: str = SNAPSHOT_FILE,
+    max_age: float = SNAPSHOT_MAX_AGE_HOURS * 3600,
+) -> int:
+    """Publish the saved results, marked stale, and restore certificate
+    info. Returns the number of results restored."""
+    if not path:
+        return 0
+    try:
+        with gzip.open(path, "rt") as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError, EOFError) as e:
+        logger.warning(f"⚠️ Snapshot illisible ({path}): {e}")
+        return 0
+    if not isinstance(saved, dict) or saved.get("version") != SNAPSHOT_VERSION:
+        return 0
+    saved_at = float(saved.get("saved_at") or 0)
+    if time.time() - saved_at > max_age:
+        logger.info("📸 Snapshot trop ancien, ignoré")
+        return 0
+
+    restored = 0
+    for result in saved.get("results") or []:
+        if isinstance(result, dict) and result.get("url"):
+            store.publish({**result, "stale": True})
+            restored += 1
+    ssl_entries = import_ssl_cache(saved.get("ssl") or [])
+    with _lifecycle_lock:
+        _lifecycle_state["snapshot_results"] = restored
+        _lifecycle_state["snapshot_saved_at"] = saved_at
+    logger.info(
+        f"📸 Démarrage à chaud: {restored} résultats et {ssl_entries} certificats "
+        f"restaurés (snapshot de il y a {int(time.time() - saved_at)}s)"
+    )
+    return restored
+
+
+def heartbeat() -> None:
+    """Record progress of the check loop (liveness)"""
+    _lifecycle_state["heartbeat"] = time.time()
+
+
+def mark_background_started() -> None:
+    with _lifecycle_lock:
+        _lifecycle_state["background"] = True
+        _lifecycle_state["heartbeat"] = time.time()
+
+
+def request_initial_cycle() -> None:
+    """Have the first background cycle check every URL"""
+    with _lifecycle_lock:
+        _lifecycle_state["initial_cycle_pending"] = True
+
+
+def take_initial_cycle() -> bool:
+    """True once, for the cycle that should be the full initial check"""
+    with _lifecycle_lock:
+        pending = _lifecycle_state["initial_cycle_pending"]
+        _lifecycle_state["initial_cycle_pending"] = False
+        return pending
+
+
+def cycle_completed() -> None:
+    with _lifecycle_lock:
+        _lifecycle_state["live_cycles"] += 1
+        _lifecycle_state["heartbeat"] = time.time()
+
+
+def background_running() -> bool:
+    return _lifecycle_state["background"]
+
+
+def is_stale() -> bool:
+    """True until the first live cycle completed"""
+    return not _lifecycle_state["live_cycles"]
+
+
+def readiness(store: ResultsStore) -> Tuple[bool, Dict[str, Any]]:
+    """Ready once results can be served: restored from a snapshot or
+    from a completed live cycle"""
+    state = dict(_lifecycle_state)
+    ready = bool(state["live_cycles"]) or len(store) > 0
+    return ready, {
+        "ready": ready,
+        "stale": not state["live_cycles"],
+        "results": len(store),
+        "snapshot_results": state["snapshot_results"],
+        "live_cycles": state["live_cycles"],
+    }
+
+
+def liveness(now: Optional[float] = None) -> Tuple[bool, Dict[str, Any]]:
+    """Alive unless the check loop stopped making progress"""
+    now = time.time() if now is None else now
+    state = dict(_lifecycle_state)
+    idle = now - state["heartbeat"]
+    alive = not state["background"] or idle < LIVENESS_TIMEOUT_SECONDS
+    return alive, {"alive": alive, "idle_seconds": int(idle)}
+
+
+def _metrics() -> Dict[str, Any]:
+    state = dict(_lifecycle_state)
+    return {
+        "uptime_seconds": int(time.time() - state["started_at"]),
+        "live_cycles": state["live_cycles"],
+        "snapshot_results": state["snapshot_results"],
+        "snapshot_saved_at": state["snapshot_saved_at"],
+        "last_save": state["last_save"] or None,
+    }
+
+
+register_metrics_provider("lifecycle", _metrics)
@@ -61,6 +61,7 @@ function sortTable(field) {
 
 // Fonction pour obtenir la classe CSS du status
 function getStatusClass(status) {
+    if (status === 0) return 'status-skipped';
     if (status === 200) return 'status-200';
     if (status === 301 || status === 302) return 'status-301';
     if (status === 401) return 'status-401';
@@ -82,11 +83,13 @@ const statusIcons = {
     notFound: '<i class="fa-solid fa-question"></i>',
     timeout: '<i class="fa-solid fa-clock"></i>',
     rateLimit: '<i class="fa-solid fa-gauge-high"></i>',
+    skipped: '<i class="fa-solid fa-eye-slash"></i>',
     error: '<i class="fa-solid fa-xmark"></i>'
 };
 
 // Fonction pour obtenir l'icône du status
 function getStatusIcon(status) {
+    if (status === 0) return statusIcons.skipped;
     if (status === 200) return statusIcons.success;
     if (status === 301 || status === 302) return statusIcons.redirect;
     if (status === 401) return statusIcons.warning;
@@ -126,6 +129,12 @@ function formatInfoColumn(item) {
         parts.push(`<span class="info-badge info-class" title="${fullName}">${shortName}</span>`);
     }
 
+    // Probe badge (tests L4 sans requête HTTP)
+    const probe = (item.policy || {}).probe;
+    if (probe === 'tcp' || probe === 'tls') {
+        parts.push(`<span class="info-badge info-probe" title="Test ${probe.toUpperCase()} sans requête HTTP">${probe}</span>`);
+    }
+
     // Annotations badge (si présent)
     const annotationsHtml = formatAnnotationsCompact(item.annotations);
     if (annotationsHtml !== '-') {
@@ -225,6 +234,76 @@ function formatSSLInfo(ssl_info) {
     `;
 }
 
+// Fraîcheur des résultats: en mode échantillonné, tout l'inventaire n'est
+// re-testé qu'une fois par "coverage" (slices × intervalle).
+let coverageSeconds = null;
+
+function getResultAge(item) {
+    if (typeof item.age_seconds === 'number') return item.age_seconds;
+    if (typeof item.last_checked === 'number') {
+        return Math.max(0, Math.round(Date.now() / 1000 - item.last_checked));
+    }
+    return null;
+}
+
+function formatAge(seconds) {
+    if (seconds === null) return 'jamais testé';
+    if (seconds < 60) return `il y a ${seconds}s`;
+    if (seconds < 3600) return `il y a ${Math.round(seconds / 60)}min`;
+    return `il y a ${Math.round(seconds / 3600)}h`;
+}
+
+// Quantiles de latence par URL (id -> {p50, p95, p99}), si LATENCY_SKETCHES
+let latencyQuantiles = {};
+let latencyEnabled = true;
+
+function formatQuantiles(q) {
+    return `p50 ${Math.round(q.p50)} ms / p95 ${Math.round(q.p95)} ms / p99 ${Math.round(q.p99)} ms`;
+}
+
+// Fonction pour formater la colonne Time (latence + âge du résultat)
+function formatResponseTime(item) {
+    const age = getResultAge(item);
+    // Restored from the startup snapshot, or not refreshed for two rounds
+    const stale = item.stale || (age !== null && coverageSeconds && age > 2 * coverageSeconds);
+    const value = item.response_time ? Math.round(item.response_time) + ' ms' : '-';
+    const quantiles = latencyQuantiles[item.id];
+    const title = quantiles ? `${formatAge(age)} · ${formatQuantiles(quantiles)}` : formatAge(age);
+    const anomaly = item.anomaly
+        ? ` <span title="Anomalie (${item.anomaly.kind === 'latency' ? 'latence' : "taux d'erreur"}): ${item.anomaly.value} / habituel ${item.anomaly.baseline}">📈</span>`
+        : '';
+    return `<span class="${stale ? 'stale-result' : ''}" title="${title}">${value}</span>${anomaly}`;
+}
+
+// Quantiles par URL et badge p95 du cluster dans l'en-tête
+async function fetchLatencyQuantiles() {
+    if (!latencyEnabled) return;
+    try {
+        const [urls, cluster] = await Promise.all([
+            fetch('/api/latency?group_by=url'),
+            fetch('/api/latency?group_by=cluster'),
+        ]);
+        if (urls.status === 503) {
+            latencyEnabled = false;
+            return;
+        }
+        if (!urls.ok || !cluster.ok) return;
+        const quantiles = {};
+        (await urls.json()).groups.forEach(group => { quantiles[group.id] = group; });
+        latencyQuantiles = quantiles;
+
+        const groups = (await cluster.json()).groups;
+        const badge = document.getElementById('latencyIndicator');
+        if (badge && groups.length) {
+            document.getElementById('latencyIndicatorValue').textContent = `p95 ${Math.round(groups[0].p95)} ms`;
+            badge.title = `Latence du cluster: ${formatQuantiles(groups[0])}`;
+            badge.hidden = false;
+        }
+    } catch (error) {
+        // Silent fail - keep the previous quantiles
+    }
+}
+
 // Fonction pour rendre le tableau
 function renderTable() {
     const tbody = document.getElementById('resultsTable');
@@ -253,10 +332,10 @@ function renderTable() {
             <td><a href="${linkUrl}" target="_blank" title="${displayUrl}">${displayUrl}</a></td>
             <td>
                 <span class="status-badge ${getStatusClass(item.status)}">
-                    ${getStatusIcon(item.status)} ${item.status}
+                    ${getStatusIcon(item.status)} ${item.status === 0 ? 'N/A' : item.status}
                 </span>
             </td>
-            <td>${item.response_time ? Math.round(item.response_time) + ' ms' : '-'}</td>
+            <td>${formatResponseTime(item)}</td>
             <td style="text-align: center;">
                 ${item.status >= 400 ? `<button class="exclude-btn" onclick="excludeUrl('${item.url}')" title="Exclure cette URL">×</button>` : '-'}
             </td>
@@ -438,6 +517,7 @@ function closeSwaggerModal() {
 const URL_POLL_INTERVAL_MS = 60_000;
 const REFRESH_STATUS_INTERVAL_MS = 2_000;
 let lastUpdatedISO = null;
+let lastResultsVersion = null;
 
 async function fetchUrlsAndRender() {
     try {
@@ -446,14 +526,22 @@ async function fetchUrlsAndRender() {
         const payload = await response.json();
         if (!payload || !Array.isArray(payload.results)) return;
 
-        // Skip the re-render if the cache hasn't moved.
-        if (payload.last_updated && payload.last_updated === lastUpdatedISO) {
+        // Skip the re-render if the store hasn't moved. Results are
+        // published probe by probe, so the version changes mid-cycle.
+        if (payload.version !== undefined) {
+            if (payload.version === lastResultsVersion) return;
+            lastResultsVersion = payload.version;
+        } else if (payload.last_updated && payload.last_updated === lastUpdatedISO) {
             return;
         }
         lastUpdatedISO = payload.last_updated;
+        if (payload.sampling) {
+            coverageSeconds = payload.sampling.coverage_seconds;
+        }
 
         window.initialData = payload.results;
         currentData = [...payload.results];
+        await fetchLatencyQuantiles();
 
         // Re-apply active search filter after data refresh
         const searchInput = document.getElementById('searchInput');
@@ -492,6 +580,10 @@ async function pollRefreshStatus() {
         const status = await response.json();
 
         if (status.running) {
+            // Results are streamed while the refresh runs: show them as they arrive
+            if (status.results_version !== lastResultsVersion) {
+                fetchUrlsAndRender();
+            }
             setTimeout(pollRefreshStatus, REFRESH_STATUS_INTERVAL_MS);
             return;
         }
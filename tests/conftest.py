@@ -0,0 +1,25 @@
+"""
+Helpers shared by the test modules
+"""
+
+from typing import Any, Dict, List
+
+
+def make_result(
+    healthy=True, url="https://app.test/", namespace="shop", name="app", **fields: Any
+) -> Dict[str, Any]:
+    """Probe result of a URL (status from ``healthy``); ``fields`` are added
+    or override the defaults"""
+    return {
+        "url": url,
+        "namespace": namespace,
+        "name": name,
+        "healthy": healthy,
+        "status": 200 if healthy else 503,
+        **fields,
+    }
+
+
+def find_group(report: List[Dict[str, Any]], field: str, value: Any) -> Dict[str, Any]:
+    """Entry of a grouped report whose ``field`` is ``value``"""
+    return next(group for group in report if group.get(field) == value)
@@ -0,0 +1,178 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from unittest.mock import patch
+
+from aiohttp import web
+
+from src import api
+from src.alerts import MAX_LINES_PER_MESSAGE, SlackDispatcher, build_message
+from src.event_loop import new_event_loop
+from src.health_state import HealthTracker
+
+
+def _alert(url, status=404, details="Page non trouvée", state="down"):
+    return {"url": url, "status": status, "details": details, "state": state}
+
+
+class _Webhook:
+    """Local webhook answering with the given statuses, then 200"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.messages = []
+        self.started = threading.Event()
+        self.loop = new_event_loop()
+        self.port = None
+
+    async def handler(self, request):
+        self.messages.append(await request.json())
+        status = self.statuses.pop(0) if self.statuses else 200
+        headers = {"Retry-After": "0.1"} if status == 429 else {}
+        return web.Response(status=status, text="ok", headers=headers)
+
+    def __enter__(self):
+        def run():
+            app = web.Application()
+            app.router.add_post("/hook", self.handler)
+            runner = web.AppRunner(app)
+            self.loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            self.loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            self.runner = runner
+            self.started.set()
+            self.loop.run_forever()
+            self.loop.run_until_complete(runner.cleanup())
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.started.wait(5)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/hook"
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestBuildMessage:
+    def test_last_transition_per_url(self):
+        message = build_message([
+            _alert("a"),
+            _alert("b", 503, "Timeout", state="flapping"),
+            {"url": "a", "status": 200, "details": "OK", "state": "up", "duration": 600},
+        ])
+        text = message["attachments"][0]["text"]
+        assert message["text"] == "🚨 Portal Checker: 1 URL(s) en erreur, 1 rétablie(s)"
+        assert message["attachments"][0]["color"] == "danger"
+        assert text.split("\n") == [
+            "🟠 b — instable (503 Timeout)",
+            "✅ a — rétablie après 10 min",
+        ]
+
+    def test_recoveries_only(self):
+        message = build_message([{"url": "a", "status": 200, "details": "OK", "state": "up"}])
+        assert message["attachments"][0]["color"] == "good"
+        assert message["text"] == "🚨 Portal Checker: 1 rétablie(s)"
+
+    def test_long_batches_summarized(self):
+        alerts = [_alert(f"u{i}") for i in range(MAX_LINES_PER_MESSAGE + 5)]
+        lines = build_message(alerts)["attachments"][0]["text"].split("\n")
+        assert len(lines) == MAX_LINES_PER_MESSAGE + 1
+        assert lines[-1] == "… et 5 autres URLs"
+
+
+class TestSlackDispatcher:
+    def test_full_queue_drops_without_blocking(self):
+        dispatcher = SlackDispatcher("http://unused", queue_size=2)
+        with patch.object(dispatcher, "_ensure_started"):
+            started = time.monotonic()
+            accepted = [dispatcher.notify(_alert(f"u{i}")) for i in range(5)]
+            assert time.monotonic() - started < 0.1
+        assert accepted == [True, True, False, False, False]
+        assert dispatcher.stats["dropped"] == 3
+
+    def test_batch_sent_as_one_message_with_retry(self):
+        with _Webhook([429]) as webhook:
+            dispatcher = SlackDispatcher(webhook.url, window=0.2, min_interval=0)
+            for url in ("a", "b", "c"):
+                dispatcher.notify(_alert(url))
+            assert _wait_for(lambda: dispatcher.stats["messages_sent"] == 1)
+            dispatcher.stop()
+
+        # First post got 429, retried after Retry-After with the same message
+        assert len(webhook.messages) == 2
+        assert webhook.messages[0] == webhook.messages[1]
+        assert dispatcher.stats["retries"] == 1
+        assert dispatcher.stats["alerts_sent"] == 3
+
+    def test_gives_up_after_max_retries(self):
+        with _Webhook([500, 500, 500]) as webhook:
+            with patch("src.alerts.RETRY_BACKOFF_SECONDS", 0.01):
+                dispatcher = SlackDispatcher(
+                    webhook.url, window=0, min_interval=0, max_retries=2
+                )
+                dispatcher.notify(_alert("a"))
+                assert _wait_for(lambda: dispatcher.stats["failed_messages"] == 1)
+                dispatcher.stop()
+        assert len(webhook.messages) == 3
+        assert dispatcher.stats["messages_sent"] == 0
+
+
+    def test_stop_drains_queue(self):
+        with _Webhook([]) as webhook:
+            # The batch window alone would outlast the stop timeout
+            dispatcher = SlackDispatcher(webhook.url, window=30, min_interval=0)
+            for url in ("a", "b"):
+                dispatcher.notify(_alert(url))
+            started = time.monotonic()
+            assert dispatcher.stop(timeout=5)
+            assert time.monotonic() - started < 5
+        assert dispatcher.stats["alerts_sent"] == 2
+        assert dispatcher.snapshot()["pending"] == 0
+
+    def test_stop_is_bounded(self):
+        with _Webhook([500] * 10) as webhook:
+            with patch("src.alerts.RETRY_BACKOFF_SECONDS", 1.0):
+                dispatcher = SlackDispatcher(webhook.url, window=0, min_interval=0)
+                dispatcher.notify(_alert("a"))
+                dispatcher.notify(_alert("b"))
+                started = time.monotonic()
+                assert not dispatcher.stop(timeout=0.3)
+                assert time.monotonic() - started < 1
+
+
+class TestPublishedResults:
+    def test_only_transitions_alert(self):
+        dispatcher = SlackDispatcher("http://unused")
+        tracker = HealthTracker(failure_threshold=2, recovery_threshold=1, path="")
+        failing = {"url": "gone", "status": 404, "healthy": False, "details": "Page non trouvée"}
+        with patch.object(dispatcher, "_ensure_started"), \
+             patch("src.api.get_alert_dispatcher", return_value=dispatcher), \
+             patch("src.api.get_health_tracker", return_value=tracker), \
+             patch.object(api._test_results_cache, "publish"):
+            api._publish_result({"url": "ok", "status": 200, "healthy": True})
+            api._publish_result({"url": "skip", "status": 0, "healthy": None})
+            for _ in range(10):
+                api._publish_result(failing)
+            api._publish_result({"url": "gone", "status": 200, "healthy": True})
+        # One alert when it went down, one when it recovered
+        assert dispatcher.stats["queued"] == 2
+        assert [a["state"] for a in list(dispatcher._queue.queue)] == ["down", "up"]
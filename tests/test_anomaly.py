@@ -0,0 +1,167 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+pytest.importorskip("numpy")
+
+from conftest import make_result
+from src.alerts import build_message
+from src.anomaly import AnomalyDetector
+from src.api import _notify_anomalies, app
+from src.results_store import ResultsStore
+from src.scheduler import url_id
+from src.silences import SilenceStore, silence_from_dict
+
+
+def _result(response_time=100.0, url="https://app.test/", namespace="shop", healthy=True):
+    return make_result(healthy, url, namespace, response_time=response_time)
+
+
+def _warm(detector, cycles=30, **kwargs):
+    rng = random.Random(0)
+    for _ in range(cycles):
+        detector.record(_result(100 + rng.uniform(-5, 5), **kwargs))
+        assert detector.end_cycle() == []
+
+
+class TestAnomalyDetector:
+    def test_latency_spike_flagged(self):
+        detector = AnomalyDetector(min_samples=10)
+        _warm(detector)
+        detector.record(_result(900))
+        alerts = detector.end_cycle()
+        assert len(alerts) == 1
+        assert alerts[0]["state"] == "anomaly"
+        assert "latence 900 ms" in alerts[0]["details"]
+        anomaly = detector.anomalies()[url_id(_result())]
+        assert anomaly["kind"] == "latency"
+        assert anomaly["baseline"] == pytest.approx(100, abs=5)
+
+    def test_small_deviation_ignored(self):
+        detector = AnomalyDetector(min_samples=10, min_delta_ms=50)
+        _warm(detector)
+        # Many standard deviations away but only 30 ms slower
+        detector.record(_result(130))
+        assert detector.end_cycle() == []
+
+    def test_not_flagged_before_warm_up(self):
+        detector = AnomalyDetector(min_samples=10)
+        _warm(detector, cycles=5)
+        detector.record(_result(900))
+        assert detector.end_cycle() == []
+
+    def test_error_rate_flagged(self):
+        detector = AnomalyDetector(min_samples=10, error_delta=0.3)
+        _warm(detector)
+        detector.record(_result(healthy=False))
+        assert detector.end_cycle() == []
+        detector.record(_result(healthy=False))
+        alerts = detector.end_cycle()
+        assert len(alerts) == 1
+        assert "taux d'erreur" in alerts[0]["details"]
+        assert detector.anomalies()[url_id(_result())]["kind"] == "error_rate"
+
+    def test_alert_only_on_new_flag(self):
+        detector = AnomalyDetector(min_samples=10)
+        _warm(detector)
+        detector.record(_result(900))
+        assert len(detector.end_cycle()) == 1
+        detector.record(_result(5000))
+        assert detector.end_cycle() == []
+        # Not checked this cycle: still flagged
+        detector.end_cycle()
+        assert url_id(_result()) in detector.anomalies()
+        detector.record(_result(100))
+        detector.end_cycle()
+        assert detector.anomalies() == {}
+
+    def test_forget_frees_slots(self):
+        detector = AnomalyDetector(capacity=2)
+        for i in range(5):
+            detector.record(_result(url=f"https://u{i}.test/"))
+        detector.end_cycle()
+        detector.forget([("https://u0.test/", "shop", "app")])
+        assert detector.snapshot()["urls"] == 1
+        detector.record(_result(url="https://new.test/"))
+        detector.end_cycle()
+        assert detector.snapshot()["urls"] == 2
+
+    def test_skipped_results_ignored(self):
+        detector = AnomalyDetector()
+        detector.record({**_result(), "healthy": None})
+        assert detector.snapshot()["urls"] == 0
+
+    def test_cycle_is_vectorized(self):
+        detector = AnomalyDetector()
+        results = [_result(100, url=f"https://u{i}.test/") for i in range(50_000)]
+        for result in results:
+            detector.record(result)
+        started = time.perf_counter()
+        detector.end_cycle()
+        assert time.perf_counter() - started < 0.5
+
+
+class TestAnomalyAlerts:
+    def test_message_line(self):
+        alert = {"url": "https://app.test/", "state": "anomaly", "status": "", "details": "latence 900 ms"}
+        message = build_message([alert])
+        assert "📈 https://app.test/ — anomalie: latence 900 ms" in message["attachments"][0]["text"]
+        assert message["attachments"][0]["color"] == "danger"
+
+    def test_muted_alerts_not_sent(self):
+        dispatcher = MagicMock()
+        silences = MagicMock()
+        silences.is_muted.side_effect = [True, False]
+        with patch("src.api.get_alert_dispatcher", return_value=dispatcher), \
+             patch("src.api.get_silence_store", return_value=silences):
+            _notify_anomalies([{"url": "a"}, {"url": "b"}])
+        dispatcher.notify.assert_called_once_with({"url": "b"})
+
+
+    def test_label_silence_mutes_anomaly(self):
+        detector = AnomalyDetector(min_samples=10)
+        labels = {"team": "payments"}
+        rng = random.Random(0)
+        for _ in range(30):
+            detector.record({**_result(100 + rng.uniform(-5, 5)), "labels": labels})
+            detector.end_cycle()
+        detector.record({**_result(900), "labels": labels})
+        alerts = detector.end_cycle()
+        assert alerts[0]["labels"] == labels
+
+        silences = SilenceStore(path="")
+        silences.add(silence_from_dict({"matchers": {"labels": labels}, "duration_minutes": 60}))
+        dispatcher = MagicMock()
+        with patch("src.api.get_alert_dispatcher", return_value=dispatcher), \
+             patch("src.api.get_silence_store", return_value=silences):
+            _notify_anomalies(alerts)
+        dispatcher.notify.assert_not_called()
+
+
+class TestAnomalyApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_urls_carry_anomaly(self, client):
+        detector = AnomalyDetector(min_samples=10)
+        _warm(detector)
+        detector.record(_result(900))
+        detector.end_cycle()
+        store = ResultsStore()
+        store.publish(_result(900))
+        store.publish(_result(url="https://other.test/"))
+        with patch("src.api.get_anomaly_detector", return_value=detector), \
+             patch("src.api._test_results_cache", store):
+            results = client.get("/api/urls").get_json()["results"]
+        assert results[0]["anomaly"]["kind"] == "latency"
+        assert "anomaly" not in results[1]
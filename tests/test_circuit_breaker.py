@@ -0,0 +1,91 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+
+from src.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    host_key,
+    is_connect_failure,
+)
+from src.utils import check_urls_async
+
+TIMEOUT = {"status": 408, "details": "Timeout"}
+OK = {"status": 500, "details": "Internal Server Error"}
+
+
+class TestCircuitBreaker:
+    """Test the per-host circuit breaker"""
+
+    def test_host_key(self):
+        """Test that URLs are grouped by host and port"""
+        assert host_key("App.example.com/path") == "app.example.com:443"
+        assert host_key("http://app.example.com/x") == "app.example.com:80"
+        assert host_key("https://app.example.com:8443/") == "app.example.com:8443"
+
+    def test_connect_failures(self):
+        """Test which results count as connect failures"""
+        assert is_connect_failure(TIMEOUT)
+        assert is_connect_failure({"status": 503, "details": "Connection Error: refused"})
+        assert not is_connect_failure({"status": 503, "details": "Service Unavailable"})
+        assert not is_connect_failure(OK)
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the circuit"""
+        breaker = CircuitBreaker(threshold=3, cooldown=60)
+        for _ in range(2):
+            breaker.record("h:443", TIMEOUT, now=0)
+        assert breaker.state("h:443") == CLOSED
+        breaker.record("h:443", TIMEOUT, now=0)
+        assert breaker.state("h:443") == OPEN
+        assert not breaker.allow("h:443", now=10)
+        status, details = breaker.cached_failure("h:443")
+        assert status == 408
+        assert "Timeout" in details
+
+    def test_http_response_resets_failures(self):
+        """Test that any HTTP answer counts as success"""
+        breaker = CircuitBreaker(threshold=2, cooldown=60)
+        breaker.record("h:443", TIMEOUT, now=0)
+        breaker.record("h:443", OK, now=0)
+        breaker.record("h:443", TIMEOUT, now=0)
+        assert breaker.state("h:443") == CLOSED
+
+    def test_half_open_lets_one_probe_through(self):
+        """Test the single trial probe after the cooldown"""
+        breaker = CircuitBreaker(threshold=1, cooldown=60)
+        breaker.record("h:443", TIMEOUT, now=0)
+        assert breaker.allow("h:443", now=61)
+        assert breaker.state("h:443") == HALF_OPEN
+        assert not breaker.allow("h:443", now=61)
+        # Trial failed: open for another cooldown
+        breaker.record("h:443", TIMEOUT, now=62)
+        assert breaker.state("h:443") == OPEN
+        assert not breaker.allow("h:443", now=100)
+        # Trial succeeded: closed
+        assert breaker.allow("h:443", now=125)
+        breaker.record("h:443", OK, now=125)
+        assert breaker.state("h:443") == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_probes(self):
+        """Test that URLs of an open host are not probed"""
+        breaker = CircuitBreaker(threshold=1, cooldown=60)
+        breaker.record("dead.example.com:443", TIMEOUT)
+        urls = [
+            {"url": f"dead.example.com/{i}", "namespace": "ns", "name": str(i)}
+            for i in range(3)
+        ]
+        with patch("src.utils.get_circuit_breaker", return_value=breaker), \
+             patch("src.utils.check_single_url") as mock_check:
+            results = await check_urls_async(urls)
+        mock_check.assert_not_called()
+        assert [r["status"] for r in results] == [408, 408, 408]
+        assert all(r["healthy"] is False for r in results)
+        assert breaker.snapshot()["short_circuited"] == 3
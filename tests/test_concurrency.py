@@ -0,0 +1,87 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+
+from src.concurrency import WINDOW_SIZE, AdaptiveLimiter, ConcurrencyGate
+
+
+def _feed(limiter, windows, status=200, connect_ms=10.0, saturated=True):
+    for _ in range(windows):
+        if saturated:
+            limiter.mark_saturated()
+        for _ in range(WINDOW_SIZE):
+            limiter.on_result({"status": status, "timings": {"tcp_connect": connect_ms}})
+
+
+class TestAdaptiveConcurrency:
+    """Test the AIMD concurrency limiter"""
+
+    def test_starts_at_floor_and_grows_additively(self):
+        """Test +1 per stable saturated window"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=100)
+        assert limiter.limit == 5
+        _feed(limiter, 10)
+        assert limiter.limit == 15
+
+    def test_no_growth_when_limit_not_reached(self):
+        """Test that an unconstrained limit doesn't keep growing"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=100)
+        _feed(limiter, 10, saturated=False)
+        assert limiter.limit == 5
+
+    def test_ceiling(self):
+        """Test that the limit never exceeds the ceiling"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=8)
+        _feed(limiter, 20)
+        assert limiter.limit == 8
+
+    def test_latency_spike_cuts_multiplicatively(self):
+        """Test the backoff on a connect-latency spike"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=100)
+        _feed(limiter, 45)
+        assert limiter.limit == 50
+        _feed(limiter, 1, connect_ms=500.0)
+        assert limiter.limit == 35
+        assert limiter.decreases == 1
+
+    def test_timeout_spike_cuts_to_floor_at_most(self):
+        """Test the backoff on timeouts, bounded by the floor"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=100)
+        _feed(limiter, 5)
+        for _ in range(10):
+            _feed(limiter, 1, status=408)
+        assert limiter.limit == 5
+
+    def test_stable_timeouts_are_not_a_spike(self):
+        """Test that always-dead hosts don't pin the limit to the floor"""
+        limiter = AdaptiveLimiter(floor=5, ceiling=100)
+        for _ in range(20):
+            limiter.mark_saturated()
+            for i in range(WINDOW_SIZE):
+                status = 408 if i == 0 else 200
+                limiter.on_result({"status": status, "timings": {"tcp_connect": 10.0}})
+        assert limiter.limit == 25
+
+    @pytest.mark.asyncio
+    async def test_gate_enforces_limit(self):
+        """Test that the gate admits at most `limit` probes at once"""
+        limiter = AdaptiveLimiter(floor=3, ceiling=3)
+        gate = ConcurrencyGate(limiter)
+        in_flight = 0
+        peak = 0
+
+        async def probe():
+            nonlocal in_flight, peak
+            async with gate:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.001)
+                in_flight -= 1
+
+        await asyncio.gather(*(probe() for _ in range(30)))
+        assert peak == 3
+        assert limiter._saturated
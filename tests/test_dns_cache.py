@@ -0,0 +1,116 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import socket
+import time
+import pytest
+from unittest.mock import patch
+
+from src.dns_cache import CachingResolver, HostNotFoundError
+from src.utils import check_urls_async
+
+
+def _fake_resolver(answers, ttl=60):
+    """CachingResolver whose upstream queries are served from a dict"""
+    resolver = CachingResolver(max_ttl=300, negative_ttl=30)
+    calls = []
+
+    async def fake_query(host, family):
+        calls.append(host)
+        await asyncio.sleep(0.01)
+        if host not in answers:
+            raise HostNotFoundError(host)
+        return [(socket.AF_INET, answers[host])], ttl
+
+    resolver._query = fake_query
+    return resolver, calls
+
+
+class TestDnsCache:
+    """Test the caching DNS resolver"""
+
+    @pytest.mark.asyncio
+    async def test_answers_are_cached(self):
+        """Test that a host is resolved once and then served from cache"""
+        resolver, calls = _fake_resolver({"a.example": "10.0.0.1"})
+        first = await resolver.resolve("a.example", 443, socket.AF_UNSPEC)
+        second = await resolver.resolve("a.example", 443, socket.AF_UNSPEC)
+        assert first == second
+        assert first[0]["host"] == "10.0.0.1"
+        assert first[0]["port"] == 443
+        assert calls == ["a.example"]
+        assert resolver.stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_are_deduplicated(self):
+        """Test that simultaneous probes of one host share a single query"""
+        resolver, calls = _fake_resolver({"a.example": "10.0.0.1"})
+        await asyncio.gather(*(resolver.lookup("a.example") for _ in range(20)))
+        assert calls == ["a.example"]
+
+    @pytest.mark.asyncio
+    async def test_nxdomain_is_negatively_cached(self):
+        """Test that a missing host is not queried again within the negative TTL"""
+        resolver, calls = _fake_resolver({})
+        for _ in range(2):
+            with pytest.raises(HostNotFoundError):
+                await resolver.lookup("missing.example")
+        assert calls == ["missing.example"]
+        assert resolver.is_known_missing("missing.example")
+        assert resolver.stats["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_resolved_again(self):
+        """Test that answers expire with their TTL"""
+        resolver, calls = _fake_resolver({"a.example": "10.0.0.1"})
+        await resolver.lookup("a.example")
+        real_monotonic = time.monotonic
+        with patch("src.dns_cache.time.monotonic", lambda: real_monotonic() + 61):
+            await resolver.lookup("a.example")
+        assert calls == ["a.example", "a.example"]
+
+    @pytest.mark.asyncio
+    async def test_cache_size_is_bounded(self):
+        """Test that the oldest entries are evicted past max_entries"""
+        resolver, _ = _fake_resolver({f"h{i}.example": "10.0.0.1" for i in range(10)})
+        resolver.max_entries = 5
+        for i in range(10):
+            await resolver.lookup(f"h{i}.example")
+        assert resolver.snapshot_stats()["entries"] == 5
+
+    @pytest.mark.asyncio
+    async def test_preresolve_reports_missing_hosts(self):
+        """Test the bulk pre-resolution stage"""
+        resolver, calls = _fake_resolver({"a.example": "10.0.0.1"})
+        missing = await resolver.preresolve(["a.example", "a.example", "gone.example"])
+        assert missing == {"gone.example"}
+        assert sorted(calls) == ["a.example", "gone.example"]
+
+    @pytest.mark.asyncio
+    async def test_system_resolver_fallback(self):
+        """Test resolution through the system resolver (/etc/hosts)"""
+        resolver = CachingResolver()
+        with patch("src.dns_cache.AIODNS_AVAILABLE", False):
+            addresses = await resolver.lookup("localhost")
+        assert any(ip in ("127.0.0.1", "::1") for _, ip in addresses)
+
+    @pytest.mark.asyncio
+    async def test_unresolvable_hosts_are_not_probed(self):
+        """Test that NXDOMAIN hosts are reported without an HTTP request"""
+        resolver, _ = _fake_resolver({})
+        published = []
+        with patch("src.utils.DNS_PRERESOLVE", True), \
+             patch("src.utils.get_shared_resolver", return_value=resolver), \
+             patch("src.utils.check_single_url") as mock_check:
+            results = await check_urls_async(
+                [{"url": "gone.example/path", "namespace": "ns", "name": "n"}],
+                on_result=published.append,
+            )
+        mock_check.assert_not_called()
+        assert results[0]["status"] == 503
+        assert results[0]["details"] == "DNS Error: NXDOMAIN"
+        assert results[0]["healthy"] is False
+        assert published == results
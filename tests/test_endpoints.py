@@ -0,0 +1,135 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src import api
+from src.endpoints import BackendReadiness, backend_key, watch_endpoint_slices
+
+
+def _slice(name, service, ready, not_ready=0, namespace="shop"):
+    endpoints = [SimpleNamespace(conditions=SimpleNamespace(ready=True)) for _ in range(ready)]
+    endpoints += [SimpleNamespace(conditions=SimpleNamespace(ready=False)) for _ in range(not_ready)]
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            name=name,
+            namespace=namespace,
+            labels={"kubernetes.io/service-name": service},
+            resource_version="42",
+        ),
+        endpoints=endpoints,
+    )
+
+
+def _url(url, service, namespace="shop"):
+    return {"url": url, "namespace": namespace, "name": url, "backend": {"service": service}}
+
+
+class TestBackendReadiness:
+    def test_ready_count_aggregated_over_slices(self):
+        readiness = BackendReadiness()
+        readiness.replace([_slice("web-a", "web", 1, 1), _slice("web-b", "web", 2)])
+        assert readiness.ready_endpoints(("shop", "web")) == 3
+        assert readiness.ready_endpoints(("shop", "other")) is None
+
+    def test_unset_condition_counts_as_ready(self):
+        readiness = BackendReadiness()
+        endpoint_slice = _slice("web-a", "web", 0)
+        endpoint_slice.endpoints = [SimpleNamespace(conditions=None)]
+        readiness.replace([endpoint_slice])
+        assert readiness.ready_endpoints(("shop", "web")) == 1
+
+    def test_down_only_with_zero_ready_endpoints(self):
+        readiness = BackendReadiness()
+        readiness.replace([_slice("web-a", "web", 0, 2), _slice("api-a", "api", 1)])
+        assert readiness.down_reason(_url("a", "web")) == "Backend sans endpoint prêt: shop/web"
+        assert readiness.down_reason(_url("b", "api")) is None
+        # Unknown service or no backend: probed as usual
+        assert readiness.down_reason(_url("c", "external")) is None
+        assert readiness.down_reason({"url": "d"}) is None
+
+    def test_recovery_is_reported_once(self):
+        readiness = BackendReadiness()
+        readiness.replace([_slice("web-a", "web", 0)])
+        assert not readiness.wake.is_set()
+        readiness.apply("MODIFIED", _slice("web-a", "web", 1))
+        assert readiness.wake.is_set()
+        assert readiness.take_recovered() == {("shop", "web")}
+        assert not readiness.wake.is_set()
+        assert readiness.take_recovered() == set()
+
+    def test_deleted_slices(self):
+        readiness = BackendReadiness()
+        readiness.replace([_slice("web-a", "web", 1), _slice("web-b", "web", 0)])
+        readiness.apply("DELETED", _slice("web-a", "web", 1))
+        assert readiness.ready_endpoints(("shop", "web")) == 0
+        readiness.apply("DELETED", _slice("web-b", "web", 0))
+        assert readiness.ready_endpoints(("shop", "web")) is None
+
+    def test_backend_key(self):
+        assert backend_key(_url("a", "web")) == ("shop", "web")
+        assert backend_key({"url": "a", "backend": {"service": None}}) is None
+        cross = {**_url("a", "web"), "backend": {"service": "web", "namespace": "shared"}}
+        assert backend_key(cross) == ("shared", "web")
+
+
+class TestWatch:
+    def test_list_then_incremental_events(self):
+        readiness = BackendReadiness()
+        stop = threading.Event()
+        discovery_api = MagicMock()
+        discovery_api.list_endpoint_slice_for_all_namespaces.return_value = SimpleNamespace(
+            items=[_slice("web-a", "web", 2)],
+            metadata=SimpleNamespace(resource_version="41"),
+        )
+
+        def stream(func, resource_version, timeout_seconds):
+            assert resource_version == "41"
+            yield {"type": "MODIFIED", "object": _slice("web-a", "web", 0)}
+            stop.set()
+
+        watcher = MagicMock()
+        watcher.stream.side_effect = stream
+        with patch("src.endpoints.client.DiscoveryV1Api", return_value=discovery_api), \
+             patch("src.endpoints.watch.Watch", return_value=watcher):
+            watch_endpoint_slices(readiness, stop)
+
+        assert discovery_api.list_endpoint_slice_for_all_namespaces.call_count == 1
+        assert readiness.synced
+        assert readiness.ready_endpoints(("shop", "web")) == 0
+
+
+class TestCycleIntegration:
+    @pytest.mark.asyncio
+    async def test_down_backends_not_probed_and_recovered_rechecked(self):
+        readiness = BackendReadiness()
+        readiness.replace([_slice("web-a", "web", 0), _slice("api-a", "api", 1)])
+        urls = [_url("https://web.test", "web"), _url("https://api.test", "api")]
+        probed = []
+
+        async def fake_check_urls(data_urls, *args, **kwargs):
+            probed.extend(d["url"] for d in data_urls)
+            return [{**d, "status": 200, "healthy": True} for d in data_urls]
+
+        with patch("src.api.get_backend_readiness", return_value=readiness), \
+             patch("src.api.load_urls_from_file", return_value=urls), \
+             patch("src.api.get_check_engine", return_value=None), \
+             patch("src.api.check_urls_async", side_effect=fake_check_urls), \
+             patch("src.api.select_due_urls", return_value=([], [])), \
+             patch("src.api.next_sample_slice", return_value=None):
+            results = await api._run_url_tests(update_cache=False)
+            assert probed == ["https://api.test"]
+            down = next(r for r in results if r["url"] == "https://web.test")
+            assert down["status"] == 503
+            assert down["details"] == "Backend sans endpoint prêt: shop/web"
+
+            # Nothing due, but the recovered backend is rechecked at once
+            probed.clear()
+            readiness.apply("MODIFIED", _slice("web-a", "web", 1))
+            await api._run_url_tests(update_cache=False, only_due=True)
+            assert probed == ["https://web.test"]
@@ -0,0 +1,44 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from unittest.mock import patch
+
+from src import event_loop
+from src.event_loop import loop_implementation, new_event_loop, run_coroutine
+
+
+async def _running_loop_type():
+    return type(asyncio.get_running_loop()).__module__
+
+
+class TestEventLoop:
+    """Test the configurable event loop factory"""
+
+    def test_standard_loop_by_default(self):
+        """Test that asyncio loops are used unless USE_UVLOOP is set"""
+        with patch("src.event_loop.USE_UVLOOP", False):
+            assert loop_implementation() == "asyncio"
+            assert run_coroutine(_running_loop_type()).startswith("asyncio")
+
+    def test_fallback_when_uvloop_missing(self):
+        """Test the automatic fallback when uvloop isn't installed"""
+        with patch("src.event_loop.USE_UVLOOP", True), \
+             patch("src.event_loop.UVLOOP_AVAILABLE", False):
+            assert loop_implementation() == "asyncio"
+            loop = new_event_loop()
+            try:
+                assert isinstance(loop, asyncio.AbstractEventLoop)
+                assert type(loop).__module__.startswith("asyncio")
+            finally:
+                loop.close()
+
+    def test_uvloop_when_enabled(self):
+        """Test that every loop uses uvloop when enabled and installed"""
+        if not event_loop.UVLOOP_AVAILABLE:
+            return
+        with patch("src.event_loop.USE_UVLOOP", True):
+            assert loop_implementation() == "uvloop"
+            assert run_coroutine(_running_loop_type()).startswith("uvloop")
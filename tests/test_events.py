@@ -0,0 +1,150 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+
+from conftest import make_result
+from src.api import _publish_result, app
+from src.events import EventJournal, result_events
+from src.results_store import ResultsStore
+
+
+def _result(healthy=True, url="https://app.test/", expiry="2030-01-01T00:00:00"):
+    return make_result(
+        healthy,
+        url,
+        details="" if healthy else "Service Unavailable",
+        ssl_info={"expiry_date": expiry, "issuer": [["CN", "CA"]]},
+    )
+
+
+def _types(events):
+    return [event["type"] for event in events]
+
+
+class TestResultEvents:
+    def test_down_and_recovered(self):
+        assert _types(result_events(_result(), _result(False))) == ["down"]
+        assert _types(result_events(_result(False), _result())) == ["recovered"]
+        assert result_events(_result(), _result()) == []
+        assert result_events(_result(False), _result(False)) == []
+
+    def test_first_result(self):
+        assert _types(result_events(None, _result(False))) == ["down"]
+        assert result_events(None, _result()) == []
+
+    def test_skipped_results_ignored(self):
+        assert result_events(_result(), {**_result(False), "healthy": None}) == []
+
+    def test_cert_changed(self):
+        events = result_events(_result(), _result(expiry="2031-01-01T00:00:00"))
+        assert _types(events) == ["cert_changed"]
+        assert events[0]["previous_expiry"] == "2030-01-01T00:00:00"
+        assert events[0]["expiry"] == "2031-01-01T00:00:00"
+
+
+class TestEventJournal:
+    def test_ids_and_cursor_pagination(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        for i in range(10):
+            journal.record(None, _result(False, url=f"https://u{i}.test/"))
+        page = journal.read(after=0, limit=4)
+        assert [e["id"] for e in page["events"]] == [1, 2, 3, 4]
+        assert page["next_cursor"] == 4 and page["has_more"]
+        page = journal.read(after=page["next_cursor"], limit=100)
+        assert [e["id"] for e in page["events"]] == list(range(5, 11))
+        assert not page["has_more"] and not page["truncated"]
+        assert journal.read(after=10)["events"] == []
+        assert journal.read(after=10)["next_cursor"] == 10
+
+    def test_inventory_changes(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.sync_inventory([("a", "ns", "x"), ("b", "ns", "x")])
+        assert journal.last_id == 0
+        journal.sync_inventory([("b", "ns", "x"), ("c", "ns", "x")])
+        events = journal.read()["events"]
+        assert [(e["type"], e["url"]) for e in events] == [("route_added", "c"), ("route_removed", "a")]
+
+    def test_inventory_survives_restart(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.sync_inventory([("a", "ns", "x")])
+        restarted = EventJournal(str(tmp_path))
+        restarted.sync_inventory([("a", "ns", "x"), ("b", "ns", "x")])
+        events = restarted.read()["events"]
+        assert [(e["type"], e["url"]) for e in events] == [("route_added", "b")]
+
+    def test_recovery_after_skipped_result(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.record(None, _result(False))
+        maintenance = {**_result(), "healthy": None, "ssl_info": None}
+        journal.record(_result(False), maintenance)
+        journal.record(maintenance, _result())
+        assert _types(journal.read()["events"]) == ["down", "recovered"]
+
+    def test_segments_bounded_and_read_from_disk(self, tmp_path):
+        journal = EventJournal(str(tmp_path), segment_bytes=1024, max_segments=3, tail_size=5)
+        for i in range(100):
+            journal.record(None, _result(False, url=f"https://u{i}.test/"))
+        segments = [n for n in os.listdir(tmp_path) if n.endswith(".jsonl")]
+        assert len(segments) == 3
+        # Older than the tail: served from the segments
+        oldest = journal.read(after=0, limit=1)["events"][0]["id"]
+        page = journal.read(after=oldest, limit=10)
+        assert [e["id"] for e in page["events"]] == list(range(oldest + 1, oldest + 11))
+        # Events before the oldest segment were deleted
+        assert journal.read(after=0)["truncated"]
+        assert not journal.read(after=oldest - 1)["truncated"]
+
+    def test_ids_continue_after_restart(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.record(None, _result(False))
+        journal.flush()
+        restarted = EventJournal(str(tmp_path))
+        assert restarted.read()["events"][0]["id"] == 1
+        restarted.record(_result(False), _result())
+        assert restarted.read(after=1)["events"][0]["id"] == 2
+
+    def test_partial_line_skipped(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.record(None, _result(False))
+        journal.flush()
+        segment = os.path.join(str(tmp_path), os.listdir(tmp_path)[0])
+        with open(segment, "a") as f:
+            f.write('{"id": 2, "ty')
+        assert EventJournal(str(tmp_path)).last_id == 1
+
+    def test_publish_records_transitions(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        store = ResultsStore()
+        with patch("src.api.get_event_journal", return_value=journal), \
+             patch("src.api._test_results_cache", store):
+            _publish_result(_result())
+            _publish_result(_result(False))
+            _publish_result({**_result(), "healthy": None})
+            _publish_result(_result())
+        assert _types(journal.read()["events"]) == ["down", "recovered"]
+
+
+class TestEventsApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_events_endpoint(self, client, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        journal.record(None, _result(False))
+        journal.record(_result(False), _result())
+        with patch("src.api.get_event_journal", return_value=journal):
+            data = client.get("/api/events?after=1").get_json()
+            assert _types(data["events"]) == ["recovered"]
+            assert data["next_cursor"] == 2
+            assert client.get("/api/events?after=abc").status_code == 400
+
+    def test_events_disabled(self, client):
+        with patch("src.api.get_event_journal", return_value=None):
+            assert client.get("/api/events").status_code == 503
@@ -40,6 +40,25 @@ class TestFlaskRoutes:
         assert isinstance(data['results'], list)
         assert isinstance(data['total'], int)
 
+    def test_api_urls_reports_result_age(self, client):
+        """Test /api/urls exposes the age of each result and sampling info"""
+        import time
+        from src.results_store import ResultsStore
+
+        store = ResultsStore()
+        store.publish({"url": "https://a.example.com", "status": 200,
+                       "last_checked": time.time() - 42})
+        store.publish({"url": "https://b.example.com"})
+        with patch('src.api._test_results_cache', store):
+            response = client.get('/api/urls')
+
+        data = response.get_json()
+        assert 41 <= data['results'][0]['age_seconds'] <= 43
+        assert data['results'][1]['age_seconds'] is None
+        assert data['version'] == 2
+        assert 'slices' in data['sampling']
+        assert 'coverage_seconds' in data['sampling']
+
     def test_api_swagger_endpoint(self, client):
         """Test /api/swagger endpoint returns JSON with swagger data"""
         response = client.get('/api/swagger')
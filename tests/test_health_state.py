@@ -0,0 +1,102 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import make_result
+from src.health_state import DEGRADED, DOWN, FLAPPING, UP, HealthTracker
+
+
+def _result(healthy, url="https://app.test/"):
+    return make_result(healthy, url, "ns", details="OK" if healthy else "Timeout")
+
+
+def _tracker(**kwargs):
+    options = {"failure_threshold": 3, "recovery_threshold": 2, "flap_threshold": 0, "path": ""}
+    options.update(kwargs)
+    return HealthTracker(**options)
+
+
+def _feed(tracker, outcomes):
+    """Observe a sequence of outcomes, return the states alerted"""
+    alerts = [tracker.observe(_result(healthy)) for healthy in outcomes]
+    return [alert["state"] for alert in alerts if alert]
+
+
+class TestTransitions:
+    def test_failures_below_threshold_not_alerted(self):
+        tracker = _tracker()
+        assert _feed(tracker, [False, False, True, False, False, True]) == []
+        assert tracker.state(_result(True)) == UP
+
+    def test_degraded_then_down(self):
+        tracker = _tracker()
+        _feed(tracker, [False])
+        assert tracker.state(_result(False)) == DEGRADED
+        assert _feed(tracker, [False, False]) == ["down"]
+        # A long outage is alerted once
+        assert _feed(tracker, [False] * 50) == []
+        assert tracker.state(_result(False)) == DOWN
+
+    def test_recovery_needs_consecutive_successes(self):
+        tracker = _tracker()
+        _feed(tracker, [False] * 3)
+        assert _feed(tracker, [True, False, True]) == []
+        assert tracker.state(_result(True)) == DOWN
+        assert _feed(tracker, [True]) == ["up"]
+
+    def test_recovery_alert_carries_outage_duration(self):
+        tracker = _tracker(failure_threshold=1, recovery_threshold=1)
+        tracker.observe(_result(False), now=1000.0)
+        alert = tracker.observe(_result(True), now=1600.0)
+        assert alert["state"] == "up"
+        assert alert["previous"] == "down"
+        assert alert["duration"] == 600.0
+
+    def test_skipped_results_ignored(self):
+        tracker = _tracker(failure_threshold=1)
+        assert tracker.observe({**_result(False), "healthy": None}) is None
+        assert tracker.snapshot()["tracked"] == 0
+
+    def test_flapping_alerted_once(self):
+        tracker = _tracker(failure_threshold=2, flap_threshold=4)
+        alerts = _feed(tracker, [False, True] * 10)
+        assert alerts == ["flapping"]
+        assert tracker.state(_result(True)) == FLAPPING
+        # Stable again: leaves flapping once changes drop under half the threshold
+        assert _feed(tracker, [True] * 20) == ["up"]
+
+    def test_forget(self):
+        tracker = _tracker(failure_threshold=1)
+        tracker.observe(_result(False, "https://a.test/"))
+        tracker.observe(_result(False, "https://b.test/"))
+        tracker.forget([("https://a.test/", "ns", "app")])
+        assert tracker.snapshot()["tracked"] == 1
+
+
+class TestPersistence:
+    def test_restart_does_not_realert(self, tmp_path):
+        path = str(tmp_path / "alert-state.json")
+        tracker = _tracker(path=path)
+        assert _feed(tracker, [False] * 3) == ["down"]
+        tracker.save()
+
+        restarted = _tracker(path=path)
+        assert restarted.state(_result(False)) == DOWN
+        assert _feed(restarted, [False] * 5) == []
+        assert _feed(restarted, [True, True]) == ["up"]
+
+    def test_unreadable_file_starts_clean(self, tmp_path):
+        path = tmp_path / "alert-state.json"
+        path.write_text("{not json")
+        tracker = _tracker(path=str(path))
+        assert tracker.snapshot()["tracked"] == 0
+
+    def test_save_only_when_changed(self, tmp_path):
+        path = tmp_path / "alert-state.json"
+        tracker = _tracker(path=str(path))
+        tracker.save()
+        assert not path.exists()
+        tracker.observe(_result(False))
+        tracker.save()
+        assert path.exists()
@@ -0,0 +1,124 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+
+from conftest import make_result
+from src.api import app
+from src.history import MIN_CAPACITY, RING_OVERHEAD_BYTES, SAMPLE_BYTES, UrlHistory
+from src.scheduler import result_key, url_id
+
+
+def _result(i=0, ts=1000, status=200, url="https://app.test/", timings=None):
+    return make_result(
+        status < 400,
+        url,
+        "ns",
+        status=status,
+        last_checked=ts,
+        response_time=10 + i,
+        timings=timings if timings is not None else {"dns": 1.5, "ttfb": 8.0},
+    )
+
+
+class TestRing:
+    def test_oldest_samples_overwritten(self):
+        history = UrlHistory(samples=MIN_CAPACITY)
+        for i in range(MIN_CAPACITY + 5):
+            history.record(_result(i, ts=1000 + i))
+        data = history.query(url_id(_result()))
+        assert data["count"] == MIN_CAPACITY
+        assert [s["ts"] for s in data["samples"]] == list(range(1005, 1005 + MIN_CAPACITY))
+
+    def test_sample_fields(self):
+        history = UrlHistory()
+        history.record(_result(ts=1234, status=503))
+        sample = history.query(url_id(_result()))["samples"][0]
+        assert sample == {
+            "ts": 1234,
+            "status": 503,
+            "response_time": 10.0,
+            "timings": {"dns": 1.5, "ttfb": 8.0},
+        }
+
+    def test_since_and_limit(self):
+        history = UrlHistory()
+        for i in range(10):
+            history.record(_result(i, ts=1000 + i))
+        rid = url_id(_result())
+        assert [s["ts"] for s in history.query(rid, since=1007)["samples"]] == [1007, 1008, 1009]
+        assert [s["ts"] for s in history.query(rid, limit=2)["samples"]] == [1008, 1009]
+
+    def test_skipped_results_not_recorded(self):
+        history = UrlHistory()
+        history.record({**_result(), "healthy": None, "status": 0})
+        assert history.query(url_id(_result())) is None
+
+
+class TestMemoryCap:
+    def _fill(self, history, urls, samples):
+        for n in range(urls):
+            for i in range(samples):
+                history.record(_result(i, ts=1000 + i, url=f"https://u{n}.test/"))
+
+    def test_rings_shrink_to_stay_under_cap(self):
+        cap = 50 * (100 * SAMPLE_BYTES + RING_OVERHEAD_BYTES)
+        history = UrlHistory(samples=1000, memory_bytes=cap)
+        self._fill(history, 100, 120)
+        snapshot = history.snapshot()
+        assert snapshot["urls"] == 100
+        assert history.memory_estimate() <= cap
+        assert snapshot["capacity_per_url"] < 100
+        # Newest samples kept
+        samples = history.query(url_id(_result(url="https://u0.test/")))["samples"]
+        assert samples[-1]["ts"] == 1119
+
+    def test_new_urls_rejected_at_minimal_capacity(self):
+        cap = 10 * (MIN_CAPACITY * SAMPLE_BYTES + RING_OVERHEAD_BYTES)
+        history = UrlHistory(samples=1000, memory_bytes=cap)
+        self._fill(history, 20, 1)
+        assert history.snapshot()["rejected"] > 0
+        assert history.memory_estimate() <= cap
+
+    def test_capacity_grows_back_when_urls_leave(self):
+        cap = 50 * (100 * SAMPLE_BYTES + RING_OVERHEAD_BYTES)
+        history = UrlHistory(samples=1000, memory_bytes=cap)
+        self._fill(history, 200, 3)
+        shrunk = history.capacity
+        history.forget([result_key(_result(url="https://u0.test/"))])
+        assert history.capacity > shrunk
+        assert history.snapshot()["urls"] == 1
+        assert len(history.query(url_id(_result(url="https://u0.test/")))["samples"]) == 3
+
+
+class TestHistoryApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_history_endpoint(self, client):
+        history = UrlHistory()
+        for i in range(5):
+            history.record(_result(i, ts=1000 + i))
+        rid = url_id(_result())
+        with patch("src.api.get_url_history", return_value=history):
+            response = client.get(f"/api/urls/{rid}/history?limit=3")
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data["url"] == "https://app.test/"
+            assert [s["ts"] for s in data["samples"]] == [1002, 1003, 1004]
+            assert client.get("/api/urls/unknown/history").status_code == 404
+
+    def test_history_disabled(self, client):
+        with patch("src.api.get_url_history", return_value=None):
+            assert client.get("/api/urls/abc/history").status_code == 503
+
+    def test_urls_expose_history_id(self, client):
+        with patch("src.api._test_results_cache.snapshot", return_value=[_result()]):
+            results = client.get("/api/urls").get_json()["results"]
+        assert results[0]["id"] == url_id(_result())
@@ -0,0 +1,170 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+
+from src.api import app
+from src.history_db import HistoryDB, connect
+from src.scheduler import url_id
+
+HOUR = 3600
+T0 = 1_700_000_000 - 1_700_000_000 % HOUR
+
+
+def _result(ts, healthy=True, response_time=20.0, url="https://app.test/"):
+    return {
+        "url": url,
+        "namespace": "ns",
+        "name": "app",
+        "status": 200 if healthy else 503,
+        "healthy": healthy,
+        "last_checked": ts,
+        "response_time": response_time,
+        "timings": {"dns": 1.0, "ttfb": 12.5},
+    }
+
+
+RID = url_id(_result(0))
+
+
+@pytest.fixture
+def db(tmp_path):
+    store = HistoryDB(
+        path=str(tmp_path / "history.db"),
+        raw_retention=2 * HOUR,
+        minute_retention=24 * HOUR,
+        hour_retention=30 * 24 * HOUR,
+    )
+    yield store
+    store.stop()
+
+
+def _count(connection, table):
+    return connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def _write_cycle(db, results):
+    for result in results:
+        db.record(result)
+    db.end_cycle()
+    assert db.wait_idle()
+
+
+class TestWrites:
+    def test_cycle_written_in_one_transaction(self, db):
+        _write_cycle(db, [_result(T0 + i * 10) for i in range(30)])
+        assert db.stats["rows_written"] == 30
+        assert db.stats["transactions"] == 1
+
+    def test_wal_mode(self, db):
+        connection = connect(db.path)
+        try:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            connection.close()
+
+    def test_skipped_results_not_stored(self, db):
+        db.record({**_result(T0), "healthy": None})
+        assert db.stats["queued"] == 0
+
+    def test_full_queue_drops(self, tmp_path):
+        store = HistoryDB(path=str(tmp_path / "h.db"), queue_size=2)
+        with patch.object(store, "_ensure_started"):
+            for i in range(5):
+                store.record(_result(T0 + i))
+        assert store.stats["dropped"] == 3
+
+
+class TestQueries:
+    def test_raw_samples(self, db):
+        _write_cycle(db, [_result(T0), _result(T0 + 30, healthy=False)])
+        data = db.query(RID, T0, T0 + 60, resolution="raw")
+        assert data["url"] == "https://app.test/"
+        assert [p["status"] for p in data["points"]] == [200, 503]
+        assert data["points"][0]["ttfb"] == 12.5
+
+    def test_rollups(self, db):
+        samples = [
+            _result(T0 + i * 15, healthy=i != 3, response_time=10.0 * (i + 1))
+            for i in range(8)
+        ]
+        _write_cycle(db, samples[:4])
+        _write_cycle(db, samples[4:])
+
+        minutes = db.query(RID, T0, T0 + 120, resolution="1m")["points"]
+        assert [p["count"] for p in minutes] == [4, 4]
+        assert minutes[0]["availability"] == 0.75
+        assert minutes[0]["rt_min"] == 10.0
+        assert minutes[0]["rt_max"] == 40.0
+        assert minutes[0]["rt_avg"] == 25.0
+
+        hour = db.query(RID, T0, T0 + HOUR, resolution="1h")["points"]
+        assert hour == [{
+            "ts": T0, "count": 8, "failures": 1, "rt_min": 10.0, "rt_max": 80.0,
+            "availability": 0.875, "rt_avg": 45.0,
+        }]
+
+    def test_auto_resolution(self, db):
+        _write_cycle(db, [_result(T0)])
+        assert db.query(RID, T0, T0 + HOUR)["resolution"] == "raw"
+        assert db.query(RID, T0, T0 + 3 * 86400)["resolution"] == "1m"
+        assert db.query(RID, T0, T0 + 30 * 86400)["resolution"] == "1h"
+
+    def test_range_queries_use_primary_key(self, db):
+        connection = connect(db.path)
+        try:
+            for table in ("samples", "rollup_1m", "rollup_1h"):
+                plan = connection.execute(
+                    f"EXPLAIN QUERY PLAN SELECT * FROM {table} "
+                    "WHERE url_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                    (RID, 0, 1),
+                ).fetchall()
+                assert "USING PRIMARY KEY" in plan[0][-1]
+        finally:
+            connection.close()
+
+    def test_unknown_url(self, db):
+        _write_cycle(db, [_result(T0)])
+        assert db.query("unknown", T0, T0 + 60) is None
+        with pytest.raises(ValueError):
+            db.query(RID, T0, T0 + 60, resolution="5m")
+
+
+class TestRetention:
+    def test_each_resolution_pruned_separately(self, db):
+        _write_cycle(db, [_result(T0), _result(T0 + 5 * HOUR)])
+        connection = connect(db.path)
+        try:
+            db.prune(connection, now=T0 + 5 * HOUR)
+            assert _count(connection, "samples") == 1
+            assert _count(connection, "rollup_1m") == 2
+            db.prune(connection, now=T0 + 48 * HOUR)
+            assert _count(connection, "rollup_1m") == 0
+            assert _count(connection, "rollup_1h") == 2
+        finally:
+            connection.close()
+
+
+class TestTimeseriesApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_timeseries_endpoint(self, client, db):
+        _write_cycle(db, [_result(T0), _result(T0 + 30)])
+        with patch("src.api.get_history_db", return_value=db):
+            response = client.get(f"/api/urls/{RID}/timeseries?from={T0}&to={T0 + 60}")
+            assert response.status_code == 200
+            assert response.get_json()["count"] == 2
+            bad = client.get(f"/api/urls/{RID}/timeseries?resolution=week")
+            assert bad.status_code == 400
+            assert client.get("/api/urls/unknown/timeseries").status_code == 404
+
+    def test_disabled(self, client):
+        with patch("src.api.get_history_db", return_value=None):
+            assert client.get(f"/api/urls/{RID}/timeseries").status_code == 503
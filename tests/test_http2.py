@@ -0,0 +1,189 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import shutil
+import socket
+import ssl
+import subprocess
+import pytest
+from aiohttp import web
+
+from unittest.mock import patch
+
+from src.http2 import H2Pool, _stats, cert_covers
+from src.timeouts import TimeoutBudget
+from src.tracing import ProbeTimings
+from src.utils import check_urls_async
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl CLI required")
+
+
+@pytest.fixture(scope="module")
+def wildcard_cert(tmp_path_factory):
+    """Self-signed certificate for apps.test and *.apps.test"""
+    directory = tmp_path_factory.mktemp("certs")
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=apps.test",
+         "-addext", "subjectAltName=DNS:apps.test,DNS:*.apps.test"],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+class _LocalResolver:
+    async def lookup(self, host, family=0):
+        return [(socket.AF_INET, "127.0.0.1")]
+
+
+def _pool(cert):
+    pool = H2Pool(ssl.create_default_context(cafile=cert))
+    pool._resolver = _LocalResolver()
+    return pool
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _asgi_app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/redirect":
+        await send({"type": "http.response.start", "status": 302,
+                    "headers": [(b"location", b"/ok")]})
+    else:
+        status = 404 if scope["path"] == "/missing" else 200
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"x-http-version", scope["http_version"].encode())]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class TestHttp2:
+    """Test the HTTP/2 probe transport"""
+
+    def test_cert_coverage(self):
+        """Test SAN matching used for connection coalescing"""
+        cert = {"subjectAltName": (("DNS", "*.apps.test"), ("DNS", "apps.test"))}
+        assert cert_covers(cert, "a.apps.test")
+        assert cert_covers(cert, "APPS.test")
+        assert not cert_covers(cert, "x.a.apps.test")
+        assert not cert_covers(cert, "other.test")
+        assert not cert_covers({}, "a.apps.test")
+
+    @pytest.mark.asyncio
+    async def test_multiplexing_and_coalescing(self, wildcard_cert):
+        """Test that probes of several hosts share one h2 connection"""
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        cert, key = wildcard_cert
+        port = _free_port()
+        config = Config()
+        config.bind = [f"127.0.0.1:{port}"]
+        config.certfile, config.keyfile = cert, key
+        config.accesslog = config.errorlog = None
+        shutdown = asyncio.Event()
+        server = asyncio.create_task(serve(_asgi_app, config, shutdown_trigger=shutdown.wait))
+        await asyncio.sleep(0.5)
+
+        pool = _pool(cert)
+        opened = _stats["connections_opened"]
+        coalesced = _stats["coalesced"]
+        budget = TimeoutBudget(total=5)
+        try:
+            urls = [f"https://{host}.apps.test:{port}/p/{i}"
+                    for i in range(10) for host in ("a", "b", "c")]
+            results = await asyncio.gather(
+                *(pool.probe("GET", url, budget, ProbeTimings()) for url in urls)
+            )
+            missing = await pool.probe(
+                "GET", f"https://a.apps.test:{port}/missing", budget, ProbeTimings()
+            )
+            timings = ProbeTimings()
+            redirected = await pool.probe(
+                "HEAD", f"https://b.apps.test:{port}/redirect", budget, timings
+            )
+        finally:
+            await pool.close()
+            shutdown.set()
+            await server
+
+        assert {status for status, _, _ in results} == {200}
+        assert _stats["connections_opened"] - opened == 1
+        assert _stats["coalesced"] - coalesced >= 20
+        assert missing[:2] == (404, "Not Found")
+        assert redirected[0] == 200
+        assert redirected[2].endswith("/ok")
+        assert timings.redirects == 1
+
+    @pytest.mark.asyncio
+    async def test_http1_fallback(self, wildcard_cert):
+        """Test that an origin without h2 ALPN is handed back to HTTP/1.1"""
+        cert, key = wildcard_cert
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+        async def ok(request):
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get("/", ok)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=server_context)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        pool = _pool(cert)
+        url = f"https://h1.apps.test:{port}/"
+        try:
+            status, _, next_url = await pool.probe(
+                "GET", url, TimeoutBudget(total=5), ProbeTimings()
+            )
+        finally:
+            await pool.close()
+            await runner.cleanup()
+        assert status is None
+        assert next_url == url
+        assert H2Pool.is_http1_origin("h1.apps.test", port)
+
+    @pytest.mark.asyncio
+    async def test_check_cycle_over_http2(self, wildcard_cert):
+        """Test a check cycle with HTTP2_PROBES enabled"""
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        cert, key = wildcard_cert
+        port = _free_port()
+        config = Config()
+        config.bind = [f"127.0.0.1:{port}"]
+        config.certfile, config.keyfile = cert, key
+        config.accesslog = config.errorlog = None
+        shutdown = asyncio.Event()
+        server = asyncio.create_task(serve(_asgi_app, config, shutdown_trigger=shutdown.wait))
+        await asyncio.sleep(0.5)
+
+        urls = [
+            {"url": f"{host}.apps.test:{port}/missing", "namespace": "ns", "name": host}
+            for host in ("a", "b")
+        ]
+        try:
+            with patch("src.utils.HTTP2_PROBES", True), \
+                 patch("src.utils.CUSTOM_CERT", cert), \
+                 patch("src.http2.get_shared_resolver", return_value=_LocalResolver()), \
+                 patch("src.utils.get_ssl_cert_info", return_value=None):
+                results = await check_urls_async(urls)
+        finally:
+            shutdown.set()
+            await server
+
+        assert [r["status"] for r in results] == [404, 404]
+        assert results[0]["details"] == "Page non trouvée"
+        assert "ttfb" in results[0]["timings"]
+        assert results[1]["timings"]["reused_connection"] is True
@@ -0,0 +1,180 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import shutil
+import socket
+import ssl
+import subprocess
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src import kubernetes_client, l4_probe
+from src.kubernetes_client import get_all_urls_with_details
+from src.policy import DEFAULT_POLICY, compile_policy, policy_from_dict
+from src.utils import check_single_url
+
+
+class _LocalResolver:
+    async def lookup(self, host, family=0):
+        return [(socket.AF_INET, "127.0.0.1")]
+
+
+@pytest.fixture(scope="module")
+def cert_files(tmp_path_factory):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl CLI required")
+    directory = tmp_path_factory.mktemp("certs")
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=edge.test",
+         "-addext", "subjectAltName=DNS:edge.test"],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+async def _listener(ssl_context=None):
+    """Local listener counting connections and bytes received"""
+    seen = {"connections": 0, "bytes": 0}
+
+    async def handle(reader, writer):
+        seen["connections"] += 1
+        try:
+            seen["bytes"] += len(await asyncio.wait_for(reader.read(1024), 0.2))
+        except (asyncio.TimeoutError, ConnectionError, ssl.SSLError):
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=ssl_context)
+    return server, server.sockets[0].getsockname()[1], seen
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestProbePolicy:
+    def test_probe_annotation(self):
+        assert DEFAULT_POLICY.probe == "http"
+        assert compile_policy({"portal-checker.io/probe": "TLS"}).probe == "tls"
+        assert compile_policy({"portal-checker.io/probe": "icmp"}).probe == "http"
+
+    def test_probe_roundtrip(self):
+        policy = compile_policy({"portal-checker.io/probe": "tcp"})
+        assert policy.overrides() == {"probe": "tcp"}
+        assert policy_from_dict(policy.overrides()).probe == "tcp"
+
+    def test_namespace_annotations_are_route_defaults(self):
+        v1 = MagicMock()
+        v1.list_namespaced_ingress.return_value = SimpleNamespace(items=[])
+        v1_core = MagicMock()
+        v1_core.list_namespace.return_value = SimpleNamespace(items=[SimpleNamespace(
+            metadata=SimpleNamespace(name="edge", annotations={
+                "portal-checker.io/probe": "tls", "other.io/x": "y",
+            })
+        )])
+        custom_api = MagicMock()
+        custom_api.list_namespaced_custom_object.return_value = {"items": [
+            {
+                "metadata": {"name": name, "annotations": annotations},
+                "spec": {"hostnames": [f"{name}.test"], "rules": [{}]},
+            }
+            for name, annotations in (
+                ("inherits", {}),
+                ("overrides", {"portal-checker.io/probe": "http"}),
+            )
+        ]}
+        with patch.object(kubernetes_client.client, "NetworkingV1Api", return_value=v1), \
+             patch.object(kubernetes_client.client, "CoreV1Api", return_value=v1_core), \
+             patch.object(kubernetes_client.client, "CustomObjectsApi", return_value=custom_api), \
+             patch("src.kubernetes_client._load_excluded_patterns", return_value=[]), \
+             patch("src.kubernetes_client.EXCLUDE_SELF", False):
+            urls = get_all_urls_with_details(force_refresh=True)
+
+        by_name = {u["name"]: u for u in urls}
+        assert by_name["inherits"]["policy"] == {"probe": "tls"}
+        assert by_name["overrides"]["policy"] == {}
+
+
+class TestL4Probe:
+    @pytest.mark.asyncio
+    async def test_tcp_probe_sends_no_request(self):
+        server, port, seen = await _listener()
+        try:
+            data = {"url": f"edge.test:{port}", "policy": {"probe": "tcp"}}
+            result = await check_single_url(MagicMock(), data, resolver=_LocalResolver())
+            await asyncio.sleep(0.3)
+        finally:
+            server.close()
+        assert result["status"] == 200
+        assert result["healthy"] is True
+        assert result["details"] == "Connexion TCP établie"
+        assert "tcp_connect" in result["timings"]
+        assert seen == {"connections": 1, "bytes": 0}
+
+    @pytest.mark.asyncio
+    async def test_tcp_probe_refused(self):
+        data = {"url": f"edge.test:{_free_port()}", "policy": {"probe": "tcp"}}
+        result = await check_single_url(MagicMock(), data, resolver=_LocalResolver())
+        assert result["status"] == 503
+        assert result["details"].startswith("Connection Error")
+        assert result["healthy"] is False
+
+    @pytest.mark.asyncio
+    async def test_tls_probe_records_certificate(self, cert_files):
+        cert, key = cert_files
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert, key)
+        server, port, seen = await _listener(server_context)
+        try:
+            data = {"url": f"https://edge.test:{port}/", "policy": {"probe": "tls"}}
+            wait_closed = asyncio.StreamWriter.wait_closed
+            with patch.dict(l4_probe._context_state, {"context": None}), \
+                 patch("src.l4_probe.CUSTOM_CERT", cert), \
+                 patch.object(asyncio.StreamWriter, "wait_closed", autospec=True,
+                              side_effect=wait_closed) as closed:
+                result = await check_single_url(MagicMock(), data, resolver=_LocalResolver())
+            await asyncio.sleep(0.3)
+        finally:
+            server.close()
+        assert result["status"] == 200
+        assert result["details"] == "Handshake TLS réussi"
+        assert result["ssl_info"]["days_remaining"] in (28, 29)
+        assert "tls_handshake" in result["timings"]
+        assert seen["bytes"] == 0
+        closed.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_tls_probe_untrusted_certificate(self, cert_files):
+        cert, key = cert_files
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert, key)
+        server, port, _ = await _listener(server_context)
+        try:
+            data = {"url": f"https://edge.test:{port}/", "policy": {"probe": "tls"}}
+            with patch.dict(l4_probe._context_state, {"context": None}), \
+                 patch("src.l4_probe.CUSTOM_CERT", ""):
+                result = await check_single_url(MagicMock(), data, resolver=_LocalResolver())
+        finally:
+            server.close()
+        assert result["status"] == 495
+        assert result["healthy"] is False
+
+    @pytest.mark.asyncio
+    async def test_connect_timeout(self):
+        class _BlackholeResolver:
+            async def lookup(self, host, family=0):
+                # TEST-NET-1: never answers
+                return [(socket.AF_INET, "192.0.2.1")]
+
+        data = {"url": "edge.test", "policy": {"probe": "tcp", "connect_timeout": 0.2}}
+        result = await check_single_url(MagicMock(), data, resolver=_BlackholeResolver())
+        assert result["status"] in (408, 503)
+        assert result["healthy"] is False
@@ -0,0 +1,169 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socket
+import pytest
+from aiohttp import web
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src.dns_cache import HostNotFoundError
+from src.kubernetes_client import _gateway_lb_addresses, _ingress_lb_addresses
+from src.lb_pinning import PinnedResolver, build_pin_map, has_no_lb_address, unpinned_hosts
+from src.utils import check_urls_async, get_ssl_cert_info
+
+
+class _FakeUpstream:
+    """Public DNS: only the records given, NXDOMAIN for everything else"""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    async def lookup(self, host, family=socket.AF_UNSPEC):
+        self.queries.append(host)
+        if host not in self.records:
+            raise HostNotFoundError(host)
+        return [(socket.AF_INET, ip) for ip in self.records[host]]
+
+
+class TestPinMap:
+    def test_groups_addresses_by_host(self):
+        pins = build_pin_map([
+            {"url": "app.example.com/a", "lb_addresses": ["10.0.0.1"]},
+            {"url": "https://APP.example.com/b", "lb_addresses": ["10.0.0.1", "10.0.0.2"]},
+            {"url": "other.example.com", "lb_addresses": []},
+            {"url": "manual.example.com"},
+        ])
+        assert pins == {"app.example.com": ["10.0.0.1", "10.0.0.2"]}
+
+    def test_unassigned_only_for_discovered_routes(self):
+        assert has_no_lb_address({"url": "a", "lb_addresses": []})
+        assert not has_no_lb_address({"url": "a", "lb_addresses": ["10.0.0.1"]})
+        assert not has_no_lb_address({"url": "a"})
+
+    def test_unpinned_hosts(self):
+        data = [{"url": "a.test", "lb_addresses": ["10.0.0.1"]}, {"url": "b.test"}]
+        assert unpinned_hosts(data, build_pin_map(data)) == {"b.test"}
+
+
+class TestDiscoveredAddresses:
+    def test_ingress_status_ips_and_hostnames(self):
+        ingress = SimpleNamespace(status=SimpleNamespace(load_balancer=SimpleNamespace(ingress=[
+            SimpleNamespace(ip="10.0.0.1", hostname=None),
+            SimpleNamespace(ip=None, hostname="lb.cloud.test"),
+            SimpleNamespace(ip="10.0.0.1", hostname=None),
+        ])))
+        assert _ingress_lb_addresses(ingress) == ["10.0.0.1", "lb.cloud.test"]
+
+    def test_ingress_without_address(self):
+        ingress = SimpleNamespace(status=SimpleNamespace(load_balancer=SimpleNamespace(ingress=None)))
+        assert _ingress_lb_addresses(ingress) == []
+
+    def test_gateway_addresses_cached_per_discovery(self):
+        custom_api = MagicMock()
+        custom_api.get_namespaced_custom_object.return_value = {
+            "status": {"addresses": [{"type": "IPAddress", "value": "10.0.0.5"}]}
+        }
+        cache = {}
+        assert _gateway_lb_addresses(custom_api, "infra", "gw", cache) == ["10.0.0.5"]
+        assert _gateway_lb_addresses(custom_api, "infra", "gw", cache) == ["10.0.0.5"]
+        assert custom_api.get_namespaced_custom_object.call_count == 1
+
+    def test_missing_gateway_has_no_address(self):
+        custom_api = MagicMock()
+        custom_api.get_namespaced_custom_object.side_effect = Exception("404")
+        assert _gateway_lb_addresses(custom_api, "infra", "gw", {}) == []
+
+
+class TestPinnedResolver:
+    @pytest.mark.asyncio
+    async def test_pinned_host_bypasses_dns(self):
+        upstream = _FakeUpstream({})
+        resolver = PinnedResolver({"app.test": ["10.0.0.1", "fd00::1"]}, upstream)
+        assert await resolver.lookup("App.test") == [
+            (socket.AF_INET, "10.0.0.1"), (socket.AF_INET6, "fd00::1"),
+        ]
+        assert await resolver.lookup("app.test", socket.AF_INET) == [
+            (socket.AF_INET, "10.0.0.1"),
+        ]
+        assert upstream.queries == []
+
+    @pytest.mark.asyncio
+    async def test_lb_hostname_resolved_through_upstream(self):
+        upstream = _FakeUpstream({"lb.cloud.test": ["10.0.0.9"]})
+        resolver = PinnedResolver({"app.test": ["lb.cloud.test"]}, upstream)
+        assert await resolver.lookup("app.test") == [(socket.AF_INET, "10.0.0.9")]
+
+    @pytest.mark.asyncio
+    async def test_unpinned_host_delegated(self):
+        upstream = _FakeUpstream({"other.test": ["10.1.1.1"]})
+        resolver = PinnedResolver({}, upstream)
+        assert await resolver.lookup("other.test") == [(socket.AF_INET, "10.1.1.1")]
+        with pytest.raises(HostNotFoundError):
+            await resolver.lookup("missing.test")
+
+    @pytest.mark.asyncio
+    async def test_dns_mismatches(self):
+        upstream = _FakeUpstream({
+            "ok.test": ["10.0.0.1", "10.0.0.2"],
+            "stale.test": ["192.0.2.1"],
+        })
+        resolver = PinnedResolver(
+            {"ok.test": ["10.0.0.1"], "stale.test": ["10.0.0.1"], "new.test": ["10.0.0.1"]},
+            upstream,
+        )
+        mismatches = await resolver.find_dns_mismatches()
+        assert set(mismatches) == {"stale.test", "new.test"}
+        assert mismatches["stale.test"] == "DNS 192.0.2.1 ≠ LB 10.0.0.1"
+        assert mismatches["new.test"] == "DNS: NXDOMAIN"
+
+
+class TestPinnedProbes:
+    @pytest.mark.asyncio
+    async def test_probes_connect_to_lb_with_original_host(self):
+        seen_hosts = []
+
+        async def handler(request):
+            seen_hosts.append(request.headers["Host"])
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get("/ok", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            data = [
+                {"url": f"http://portal.lb.test:{port}/ok", "lb_addresses": ["127.0.0.1"]},
+                {"url": f"http://pending.lb.test:{port}/ok", "lb_addresses": []},
+            ]
+            with patch("src.utils.LB_PINNING", True), \
+                 patch("src.utils.get_shared_resolver", return_value=_FakeUpstream({})):
+                results = await check_urls_async(data, update_cache=False)
+        finally:
+            await runner.cleanup()
+
+        by_url = {r["url"]: r for r in results}
+        pinned = by_url[f"http://portal.lb.test:{port}/ok"]
+        assert pinned["status"] == 200
+        assert pinned["lb_dns_mismatch"] == "DNS: NXDOMAIN"
+        assert seen_hosts == [f"portal.lb.test:{port}"]
+
+        pending = by_url[f"http://pending.lb.test:{port}/ok"]
+        assert pending["status"] == 503
+        assert pending["details"] == "Aucune adresse de load balancer assignée"
+
+    @pytest.mark.asyncio
+    async def test_cert_fetched_from_lb_with_sni(self):
+        resolver = PinnedResolver({"cert.lb.test": ["10.0.0.1"]}, _FakeUpstream({}))
+        with patch("src.utils.asyncio.open_connection", side_effect=OSError("refused")) as connect:
+            assert await get_ssl_cert_info("https://cert.lb.test/", resolver) is None
+        args, kwargs = connect.call_args
+        assert args[:2] == ("10.0.0.1", 443)
+        assert kwargs["server_hostname"] == "cert.lb.test"
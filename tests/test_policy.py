@@ -0,0 +1,134 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from src.kubernetes_client import _filter_annotations
+from src.policy import (
+    DEFAULT_EXPECTED_STATUS,
+    DEFAULT_POLICY,
+    compile_policy,
+    get_check_policy,
+    parse_duration,
+    parse_status_set,
+    policy_from_dict,
+)
+from src.utils import check_single_url
+
+
+class TestPolicy:
+    """Test annotation-driven check policies"""
+
+    def test_no_annotations_gives_default_policy(self):
+        """Test that resources without annotations use global defaults"""
+        assert compile_policy({}) is DEFAULT_POLICY
+        assert compile_policy(None) is DEFAULT_POLICY
+        assert compile_policy({"other.io/x": "1"}) is DEFAULT_POLICY
+
+    def test_parse_duration(self):
+        """Test duration parsing with and without units"""
+        assert parse_duration("30") == 30
+        assert parse_duration("30s") == 30
+        assert parse_duration("5m") == 300
+        assert parse_duration("1h") == 3600
+        assert parse_duration("500ms") == 0.5
+        assert parse_duration("abc") is None
+        assert parse_duration("0") is None
+
+    def test_parse_status_set(self):
+        """Test expected-status parsing with lists and ranges"""
+        assert parse_status_set("200") == frozenset({200})
+        assert parse_status_set("200, 204") == frozenset({200, 204})
+        assert parse_status_set("200-202,401") == frozenset({200, 201, 202, 401})
+        assert parse_status_set("abc") is None
+        assert parse_status_set("999") is None
+        assert parse_status_set("300-200") is None
+
+    def test_compile_full_policy(self):
+        """Test that every portal-checker.io annotation is honored"""
+        policy = compile_policy({
+            "portal-checker.io/interval": "10m",
+            "portal-checker.io/timeout": "2s",
+            "portal-checker.io/method": "head",
+            "portal-checker.io/expected-status": "200,401",
+            "portal-checker.io/max-body-bytes": "1024",
+        })
+        assert policy.interval == 600
+        assert policy.timeout == 2
+        assert policy.method == "HEAD"
+        assert policy.expected_status == frozenset({200, 401})
+        assert policy.max_body_bytes == 1024
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        """Test that invalid annotation values are ignored"""
+        policy = compile_policy({
+            "portal-checker.io/interval": "often",
+            "portal-checker.io/method": "DELETE",
+            "portal-checker.io/expected-status": "ok",
+        })
+        assert policy == DEFAULT_POLICY
+
+    def test_overrides_roundtrip(self):
+        """Test that persisted overrides rebuild the same policy"""
+        policy = compile_policy({
+            "portal-checker.io/method": "HEAD",
+            "portal-checker.io/expected-status": "204",
+        })
+        overrides = policy.overrides()
+        assert overrides == {"method": "HEAD", "expected_status": [204]}
+        assert policy_from_dict(overrides) == policy
+        assert DEFAULT_POLICY.overrides() == {}
+
+    def test_get_check_policy_prefers_compiled_policy(self):
+        """Test that the discovered policy wins over raw annotations"""
+        data = {
+            "annotations": {"portal-checker.io/method": "HEAD"},
+            "policy": {"method": "OPTIONS"},
+        }
+        assert get_check_policy(data).method == "OPTIONS"
+        del data["policy"]
+        assert get_check_policy(data).method == "HEAD"
+
+    def test_filter_annotations_keeps_policy_annotations(self):
+        """Test that policy annotations survive the 10 annotations limit"""
+        annotations = {f"example.io/key-{i}": "v" for i in range(20)}
+        annotations["portal-checker.io/interval"] = "5m"
+        annotations["portal-checker.io/expected-status"] = "200"
+        filtered = _filter_annotations(annotations)
+        assert filtered["portal-checker.io/interval"] == "5m"
+        assert filtered["portal-checker.io/expected-status"] == "200"
+        assert len(filtered) == 10
+
+    @pytest.mark.asyncio
+    async def test_check_single_url_uses_policy(self):
+        """Test that the probe uses the policy method and expected codes"""
+        mock_response = AsyncMock()
+        mock_response.status = 401
+        mock_response.reason = "Unauthorized"
+        mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+        mock_response.__aexit__ = AsyncMock(return_value=None)
+
+        session = MagicMock()
+        session.head = MagicMock(return_value=mock_response)
+
+        data = {
+            "url": "http://internal.example.com",
+            "policy": {"method": "HEAD", "expected_status": [200]},
+        }
+        result = await check_single_url(session, data)
+
+        session.head.assert_called_once()
+        session.get.assert_not_called()
+        assert result["status"] == 401
+        assert result["healthy"] is False
+        assert "last_checked" in result
+
+    @pytest.mark.asyncio
+    async def test_default_expected_codes_unchanged(self):
+        """Test that default expected codes match the historical set"""
+        assert DEFAULT_EXPECTED_STATUS == frozenset(
+            {200, 301, 302, 401, 403, 405, 429}
+        )
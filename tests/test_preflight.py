@@ -0,0 +1,151 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src import kubernetes_client
+from src.kubernetes_client import (
+    _literal_path,
+    _missing_backend,
+    _probe_targets,
+    get_all_urls_with_details,
+)
+from src.utils import check_urls_async
+
+
+def _ingress(name, host, path, path_type="Prefix", service="web", annotations=None):
+    backend = SimpleNamespace(
+        service=SimpleNamespace(name=service, port=SimpleNamespace(number=80))
+    )
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name=name, labels={}, annotations=annotations or {}),
+        spec=SimpleNamespace(
+            ingress_class_name="nginx",
+            rules=[SimpleNamespace(host=host, http=SimpleNamespace(paths=[
+                SimpleNamespace(path=path, path_type=path_type, backend=backend)
+            ]))],
+        ),
+        status=SimpleNamespace(load_balancer=SimpleNamespace(ingress=None)),
+    )
+
+
+def _services(*names):
+    return SimpleNamespace(items=[SimpleNamespace(metadata=SimpleNamespace(name=n)) for n in names])
+
+
+class TestProbeTargets:
+    def test_plain_route_unchanged(self):
+        assert _probe_targets("app.test", "/api", "Prefix", {}) == ([("app.test", "/api")], None)
+
+    def test_wildcard_without_substitution(self):
+        with patch("src.kubernetes_client.WILDCARD_HOST_LABELS", []):
+            targets, reason = _probe_targets("*.apps.test", "/", "Prefix", {})
+        assert targets == []
+        assert reason == "hôte wildcard *.apps.test"
+
+    def test_wildcard_expanded_with_configured_labels(self):
+        with patch("src.kubernetes_client.WILDCARD_HOST_LABELS", ["www", "status"]):
+            targets, reason = _probe_targets("*.apps.test", "/", "Prefix", {})
+        assert targets == [("www.apps.test", "/"), ("status.apps.test", "/")]
+        assert reason is None
+
+    def test_wildcard_annotation_wins(self):
+        annotations = {"portal-checker.io/probe-hosts": "a.apps.test, b.apps.test"}
+        with patch("src.kubernetes_client.WILDCARD_HOST_LABELS", ["www"]):
+            targets, _ = _probe_targets("*.apps.test", "/", "Prefix", annotations)
+        assert targets == [("a.apps.test", "/"), ("b.apps.test", "/")]
+
+    def test_regex_path_literal_form(self):
+        assert _literal_path("/api(/|$)(.*)") == "/api"
+        assert _literal_path("^/static/.*") == "/static/"
+        assert _literal_path("/user/[0-9]+") is None
+        assert _literal_path("/broken(") is None
+
+    def test_regex_path_without_literal_form(self):
+        targets, reason = _probe_targets("app.test", "/user/[0-9]+", "ImplementationSpecific", {})
+        assert targets == []
+        assert reason == "chemin regex /user/[0-9]+"
+
+    def test_regex_path_annotation(self):
+        annotations = {"portal-checker.io/probe-path": "/user/42"}
+        targets, reason = _probe_targets(
+            "app.test", "/user/[0-9]+", "ImplementationSpecific", annotations
+        )
+        assert targets == [("app.test", "/user/42")]
+        assert reason is None
+
+    def test_httproute_regular_expression_type(self):
+        targets, _ = _probe_targets("app.test", "/v1/.+", "RegularExpression", {})
+        assert targets == []
+
+
+class TestMissingBackend:
+    def test_missing_service(self):
+        v1_core = MagicMock()
+        v1_core.list_namespaced_service.return_value = _services("web")
+        cache = {}
+        assert _missing_backend(v1_core, [("ns", "web")], cache) is None
+        assert _missing_backend(v1_core, [("ns", "gone")], cache) == (
+            "Service backend introuvable: ns/gone"
+        )
+        # Listed once per namespace and discovery
+        assert v1_core.list_namespaced_service.call_count == 1
+
+    def test_any_existing_backend_is_enough(self):
+        v1_core = MagicMock()
+        v1_core.list_namespaced_service.return_value = _services("canary")
+        assert _missing_backend(v1_core, [("ns", "gone"), ("ns", "canary")], {}) is None
+
+    def test_unlistable_services_are_not_reported(self):
+        v1_core = MagicMock()
+        v1_core.list_namespaced_service.side_effect = Exception("403 Forbidden")
+        assert _missing_backend(v1_core, [("ns", "web")], {}) is None
+
+
+class TestDiscovery:
+    def test_unprobeable_routes_are_marked(self):
+        v1 = MagicMock()
+        v1.list_namespaced_ingress.return_value = SimpleNamespace(items=[
+            _ingress("ok", "app.test", "/"),
+            _ingress("wild", "*.apps.test", "/"),
+            _ingress("rewrite", "app.test", "/api(/|$)(.*)", "ImplementationSpecific"),
+            _ingress("orphan", "old.test", "/", service="deleted"),
+        ])
+        v1_core = MagicMock()
+        v1_core.list_namespace.return_value = SimpleNamespace(
+            items=[SimpleNamespace(metadata=SimpleNamespace(name="ns", annotations=None))]
+        )
+        v1_core.list_namespaced_service.return_value = _services("web")
+        custom_api = MagicMock()
+        custom_api.list_namespaced_custom_object.return_value = {"items": []}
+
+        with patch.object(kubernetes_client.client, "NetworkingV1Api", return_value=v1), \
+             patch.object(kubernetes_client.client, "CoreV1Api", return_value=v1_core), \
+             patch.object(kubernetes_client.client, "CustomObjectsApi", return_value=custom_api), \
+             patch("src.kubernetes_client._load_excluded_patterns", return_value=[]), \
+             patch("src.kubernetes_client.WILDCARD_HOST_LABELS", []), \
+             patch("src.kubernetes_client.EXCLUDE_SELF", False):
+            urls = get_all_urls_with_details(force_refresh=True)
+
+        by_name = {u["name"]: u for u in urls}
+        assert by_name["ok"]["probe_skip"] is None
+        assert by_name["wild"]["probe_skip"] == "hôte wildcard *.apps.test"
+        assert by_name["rewrite"]["url"] == "https://app.test/api"
+        assert by_name["rewrite"]["probe_skip"] is None
+        assert by_name["orphan"]["probe_skip"] == "Service backend introuvable: ns/deleted"
+
+
+class TestSkippedProbes:
+    @pytest.mark.asyncio
+    async def test_unprobeable_urls_not_requested(self):
+        data = [{"url": "https://*.apps.test", "probe_skip": "hôte wildcard *.apps.test"}]
+        with patch("src.utils.check_single_url") as mock_check:
+            results = await check_urls_async(data, update_cache=False)
+        mock_check.assert_not_called()
+        assert results[0]["status"] == 0
+        assert results[0]["healthy"] is None
+        assert results[0]["details"] == "Non testable: hôte wildcard *.apps.test"
@@ -0,0 +1,130 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from unittest.mock import mock_open, patch
+
+from src.process_engine import (
+    ShardedCheckEngine,
+    detect_cpu_limit,
+    resolve_worker_count,
+    shard_of,
+)
+
+
+class TestProcessEngine:
+    """Test the multi-process sharded check engine"""
+
+    def test_worker_count(self):
+        """Test CHECK_WORKERS parsing"""
+        assert resolve_worker_count("4") == 4
+        assert resolve_worker_count("0") == 1
+        assert resolve_worker_count("nope") == 1
+        with patch("src.process_engine.detect_cpu_limit", return_value=3):
+            assert resolve_worker_count("auto") == 3
+
+    def test_cpu_limit_from_cgroup(self):
+        """Test that the cgroup v2 CPU quota is rounded up"""
+        with patch("builtins.open", mock_open(read_data="150000 100000\n")):
+            assert detect_cpu_limit() == 2
+        with patch("builtins.open", mock_open(read_data="max 100000\n")):
+            assert detect_cpu_limit() >= 1
+
+    def test_urls_of_one_host_share_a_shard(self):
+        """Test that sharding is by host"""
+        a = {"url": "app.example.com/one"}
+        b = {"url": "https://app.example.com/two"}
+        assert shard_of(a, 8) == shard_of(b, 8)
+        shards = {shard_of({"url": f"host-{i}.example.com"}, 4) for i in range(50)}
+        assert shards == {0, 1, 2, 3}
+
+    @pytest.mark.asyncio
+    async def test_results_stream_back_from_workers(self):
+        """Test a full cycle across two worker processes"""
+        async def ok(request):
+            return web.Response(text="ok")
+
+        async def missing(request):
+            return web.Response(status=404)
+
+        app = web.Application()
+        app.router.add_get("/ok", ok)
+        app.router.add_get("/missing", missing)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        urls = [
+            {"url": f"http://127.0.0.1:{port}/ok", "namespace": "a", "name": "ok",
+             "annotations": {"team": "a"}},
+            {"url": f"http://127.0.0.1:{port}/missing", "namespace": "a", "name": "missing"},
+            {"url": "http://excluded.local/", "namespace": "a", "name": "excluded"},
+        ]
+        published = []
+        engine = ShardedCheckEngine(2)
+        try:
+            results = await engine.check_urls(
+                urls,
+                is_url_excluded_func=lambda url: "excluded" in url,
+                on_result=published.append,
+            )
+        finally:
+            engine.shutdown()
+            await runner.cleanup()
+
+        by_name = {r["name"]: r for r in results}
+        assert set(by_name) == {"ok", "missing"}
+        assert by_name["ok"]["status"] == 200
+        assert by_name["ok"]["healthy"] is True
+        # Inventory fields are kept by the parent, not round-tripped
+        assert by_name["ok"]["annotations"] == {"team": "a"}
+        assert by_name["missing"]["status"] == 404
+        assert "last_checked" in by_name["missing"]
+        assert len(published) == 2
+
+    @pytest.mark.asyncio
+    async def test_wedged_worker_times_out_and_restarts(self):
+        """Test that a worker stuck past its deadline is replaced"""
+        async def slow(request):
+            await asyncio.sleep(10)
+            return web.Response(text="late")
+
+        async def ok(request):
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get("/slow", slow)
+        app.router.add_get("/ok", ok)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        slow_url = {"url": f"http://127.0.0.1:{port}/slow", "namespace": "a", "name": "slow",
+                    "policy": {"timeout": 30}}
+        engine = ShardedCheckEngine(1, shard_timeout=3)
+        try:
+            published = []
+            results = await engine.check_urls([slow_url], on_result=published.append)
+            assert results[0]["status"] == 408
+            assert results[0]["details"] == "Timeout (worker de test)"
+            assert results[0]["healthy"] is False
+            assert published == results
+            # The next cycle gets a fresh worker
+            results = await engine.check_urls(
+                [{"url": f"http://127.0.0.1:{port}/ok", "namespace": "a", "name": "ok"}]
+            )
+            assert results[0]["status"] == 200
+            assert engine.snapshot_stats()["timeouts"] == 1
+            assert engine.restarts == 1
+        finally:
+            engine.shutdown()
+            await runner.cleanup()
@@ -0,0 +1,107 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from src.results_store import ResultsStore, status_bucket
+from src.scheduler import result_key
+
+
+def _result(url, status):
+    return {"url": url, "namespace": "default", "name": url, "status": status}
+
+
+class TestResultsStore:
+    """Test the keyed, versioned results store"""
+
+    def test_publish_replaces_and_bumps_version(self):
+        """Test that publishing the same URL twice keeps one entry"""
+        store = ResultsStore()
+        assert store.publish(_result("a", 200)) == 1
+        assert store.publish(_result("a", 503)) == 2
+        assert len(store) == 1
+        assert store.get_result(result_key(_result("a", 0)))["status"] == 503
+        assert store.last_updated is not None
+
+    def test_counts_are_incremental(self):
+        """Test that status counters follow replacements and removals"""
+        store = ResultsStore()
+        store.publish(_result("a", 200))
+        store.publish(_result("b", 404))
+        store.publish(_result("c", 503))
+        assert store.status_counts() == {
+            "success": 1, "client_errors": 1, "server_errors": 1, "total": 3
+        }
+        store.publish(_result("c", 200))
+        assert store.status_counts()["server_errors"] == 0
+        assert store.status_counts()["success"] == 2
+        assert store.error_summary() == {"404": 1}
+
+        removed = store.retain([result_key(_result("a", 0))])
+        assert removed == 2
+        assert store.status_counts() == {
+            "success": 1, "client_errors": 0, "server_errors": 0, "total": 1
+        }
+        assert store.error_summary() == {}
+
+    def test_snapshot_is_isolated_from_later_publishes(self):
+        """Test that readers keep a consistent view"""
+        store = ResultsStore()
+        store.publish(_result("a", 200))
+        snapshot = store.snapshot()
+        store.publish(_result("b", 200))
+        assert len(snapshot) == 1
+        assert len(store.snapshot()) == 2
+
+    def test_legacy_mapping_view(self):
+        """Test the read-only view of the former dict cache"""
+        store = ResultsStore()
+        assert store["results"] == []
+        assert store["last_updated"] is None
+        with pytest.raises(KeyError):
+            store["other"]
+
+    def test_status_bucket(self):
+        """Test the dashboard buckets"""
+        assert status_bucket(204) == "success"
+        assert status_bucket(429) == "client_errors"
+        assert status_bucket(502) == "server_errors"
+        assert status_bucket(302) is None
+
+    @pytest.mark.asyncio
+    async def test_results_are_published_before_slow_probe_finishes(self):
+        """Test that a fast result is visible while a slow probe is pending"""
+        from src.utils import check_urls_async
+
+        release_slow = asyncio.Event()
+        store = ResultsStore()
+
+        async def fake_check(session, data, **kwargs):
+            if data["url"] == "slow":
+                await release_slow.wait()
+            data["status"] = 200
+            return data
+
+        async def observer():
+            while len(store) == 0:
+                await asyncio.sleep(0.001)
+            seen = [r["url"] for r in store.snapshot()]
+            release_slow.set()
+            return seen
+
+        with patch('src.utils.check_single_url', side_effect=fake_check):
+            results, seen = await asyncio.gather(
+                check_urls_async(
+                    [_result("slow", 0), _result("fast", 0)],
+                    on_result=store.publish,
+                ),
+                observer(),
+            )
+
+        assert seen == ["fast"]
+        assert len(results) == 2
+        assert len(store) == 2
@@ -0,0 +1,97 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scheduler import (
+    compute_tick_interval,
+    next_sample_slice,
+    result_age,
+    select_due_urls,
+    slice_of,
+)
+
+
+def _entry(url, interval=None):
+    data = {"url": url, "namespace": "default", "name": url}
+    if interval is not None:
+        data["policy"] = {"interval": interval}
+    return data
+
+
+class TestScheduler:
+    """Test per-URL interval scheduling"""
+
+    def test_never_checked_urls_are_due(self):
+        """Test that URLs without previous result are always due"""
+        urls = [_entry("a"), _entry("b", interval=3600)]
+        due, carried = select_due_urls(urls, [], now=1000.0)
+        assert len(due) == 2
+        assert carried == []
+
+    def test_url_not_due_keeps_previous_result(self):
+        """Test that a recently checked URL is carried over"""
+        urls = [_entry("slow", interval=600), _entry("fast", interval=10)]
+        previous = [
+            dict(urls[0], status=200, last_checked=1000.0),
+            dict(urls[1], status=200, last_checked=1000.0),
+        ]
+        due, carried = select_due_urls(urls, previous, now=1030.0)
+        assert [d["url"] for d in due] == ["fast"]
+        assert [c["url"] for c in carried] == ["slow"]
+        assert carried[0]["status"] == 200
+
+    def test_url_due_after_interval(self):
+        """Test that a URL becomes due once its interval elapsed"""
+        urls = [_entry("slow", interval=600)]
+        previous = [dict(urls[0], status=200, last_checked=1000.0)]
+        due, _ = select_due_urls(urls, previous, now=1600.0)
+        assert len(due) == 1
+
+    def test_tick_interval_uses_shortest_policy(self):
+        """Test that the scheduler wakes up for the most aggressive URL"""
+        urls = [_entry("a", interval=600), _entry("b", interval=5)]
+        assert compute_tick_interval(urls, default=30) == 5
+        assert compute_tick_interval([_entry("c", interval=600)], default=30) == 30
+        assert compute_tick_interval([], default=30) == 30
+
+    def test_sampling_covers_inventory_in_k_cycles(self):
+        """Test that every URL is probed exactly once over K cycles"""
+        urls = [_entry(f"url-{i}") for i in range(200)]
+        probed = []
+        for slice_index in range(4):
+            due, _ = select_due_urls(urls, [], now=1000.0, slice_index=slice_index, slices=4)
+            probed.extend(d["url"] for d in due)
+        assert sorted(probed) == sorted(d["url"] for d in urls)
+        # Slices should be reasonably balanced
+        sizes = [
+            len(select_due_urls(urls, [], now=1000.0, slice_index=i, slices=4)[0])
+            for i in range(4)
+        ]
+        assert min(sizes) > 20
+
+    def test_sampling_always_probes_failing_urls(self):
+        """Test that failing URLs are included in every slice"""
+        urls = [_entry(f"url-{i}", interval=1) for i in range(50)]
+        failing = dict(urls[0], status=503, healthy=False, last_checked=900.0)
+        others = [dict(u, status=200, healthy=True, last_checked=900.0) for u in urls[1:]]
+        own_slice = slice_of(urls[0], 4)
+        for slice_index in range(4):
+            due, carried = select_due_urls(
+                urls, [failing] + others, now=1000.0, slice_index=slice_index, slices=4
+            )
+            assert "url-0" in [d["url"] for d in due]
+            assert len(due) + len(carried) == len(urls)
+            if slice_index != own_slice:
+                assert all(slice_of(d, 4) == slice_index for d in due if d["url"] != "url-0")
+
+    def test_slice_cursor_rotates(self):
+        """Test that the sampling cursor walks through all slices"""
+        assert next_sample_slice(1) is None
+        seen = {next_sample_slice(3) for _ in range(3)}
+        assert seen == {0, 1, 2}
+
+    def test_result_age(self):
+        """Test the age reported for each result"""
+        assert result_age({"last_checked": 100.0}, now=130.0) == 30
+        assert result_age({}, now=130.0) is None
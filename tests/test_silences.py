@@ -0,0 +1,163 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+from unittest.mock import patch
+
+from src import api
+from src.api import app
+from src.silences import SilenceStore, silence_from_dict
+
+
+def _url(url, namespace="shop", labels=None, name="web"):
+    return {"url": url, "namespace": namespace, "name": name, "labels": labels or {}}
+
+
+def _silence(store, now=None, **definition):
+    definition.setdefault("duration_minutes", 60)
+    return store.add(silence_from_dict(definition, now=now))
+
+
+class TestMatching:
+    def test_namespace_host_and_labels(self):
+        store = SilenceStore(path="")
+        _silence(store, matchers={"namespaces": ["shop"]})
+        _silence(store, matchers={"hosts": ["*.internal.test"]})
+        _silence(store, matchers={"labels": {"team": "payments", "tier": "front"}})
+
+        assert store.matching(_url("https://app.test", "shop"))
+        assert not store.matching(_url("https://app.test", "blog"))
+        assert store.matching(_url("https://a.b.internal.test/x", "blog"))
+        assert not store.matching(_url("https://internal.test", "blog"))
+        assert store.matching(_url("app.test", "blog", {"team": "payments", "tier": "front"}))
+        # Every label of the selector is required
+        assert not store.matching(_url("app.test", "blog", {"team": "payments"}, name="api"))
+
+    def test_all_matchers_of_a_silence_required(self):
+        store = SilenceStore(path="")
+        _silence(store, matchers={"namespaces": ["shop"], "hosts": ["pay.test"]})
+        assert store.matching(_url("https://pay.test/", "shop"))
+        assert not store.matching(_url("https://cart.test/", "shop"))
+        assert not store.matching(_url("https://pay.test/", "blog"))
+
+    def test_time_window(self):
+        store = SilenceStore(path="")
+        now = time.time()
+        _silence(store, now=now, matchers={"namespaces": ["shop"]},
+                 starts_at=now + 3600, duration_minutes=30)
+        data = _url("https://app.test")
+        assert not store.matching(data, now=now)
+        assert store.matching(data, now=now + 3700)
+        assert not store.matching(data, now=now + 3600 + 1801)
+
+    def test_index_independent_of_silence_count(self):
+        store = SilenceStore(path="")
+        for i in range(300):
+            _silence(store, matchers={"hosts": [f"host{i}.test"]})
+        matched = store.matching(_url("https://host42.test/"))
+        assert [s.hosts for s in matched] == [("host42.test",)]
+        assert store.matching(_url("https://other.test/")) == []
+
+    def test_changes_invalidate_memoized_matches(self):
+        store = SilenceStore(path="")
+        data = _url("https://app.test")
+        assert store.matching(data) == []
+        silence = _silence(store, matchers={"namespaces": ["shop"]})
+        assert store.matching(data) == [silence]
+        store.expire(silence.id)
+        assert store.matching(data) == []
+
+
+class TestValidation:
+    @pytest.mark.parametrize("definition", [
+        {"duration_minutes": 60},
+        {"matchers": {"namespaces": ["shop"]}},
+        {"matchers": {"namespaces": ["shop"]}, "starts_at": "2026-01-02T00:00:00Z",
+         "ends_at": "2026-01-01T00:00:00Z"},
+        {"matchers": {"labels": ["team"]}, "duration_minutes": 60},
+        {"matchers": {"namespaces": ["shop"]}, "duration_minutes": 60 * 24 * 60},
+    ])
+    def test_invalid_definitions(self, definition):
+        with pytest.raises(ValueError):
+            silence_from_dict(definition)
+
+
+class TestStore:
+    def test_prune_and_persistence(self, tmp_path):
+        path = str(tmp_path / "silences.yaml")
+        store = SilenceStore(path=path)
+        now = time.time()
+        kept = _silence(store, now=now, matchers={"namespaces": ["shop"]}, comment="upgrade")
+        _silence(store, now=now - 7200, matchers={"namespaces": ["blog"]})
+
+        assert store.prune() == 1
+        restored = SilenceStore(path=path)
+        assert [s.id for s in restored.list()] == [kept.id]
+        assert restored.list()[0].comment == "upgrade"
+
+
+class TestCycle:
+    @pytest.mark.asyncio
+    async def test_skip_probes_and_muted_alerts(self):
+        store = SilenceStore(path="")
+        _silence(store, matchers={"namespaces": ["shop"]}, skip_probes=True, comment="migration")
+        _silence(store, matchers={"namespaces": ["blog"]})
+        urls = [_url("https://shop.test", "shop"), _url("https://blog.test", "blog")]
+        probed = []
+
+        async def fake_check_urls(data_urls, *args, **kwargs):
+            probed.extend(d["url"] for d in data_urls)
+            return [{**d, "status": 503, "healthy": False} for d in data_urls]
+
+        with patch("src.api.get_silence_store", return_value=store), \
+             patch("src.api.get_backend_readiness", return_value=None), \
+             patch("src.api.load_urls_from_file", return_value=urls), \
+             patch("src.api.get_check_engine", return_value=None), \
+             patch("src.api.check_urls_async", side_effect=fake_check_urls):
+            results = await api._run_url_tests(update_cache=False)
+
+        assert probed == ["https://blog.test"]
+        skipped = next(r for r in results if r["url"] == "https://shop.test")
+        assert skipped["status"] == 0
+        assert skipped["healthy"] is None
+        assert skipped["details"] == "En maintenance: migration"
+
+        # Probed but silenced: the transition is tracked, not alerted
+        assert store.is_muted(results[-1])
+
+
+class TestSilencesApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_create_list_expire(self, client):
+        store = SilenceStore(path="")
+        with patch("src.api.get_silence_store", return_value=store):
+            response = client.post("/api/silences", json={
+                "matchers": {"hosts": ["*.shop.test"]},
+                "duration_minutes": 30,
+                "comment": "Maintenance base de données",
+            })
+            assert response.status_code == 201
+            silence_id = response.get_json()["silence"]["id"]
+
+            listed = client.get("/api/silences").get_json()
+            assert listed["count"] == 1
+            assert listed["silences"][0]["active"] is True
+            assert listed["silences"][0]["hosts"] == ["*.shop.test"]
+
+            assert client.delete(f"/api/silences/{silence_id}").status_code == 200
+            assert client.get("/api/silences").get_json()["count"] == 0
+            assert client.delete(f"/api/silences/{silence_id}").status_code == 404
+
+    def test_invalid_silence_rejected(self, client):
+        with patch("src.api.get_silence_store", return_value=SilenceStore(path="")):
+            response = client.post("/api/silences", json={"duration_minutes": 30})
+        assert response.status_code == 400
+        assert response.get_json()["status"] == "error"
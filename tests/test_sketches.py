@@ -0,0 +1,152 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+
+import pytest
+from unittest.mock import patch
+
+from conftest import find_group, make_result
+from src.api import app
+from src.scheduler import url_id
+from src.sketches import MAX_BINS, RELATIVE_ACCURACY, DDSketch, LatencySketches
+
+T0 = 1_700_000_000 - 1_700_000_000 % 3600
+
+
+def _result(response_time=100.0, url="https://app.test/", namespace="shop", healthy=True):
+    return make_result(healthy, url, namespace, response_time=response_time)
+
+
+def _exact(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+class TestDDSketch:
+    def test_relative_error_bounded(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(4, 1) for _ in range(10_000)]
+        sketch = DDSketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.95, 0.99):
+            exact = _exact(values, q)
+            assert abs(sketch.quantile(q) - exact) <= RELATIVE_ACCURACY * exact * 1.01
+
+    def test_merge_matches_single_sketch(self):
+        rng = random.Random(1)
+        values = [rng.uniform(1, 2000) for _ in range(2000)]
+        whole, left, right = DDSketch(), DDSketch(), DDSketch()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        left.merge(right)
+        assert left.count == whole.count
+        for q in (0.5, 0.95, 0.99):
+            assert left.quantile(q) == whole.quantile(q)
+
+    def test_subtract_undoes_merge(self):
+        base, extra = DDSketch(), DDSketch()
+        for value in (10, 20, 30):
+            base.add(value)
+        for value in (5000, 9000):
+            extra.add(value)
+        expected = base.quantile(0.99)
+        base.merge(extra)
+        assert base.quantile(0.99) > 4000
+        base.subtract(extra)
+        assert base.count == 3
+        assert base.quantile(0.99) == expected
+
+    def test_bins_bounded(self):
+        sketch = DDSketch()
+        value = 0.02
+        while value < 1e7:
+            sketch.add(value)
+            value *= 1.05
+        assert len(sketch.bins) <= MAX_BINS
+        # High quantiles stay accurate, only the lowest bins are collapsed
+        assert sketch.quantile(1.0) == pytest.approx(1e7, rel=0.1)
+
+    def test_empty_and_zero(self):
+        sketch = DDSketch()
+        assert sketch.quantile(0.5) is None
+        sketch.add(0)
+        assert sketch.quantile(0.5) == 0.0
+
+
+class TestLatencySketches:
+    def test_url_quantiles(self):
+        sketches = LatencySketches(window_seconds=3600)
+        for i in range(100):
+            sketches.record(_result(i + 1), now=T0 + i)
+        group = sketches.report("url", now=T0 + 200)[0]
+        assert group["id"] == url_id(_result())
+        assert group["count"] == 100
+        assert group["p50"] == pytest.approx(50, rel=0.02)
+        assert group["p99"] == pytest.approx(99, rel=0.02)
+
+    def test_namespace_and_cluster_merge(self):
+        sketches = LatencySketches(window_seconds=3600)
+        for i in range(50):
+            sketches.record(_result(10, url=f"https://a{i}.test/", namespace="fast"), now=T0)
+            sketches.record(_result(1000, url=f"https://b{i}.test/", namespace="slow"), now=T0)
+        namespaces = sketches.report("namespace", now=T0)
+        assert find_group(namespaces, "namespace", "fast")["p95"] == pytest.approx(10, rel=0.02)
+        assert find_group(namespaces, "namespace", "slow")["p50"] == pytest.approx(1000, rel=0.02)
+        cluster = sketches.report("cluster", now=T0)
+        assert cluster[0]["count"] == 100
+        assert cluster[0]["p99"] == pytest.approx(1000, rel=0.02)
+
+    def test_window_slides(self):
+        sketches = LatencySketches(window_seconds=600)
+        sketches.record(_result(5000), now=T0)
+        sketches.record(_result(5000), now=T0 + 1)
+        sketches.record(_result(10), now=T0 + 300)
+        assert sketches.report(now=T0 + 400)[0]["p99"] == pytest.approx(5000, rel=0.02)
+        # The first sub-window left the window
+        group = sketches.report(now=T0 + 650)[0]
+        assert group["count"] == 1
+        assert group["p99"] == pytest.approx(10, rel=0.02)
+        assert sketches.report(now=T0 + 5000) == []
+
+    def test_failures_and_skips_ignored(self):
+        sketches = LatencySketches()
+        sketches.record(_result(healthy=False))
+        sketches.record({**_result(0), "healthy": None})
+        assert sketches.report() == []
+
+    def test_forget(self):
+        sketches = LatencySketches()
+        sketches.record(_result(url="https://gone.test/"), now=T0)
+        sketches.record(_result(), now=T0)
+        sketches.forget([("https://app.test/", "shop", "app")])
+        assert [g["url"] for g in sketches.report(now=T0)] == ["https://app.test/"]
+
+    def test_invalid_group_by(self):
+        with pytest.raises(ValueError):
+            LatencySketches().report("pod")
+
+
+class TestLatencyApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_latency_endpoint(self, client):
+        sketches = LatencySketches()
+        sketches.record(_result(120))
+        with patch("src.api.get_latency_sketches", return_value=sketches):
+            data = client.get("/api/latency?group_by=namespace").get_json()
+            assert data["groups"][0]["namespace"] == "shop"
+            assert data["groups"][0]["p95"] == pytest.approx(120, rel=0.02)
+            assert client.get("/api/latency?group_by=pod").status_code == 400
+
+    def test_latency_disabled(self, client):
+        with patch("src.api.get_latency_sketches", return_value=None):
+            assert client.get("/api/latency").status_code == 503
@@ -0,0 +1,109 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+
+from conftest import find_group, make_result
+from src.api import app
+from src.scheduler import result_key, url_id
+from src.sla import DAY, HOUR, SlaTracker
+
+T0 = 1_700_000_000 - 1_700_000_000 % DAY
+
+
+def _result(healthy=True, url="https://app.test/", namespace="shop", response_time=100):
+    return make_result(healthy, url, namespace, response_time=response_time)
+
+
+class TestCounters:
+    def test_availability_and_burn_rate(self):
+        tracker = SlaTracker(target=0.99)
+        for i in range(98):
+            tracker.record(_result(), now=T0 + i)
+        for i in range(2):
+            tracker.record(_result(False, response_time=300), now=T0 + 100 + i)
+        group = tracker.report("24h", now=T0 + 200)[0]
+        assert group["id"] == url_id(_result())
+        assert group["checks"] == 100
+        assert group["availability"] == 0.98
+        assert group["avg_response_time"] == 104.0
+        # Failing at twice the rate the 99% target allows
+        assert group["error_budget_burn_rate"] == 2.0
+        assert group["error_budget_remaining"] == -1.0
+
+    def test_group_by_namespace_and_cluster(self):
+        tracker = SlaTracker(target=0.999)
+        tracker.record(_result(url="https://a.test/"), now=T0)
+        tracker.record(_result(False, url="https://b.test/"), now=T0)
+        tracker.record(_result(namespace="blog"), now=T0)
+        namespaces = tracker.report("24h", "namespace", now=T0)
+        assert find_group(namespaces, "namespace", "shop")["availability"] == 0.5
+        assert find_group(namespaces, "namespace", "blog")["availability"] == 1.0
+        cluster = tracker.report("24h", "cluster", now=T0)
+        assert cluster[0]["checks"] == 3
+
+    def test_windows_expire_old_buckets(self):
+        tracker = SlaTracker()
+        tracker.record(_result(False), now=T0)
+        tracker.record(_result(), now=T0 + 2 * DAY)
+        now = T0 + 2 * DAY + HOUR
+        assert tracker.report("24h", now=now)[0]["checks"] == 1
+        assert tracker.report("7d", now=now)[0]["checks"] == 2
+        # Eight days later the failure left the 7d window, not the 30d one
+        now = T0 + 8 * DAY
+        assert tracker.report("7d", now=now)[0]["checks"] == 1
+        assert tracker.report("30d", now=now)[0]["checks"] == 2
+        assert tracker.report("30d", now=T0 + 40 * DAY)[0]["checks"] == 0
+
+    def test_expired_buckets_cancel_exactly(self):
+        tracker = SlaTracker()
+        for i in range(20_000):
+            tracker.record(_result(response_time=30_000.7), now=T0 + i % HOUR)
+        tracker.record(_result(response_time=50), now=T0 + 23 * HOUR)
+        group = tracker.report("24h", now=T0 + 24 * HOUR)[0]
+        assert group["checks"] == 1
+        assert group["avg_response_time"] == 50.0
+
+    def test_skipped_results_ignored(self):
+        tracker = SlaTracker()
+        tracker.record({**_result(), "healthy": None}, now=T0)
+        assert tracker.report("24h", now=T0) == []
+
+    def test_forget_keeps_namespace_totals(self):
+        tracker = SlaTracker()
+        tracker.record(_result(url="https://a.test/"), now=T0)
+        tracker.record(_result(url="https://b.test/"), now=T0)
+        tracker.forget([result_key(_result(url="https://a.test/"))])
+        assert len(tracker.report("24h", now=T0)) == 1
+        assert tracker.report("24h", "namespace", now=T0)[0]["checks"] == 2
+
+    def test_invalid_parameters(self):
+        tracker = SlaTracker()
+        with pytest.raises(ValueError):
+            tracker.report("1y")
+        with pytest.raises(ValueError):
+            tracker.report("24h", "team")
+
+
+class TestSlaApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_sla_endpoint(self, client):
+        tracker = SlaTracker(target=0.999)
+        tracker.record(_result())
+        with patch("src.api.get_sla_tracker", return_value=tracker):
+            data = client.get("/api/sla?window=7d&group_by=namespace").get_json()
+            assert data["target"] == 0.999
+            assert data["groups"][0]["namespace"] == "shop"
+            assert client.get("/api/sla?window=1y").status_code == 400
+
+    def test_sla_disabled(self, client):
+        with patch("src.api.get_sla_tracker", return_value=None):
+            assert client.get("/api/sla").status_code == 503
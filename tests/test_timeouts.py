@@ -0,0 +1,122 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+
+from src.policy import compile_policy
+from src.scheduler import result_key
+from src.timeouts import MIN_SAMPLES, LatencyHistory, TimeoutBudget, compute_budget
+from src.utils import check_urls_async
+
+ENTRY = {"url": "app.example.com/", "namespace": "ns", "name": "app"}
+
+
+def _history_with(total_ms, connect_ms=5.0, ttfb_ms=None):
+    history = LatencyHistory()
+    for _ in range(MIN_SAMPLES):
+        history.record(
+            result_key(ENTRY),
+            {"status": 200, "timings": {"total": total_ms, "tcp_connect": connect_ms,
+                                        "ttfb": ttfb_ms or total_ms}},
+        )
+    return history
+
+
+class TestTimeouts:
+    """Test per-phase and history-informed probe timeouts"""
+
+    def test_phase_annotations(self):
+        """Test the connect/tls/first-byte timeout annotations"""
+        policy = compile_policy({
+            "portal-checker.io/connect-timeout": "500ms",
+            "portal-checker.io/tls-timeout": "1s",
+            "portal-checker.io/first-byte-timeout": "3s",
+            "portal-checker.io/timeout": "bogus",
+        })
+        assert policy.connect_timeout == 0.5
+        assert policy.tls_timeout == 1.0
+        assert policy.first_byte_timeout == 3.0
+
+    def test_client_timeout_mapping(self):
+        """Test the mapping onto aiohttp's ClientTimeout"""
+        timeout = TimeoutBudget(total=10, connect=1, tls=2, first_byte=4).client_timeout()
+        assert timeout.total == 10
+        assert timeout.sock_connect == 3
+        assert timeout.sock_read == 4
+        assert TimeoutBudget(total=10).client_timeout().sock_connect is None
+
+    def test_static_budget_without_history(self):
+        """Test that policy budgets apply when adaptive timeouts are off"""
+        budget = compute_budget(compile_policy({"portal-checker.io/timeout": "7s"}), ENTRY)
+        assert budget.total == 7
+        assert budget.adaptive is False
+
+    def test_budget_derived_from_p99(self):
+        """Test p99 x factor, bounded by floor and ceiling"""
+        policy = compile_policy({"portal-checker.io/timeout": "10s"})
+        with patch("src.timeouts.get_latency_history", return_value=_history_with(1000.0)):
+            budget = compute_budget(policy, ENTRY)
+        assert budget.adaptive is True
+        assert budget.total == 3.0
+        assert budget.connect == 0.5  # floor
+        with patch("src.timeouts.get_latency_history", return_value=_history_with(6000.0)):
+            assert compute_budget(policy, ENTRY).total == 10  # ceiling
+
+    def test_connect_budget_covers_tls(self):
+        """Test that a host whose TLS handshake dominates keeps room for it"""
+        history = LatencyHistory()
+        for _ in range(MIN_SAMPLES):
+            history.record(
+                result_key(ENTRY),
+                {"status": 200, "timings": {"total": 600.0, "tcp_connect": 20.0,
+                                            "tls_handshake": 400.0, "ttfb": 150.0}},
+            )
+        with patch("src.timeouts.get_latency_history", return_value=history):
+            budget = compute_budget(compile_policy({"portal-checker.io/timeout": "10s"}), ENTRY)
+        assert budget.connect == pytest.approx(1.26)
+        assert budget.client_timeout().sock_connect == pytest.approx(1.26)
+
+    def test_not_enough_samples(self):
+        """Test that a short history keeps the static budget"""
+        history = LatencyHistory()
+        history.record(result_key(ENTRY), {"status": 200, "timings": {"total": 10.0}})
+        assert history.p99(result_key(ENTRY)) is None
+
+    def test_full_budget_after_timeout(self):
+        """Test that a slow URL gets its full budget back after a timeout"""
+        history = _history_with(100.0)
+        history.record(result_key(ENTRY), {"status": 408, "details": "Timeout"})
+        assert history.p99(result_key(ENTRY)) is None
+        history.record(result_key(ENTRY), {"status": 200, "timings": {"total": 100.0}})
+        assert history.p99(result_key(ENTRY)) is not None
+
+    @pytest.mark.asyncio
+    async def test_tls_budget_fails_fast(self):
+        """Test that a TLS handshake that never completes fails on its own budget"""
+        async def silent(reader, writer):
+            await asyncio.sleep(5)
+            writer.close()
+
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        entry = {
+            "url": f"https://127.0.0.1:{port}/",
+            "namespace": "ns",
+            "name": "tls",
+            "policy": {"timeout": 5, "tls_timeout": 0.2},
+        }
+        started = time.monotonic()
+        try:
+            with patch("src.utils.get_ssl_cert_info", return_value=None):
+                results = await check_urls_async([entry])
+        finally:
+            server.close()
+        assert time.monotonic() - started < 2
+        assert results[0]["healthy"] is False
+        assert results[0]["status"] == 408
+        assert results[0]["details"] == "Timeout (TLS)"
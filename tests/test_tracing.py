@@ -0,0 +1,129 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from aiohttp import web
+
+from src.metrics import collect_metrics, register_metrics_provider
+from src.tracing import PhaseAggregator, ProbeTimings, record_cycle
+from src.utils import check_urls_async
+
+
+class TestTracing:
+    """Test per-phase latency breakdown"""
+
+    def test_probe_timings_accumulate(self):
+        """Test that phases are accumulated and reported in ms"""
+        timings = ProbeTimings()
+        timings.add("dns", 0.010)
+        timings.add("dns", 0.005)
+        timings.start("ttfb")
+        timings.stop("ttfb")
+        timings.finish()
+        result = timings.as_dict()
+        assert result["dns"] == 15.0
+        assert "ttfb" in result
+        assert result["total"] >= 0
+        assert result["redirects"] == 0
+        assert result["reused_connection"] is False
+
+    def test_stop_without_start_is_ignored(self):
+        """Test that an unmatched stop doesn't record anything"""
+        timings = ProbeTimings()
+        timings.stop("dns")
+        assert "dns" not in timings.phases
+
+    def test_redirect_resets_hop_phases(self):
+        """Test that per-hop phases only describe the final hop"""
+        timings = ProbeTimings()
+        timings.add("semaphore_wait", 0.010)
+        timings.add("dns", 0.020)
+        timings.add("tcp_connect", 0.030)
+        timings.start("ttfb")
+        timings.redirected()
+        timings.add("tcp_connect", 0.005)
+        timings.stop("ttfb")
+        assert timings.redirects == 1
+        assert timings.phases["tcp_connect"] == 0.005
+        assert "dns" not in timings.phases and "ttfb" not in timings.phases
+        assert timings.phases["semaphore_wait"] == 0.010
+        assert "redirect" in timings.phases
+
+    def test_handshake_timeout_flag(self):
+        """Test that only a handshake failing after its budget is a TLS timeout"""
+        timings = ProbeTimings()
+        timings.handshake_failed(0.05, 0.2)
+        assert not timings.tls_timed_out
+        timings.handshake_failed(0.2, 0.2)
+        assert timings.tls_timed_out
+        assert timings.phases["tls_handshake"] == pytest.approx(0.25)
+        no_budget = ProbeTimings()
+        no_budget.handshake_failed(10.0, None)
+        assert not no_budget.tls_timed_out
+
+    def test_phase_aggregator(self):
+        """Test count/avg/max aggregation"""
+        agg = PhaseAggregator()
+        agg.add({"dns": 10.0, "total": 100.0})
+        agg.add({"dns": 30.0, "total": 50.0})
+        snapshot = agg.snapshot()
+        assert snapshot["dns"] == {"count": 2, "total_ms": 40.0, "avg_ms": 20.0, "max_ms": 30.0}
+        assert snapshot["total"]["max_ms"] == 100.0
+
+    def test_record_cycle_reports_semaphore_share(self):
+        """Test the share of time waiting on our own semaphore"""
+        agg = PhaseAggregator()
+        agg.add({"semaphore_wait": 300.0, "total": 100.0})
+        record_cycle(agg, 1.0, 1)
+        last_cycle = collect_metrics()["probe_phases"]["last_cycle"]
+        assert last_cycle["semaphore_wait_ratio"] == 0.75
+        assert last_cycle["probes"] == 1
+
+    def test_failing_provider_is_isolated(self):
+        """Test that a broken provider doesn't break /api/metrics"""
+        def broken():
+            raise RuntimeError("boom")
+
+        register_metrics_provider("broken_for_test", broken)
+        try:
+            assert "error" in collect_metrics()["broken_for_test"]
+        finally:
+            register_metrics_provider("broken_for_test", lambda: {})
+
+    @pytest.mark.asyncio
+    async def test_phases_recorded_against_real_server(self):
+        """Test phases captured by the trace hooks on a local server"""
+        async def redirect(request):
+            raise web.HTTPFound("/ok")
+
+        async def ok(request):
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get("/", redirect)
+        app.router.add_get("/ok", ok)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            results = await check_urls_async(
+                [{"url": f"http://127.0.0.1:{port}/", "namespace": "t", "name": "t"}]
+            )
+        finally:
+            await runner.cleanup()
+
+        timings = results[0]["timings"]
+        assert results[0]["status"] == 200
+        assert timings["redirects"] == 1
+        # The final hop reuses the connection: no connect time of its own
+        assert timings["reused_connection"] is True
+        assert "tcp_connect" not in timings
+        assert timings["redirect"] > 0
+        assert "ttfb" in timings
+        assert "semaphore_wait" in timings
+        assert "tls_handshake" not in timings
+        assert timings["total"] >= timings["ttfb"]
@@ -0,0 +1,173 @@
+import sys
+import os
+# Add the project path to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import json
+import time
+
+import pytest
+from unittest.mock import patch
+
+from conftest import make_result
+from src import utils, warm_start
+from src.api import app, refresh_urls_if_needed
+from src.results_store import ResultsStore
+
+
+def _result(url="https://app.test/", status=200):
+    return make_result(
+        status < 400,
+        url,
+        status=status,
+        response_time=42.0,
+        last_checked=time.time() - 30,
+        ssl_info={"days_remaining": 40},
+    )
+
+
+@pytest.fixture
+def lifecycle():
+    """Fresh lifecycle state, restored after the test"""
+    saved = dict(warm_start._lifecycle_state)
+    warm_start._lifecycle_state.update(
+        background=False, initial_cycle_pending=False, live_cycles=0,
+        snapshot_results=0, last_save=0.0, heartbeat=time.time(),
+    )
+    yield warm_start._lifecycle_state
+    warm_start._lifecycle_state.clear()
+    warm_start._lifecycle_state.update(saved)
+
+
+@pytest.fixture
+def ssl_cache():
+    saved = dict(utils._ssl_info_cache)
+    utils._ssl_info_cache.clear()
+    yield utils._ssl_info_cache
+    utils._ssl_info_cache.clear()
+    utils._ssl_info_cache.update(saved)
+
+
+class TestSnapshot:
+    def test_round_trip_marks_results_stale(self, tmp_path, lifecycle, ssl_cache):
+        path = str(tmp_path / "snapshot.json.gz")
+        store = ResultsStore()
+        store.publish(_result())
+        store.publish(_result("https://down.test/", 503))
+        ssl_cache[("app.test", 443)] = (time.time() - 60, {"days_remaining": 40})
+        assert warm_start.save_snapshot(store, path)
+
+        ssl_cache.clear()
+        restored = ResultsStore()
+        assert warm_start.load_snapshot(restored, path) == 2
+        results = {r["url"]: r for r in restored.snapshot()}
+        assert results["https://down.test/"]["status"] == 503
+        assert all(r["stale"] for r in results.values())
+        assert restored.status_counts()["server_errors"] == 1
+        assert utils._ssl_cache_get(("app.test", 443)) == {"days_remaining": 40}
+
+    def test_snapshot_is_compressed(self, tmp_path, lifecycle):
+        path = str(tmp_path / "snapshot.json.gz")
+        store = ResultsStore()
+        for i in range(200):
+            store.publish(_result(f"https://app{i}.test/"))
+        warm_start.save_snapshot(store, path)
+        raw = len(json.dumps(store.snapshot()))
+        assert os.path.getsize(path) < raw / 5
+        assert not os.path.exists(f"{path}.tmp")
+
+    def test_old_or_invalid_snapshot_ignored(self, tmp_path, lifecycle):
+        path = str(tmp_path / "snapshot.json.gz")
+        store = ResultsStore()
+        store.publish(_result())
+        warm_start.save_snapshot(store, path)
+        assert warm_start.load_snapshot(ResultsStore(), path, max_age=0) == 0
+
+        with open(path, "wb") as f:
+            f.write(b"not gzip")
+        assert warm_start.load_snapshot(ResultsStore(), path) == 0
+        assert warm_start.load_snapshot(ResultsStore(), str(tmp_path / "missing")) == 0
+
+        with gzip.open(path, "wt") as f:
+            json.dump({"version": 99, "results": [_result()]}, f)
+        assert warm_start.load_snapshot(ResultsStore(), path) == 0
+
+    def test_periodic_save_interval(self, tmp_path, lifecycle):
+        path = str(tmp_path / "snapshot.json.gz")
+        store = ResultsStore()
+        assert warm_start.maybe_save_snapshot(store, path)
+        assert not warm_start.maybe_save_snapshot(store, path)
+
+    def test_disabled_without_path(self, lifecycle):
+        assert not warm_start.save_snapshot(ResultsStore(), "")
+        assert warm_start.load_snapshot(ResultsStore(), "") == 0
+
+
+class TestLifecycle:
+    def test_initial_cycle_taken_once(self, lifecycle):
+        warm_start.request_initial_cycle()
+        assert warm_start.take_initial_cycle()
+        assert not warm_start.take_initial_cycle()
+
+    def test_readiness(self, lifecycle):
+        store = ResultsStore()
+        assert not warm_start.readiness(store)[0]
+        store.publish(_result())
+        ready, details = warm_start.readiness(store)
+        assert ready and details["stale"]
+        warm_start.cycle_completed()
+        assert warm_start.readiness(ResultsStore())[0]
+        assert not warm_start.is_stale()
+
+    def test_liveness(self, lifecycle):
+        now = time.time()
+        # Not started yet: alive
+        assert warm_start.liveness(now + 10_000)[0]
+        warm_start.mark_background_started()
+        assert warm_start.liveness(now + 10)[0]
+        assert not warm_start.liveness(now + 10_000)[0]
+        warm_start._lifecycle_state["heartbeat"] = now + 9_990
+        assert warm_start.liveness(now + 10_000)[0]
+
+
+class TestWarmStartApi:
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_startup_serves_snapshot_without_probing(self, client, tmp_path, lifecycle):
+        path = str(tmp_path / "snapshot.json.gz")
+        saved = ResultsStore()
+        saved.publish(_result())
+        warm_start.save_snapshot(saved, path)
+
+        store = ResultsStore()
+        with patch("src.api._test_results_cache", store), \
+             patch("src.api.load_snapshot", lambda s: warm_start.load_snapshot(s, path)), \
+             patch("src.api.AUTO_REFRESH_ON_START", True), \
+             patch("src.api._run_url_tests") as run_tests:
+            refresh_urls_if_needed()
+            warm_start.mark_background_started()
+            ready = client.get("/readyz")
+            data = client.get("/api/urls").get_json()
+        run_tests.assert_not_called()
+        assert warm_start.take_initial_cycle()
+        assert ready.status_code == 200
+        assert ready.get_json()["stale"] is True
+        assert data["stale"] is True
+        assert data["results"][0]["stale"] is True
+
+    def test_not_ready_without_results(self, client, lifecycle):
+        with patch("src.api._test_results_cache", ResultsStore()):
+            response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.get_json()["status"] == "starting"
+
+    def test_livez(self, client, lifecycle):
+        assert client.get("/livez").status_code == 200
+        warm_start.mark_background_started()
+        lifecycle["heartbeat"] = time.time() - 100_000
+        assert client.get("/livez").status_code == 503